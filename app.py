@@ -1,6 +1,11 @@
 from settings import settings
-from vectorstore import ingest_pdf_to_qdrant
-from graph import build_graph
+from vectorstore import ingest_pdf_pipeline, ingest_pdfs
+from graph import build_graph, stream_graph
+from resources import registry
+from semantic_cache import semantic_cache
+from scheduler import describe_error, get_scheduler
+from tracing import serve_metrics, tracer
+from lifecycle import maintainer
 from typing import Optional
 import streamlit as st
 from dotenv import load_dotenv
@@ -16,20 +21,67 @@ st.set_page_config(
 
 st.title("⛅📄 Weather & Docs AI Assistant")
 
+# ---- Warm up models & clients once per session, while the page renders ----
+if "warmed_up" not in st.session_state:
+    if settings.warm_up_on_start:
+        registry.warm_up(background=True)
+    elif settings.warm_up_embeddings:
+        # Loading the embedding model dominates the first query
+        registry.warm_up(["embeddings"], background=True)
+    st.session_state.warmed_up = True
+
 # ---- Sidebar: PDF ingestion ----
 with st.sidebar:
     st.header("Setup & Ingestion")
-    pdf = st.file_uploader("Upload a PDF to ingest", type=["pdf"])
-    if st.button("Ingest PDF", type="primary") and pdf is not None:
-        # Save uploaded file safely (works cross-platform)
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-            tmp_file.write(pdf.read())
-            tmp_path = tmp_file.name
-
-        # Call vectorstore ingestion
-        n = ingest_pdf_to_qdrant(tmp_path, collection=settings.docs_collection)
-        st.success(
-            f"✅ Ingested {n} chunks into Qdrant collection '{settings.docs_collection}'.")
+    pdfs = st.file_uploader("Upload PDFs to ingest", type=["pdf"], accept_multiple_files=True)
+    if st.button("Ingest PDFs", type="primary") and pdfs:
+        # Save uploaded files safely (works cross-platform)
+        tmp_paths = []
+        for pdf in pdfs:
+            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
+                tmp_file.write(pdf.read())
+                tmp_paths.append(tmp_file.name)
+
+        if len(pdfs) == 1:
+            # Call vectorstore ingestion (streams pages -> chunks -> Qdrant)
+            bar = st.progress(0.0, text="Parsing PDF...")
+
+            def _on_progress(p):
+                pages = f"{p.pages_done}/{p.total_pages}" if p.total_pages else f"{p.pages_done}"
+                bar.progress(p.fraction,
+                             text=f"{pages} pages · {p.chunks_upserted} chunks stored")
+
+            # Key the document by its upload name so re-uploads are incremental
+            report = ingest_pdf_pipeline(
+                tmp_paths[0], collection=settings.docs_collection,
+                on_progress=_on_progress, source=pdfs[0].name)
+            bar.empty()
+            st.success(
+                f"✅ Ingested {report.chunks} chunks into Qdrant collection '{settings.docs_collection}'.")
+            st.caption(
+                f"{report.upserted} new · {report.skipped} unchanged · {report.deleted} removed")
+            peak = f", peak RSS {report.peak_rss_mb:.0f} MB" if report.peak_rss_mb else ""
+            st.caption(
+                f"{report.chunks_per_sec:.1f} chunks/s over {report.seconds:.1f}s{peak}")
+        else:
+            # Several files: parse in worker processes, embed in shared batches
+            bar = st.progress(0.0, text=f"Parsing {len(pdfs)} PDFs...")
+
+            def _on_bulk_progress(p):
+                bar.progress(p.fraction, text=f"{p.files_done}/{p.files_total} files · "
+                                              f"{p.chunks_upserted} chunks stored")
+
+            report = ingest_pdfs(
+                tmp_paths, collection=settings.docs_collection,
+                sources=[pdf.name for pdf in pdfs], on_progress=_on_bulk_progress)
+            bar.empty()
+            ok = len(report.files) - len(report.failed)
+            st.success(f"✅ Ingested {ok}/{len(report.files)} files ({report.chunks} chunks) "
+                       f"into Qdrant collection '{settings.docs_collection}'.")
+            st.caption(f"{report.upserted} new chunks · {report.chunks_per_sec:.1f} chunks/s "
+                       f"over {report.seconds:.1f}s with {report.workers} workers")
+            for failed in report.failed:
+                st.error(f"{failed.source}: {failed.error}")
 
     st.divider()
     st.subheader("Config (read-only)")
@@ -38,6 +90,52 @@ with st.sidebar:
     st.write(f"Docs collection: `{settings.docs_collection}`")
     st.write(f"Interactions collection: `{settings.interactions_collection}`")
 
+    with st.expander("Shared resources"):
+        st.json(registry.stats())
+
+    with st.expander("Semantic cache"):
+        st.json(semantic_cache.stats())
+
+    with st.expander("Interactions maintenance"):
+        # Points expired, merged and evicted by the last run (lifecycle.py)
+        if st.button("Run now"):
+            maintainer.run_once()
+        st.json(maintainer.last_report.stats() if maintainer.last_report else {})
+        if maintainer.last_error:
+            st.error(f"{maintainer.failed_runs} background runs failed; "
+                     f"last error: {maintainer.last_error}")
+
+    with st.expander("LLM scheduler"):
+        # Queue depth per lane, wait times, retries and rate-limit hits
+        st.json(get_scheduler().stats())
+
+    with st.expander("Streaming latency"):
+        # Time-to-first-token and generation speed of recent turns
+        st.dataframe(st.session_state.get("turn_metrics", [])[-10:])
+
+    with st.expander("Tracing"):
+        # Per node / I/O call latency percentiles, then the last request's spans
+        st.dataframe([{"span": name, **row} for name, row in tracer.stats().items()])
+        recent = tracer.recent(1)
+        if recent:
+            last = recent[-1]
+            st.caption(f"Last request: {last.total_s * 1000:.0f} ms")
+            st.dataframe(last.timeline())
+            if last.profile:
+                st.download_button("Profile (folded stacks)", last.folded(),
+                                   file_name="profile.folded")
+        st.code(tracer.render_prometheus(), language="text")
+
+# ---- Prometheus scrape endpoint (optional, once per process) ----
+if settings.metrics_port:
+    registry.get("metrics_server", (settings.metrics_host, settings.metrics_port),
+                 lambda: serve_metrics(settings.metrics_port, settings.metrics_host))
+
+# ---- Interactions expiry/merging/cap (optional, once per process) ----
+if settings.interaction_maintenance_interval:
+    registry.get("interaction_maintenance", settings.interaction_maintenance_interval,
+                 lambda: maintainer.start(settings.interaction_maintenance_interval))
+
 # ---- Initialize graph & history ----
 if "graph" not in st.session_state:
     st.session_state.graph = build_graph()
@@ -45,6 +143,9 @@ if "graph" not in st.session_state:
 if "history" not in st.session_state:
     st.session_state.history = []
 
+if "turn_metrics" not in st.session_state:
+    st.session_state.turn_metrics = []
+
 # ---- Chat Interface ----
 query = st.chat_input(
     "Ask about weather (e.g., 'weather in Mumbai') or your PDF...")
@@ -53,19 +154,50 @@ if query:
     with st.chat_message("user"):
         st.write(query)
 
-    with st.spinner("Thinking..."):
+    with st.chat_message("assistant"):
+        final = {}
+
+        def _tokens():
+            # LangGraph pipeline (router decides weather vs RAG); answer
+            # tokens are rendered as soon as the LLM produces them
+            for kind, payload in stream_graph(
+                    st.session_state.graph, {"query": query, "meta": {}}):
+                if kind == "token":
+                    yield payload
+                else:
+                    final.update(payload)
+
         try:
-            # LangGraph pipeline (router decides weather vs RAG)
-            res = st.session_state.graph.invoke({"query": query, "meta": {}})
-            answer = res.get("answer", "(No answer)")
+            streamed = st.write_stream(_tokens())
+            answer = final.get("answer") or "(No answer)"
+            if not streamed:
+                # Cache hits and non-streaming routes arrive in one piece
+                st.write(answer)
+            meta = final.get("meta", {})
+            if meta.get("cache") == "hit":
+                st.caption("⚡ Answered from semantic cache")
+            elif meta.get("stream_tokens"):
+                speed = f" · {meta['tokens_per_s']} tok/s" if meta.get("tokens_per_s") else ""
+                context = (f" · context {meta['context_tokens']} tokens "
+                           f"({meta['context_tokens_saved']} saved)"
+                           if "context_tokens" in meta else "")
+                st.caption(f"first token {meta['ttft_s']:.2f}s{speed}{context}")
+            st.session_state.turn_metrics.append({
+                "route": final.get("route"),
+                "cache": meta.get("cache"),
+                "ttft_s": meta.get("ttft_s"),
+                "tokens_per_s": meta.get("tokens_per_s"),
+                "tokens": meta.get("stream_tokens"),
+                "total_s": meta.get("total_s"),
+                "context_tokens": meta.get("context_tokens"),
+                "context_saved": meta.get("context_tokens_saved"),
+            })
         except Exception as e:
-            answer = f"❌ Error: {e}"
+            answer = describe_error(e)
+            st.write(answer)
 
     st.session_state.history.append((query, answer))
 
-    with st.chat_message("assistant"):
-        st.write(answer)
-
 # ---- Show Conversation History ----
 if st.session_state.history:
     with st.expander("Conversation History"):
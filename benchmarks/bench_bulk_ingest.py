@@ -0,0 +1,93 @@
+"""Bulk ingestion scaling: the same folder of PDFs with 1, 2, 4 and 8 parser processes.
+
+Each run ingests into a fresh in-process Qdrant (``:memory:``) with empty
+manifests, so every run does the full work. One corrupt file is added to
+show that a bad file fails alone. Feature-hashing embeddings (default) keep
+the parent's embedding cost small, so the numbers show how parsing and
+splitting scale; ``--embeddings model`` uses ``EMBEDDING_MODEL`` instead.
+
+    python benchmarks/bench_bulk_ingest.py --files 48 --pages 20
+    python benchmarks/bench_bulk_ingest.py --pdf-dir data/manuals --workers 1,4
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path[:0] = [ROOT, HERE]
+os.environ.setdefault("GROQ_API_KEY", "offline")
+os.environ.setdefault("OPENWEATHER_API_KEY", "offline")
+
+from settings import settings  # noqa: E402
+from resources import registry  # noqa: E402
+from standins import HashingEmbeddings, synthetic_manual, write_text_pdf  # noqa: E402
+from vectorstore import _parser_context, find_pdfs, ingest_pdfs  # noqa: E402
+
+
+def make_corpus(directory: str, files: int, pages: int) -> None:
+    for i in range(files):
+        write_text_pdf(os.path.join(directory, f"manual_{i:03d}.pdf"),
+                       synthetic_manual(pages, seed=i)[0])
+    with open(os.path.join(directory, "broken.pdf"), "wb") as f:
+        f.write(b"%PDF-1.4\nnot really a pdf\n")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=48)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--pdf-dir", help="ingest this folder instead of synthetic manuals")
+    parser.add_argument("--workers", default="1,2,4,8")
+    parser.add_argument("--embeddings", choices=["hashing", "model"], default="hashing")
+    args = parser.parse_args()
+    # Not at module level: parser processes are forked from a server that
+    # imports this script, and grpc (via qdrant_client) slows every fork
+    from qdrant_client import QdrantClient
+
+    with ExitStack() as stack:
+        tmp = stack.enter_context(tempfile.TemporaryDirectory(prefix="bench_bulk_"))
+        corpus = args.pdf_dir
+        if corpus is None:
+            corpus = os.path.join(tmp, "corpus")
+            os.makedirs(corpus)
+            started = time.perf_counter()
+            make_corpus(corpus, args.files, args.pages)
+            print(f"wrote {args.files} PDFs x {args.pages} pages (+1 corrupt) "
+                  f"in {time.perf_counter() - started:.1f}s")
+        paths = find_pdfs([corpus])
+        settings.embedding_cache_enabled = False
+        if args.embeddings == "hashing":
+            stack.enter_context(registry.override("embeddings", HashingEmbeddings()))
+
+        print(f"{os.cpu_count()} CPUs, {len(paths)} files")
+        # The fork server starts once per process; keep it out of the first pooled run
+        started = time.perf_counter()
+        with ProcessPoolExecutor(1, mp_context=_parser_context()) as pool:
+            pool.submit(os.getpid).result()
+        print(f"parser process start-up: {time.perf_counter() - started:.2f}s (once)")
+        print(f"{'workers':>7} {'seconds':>8} {'files/s':>8} {'chunks/s':>9} {'speedup':>8}"
+              f" {'parse s':>8} {'embed s':>8} {'upsert s':>9} {'failed':>7}")
+        first = None
+        for workers in [int(w) for w in args.workers.split(",")]:
+            settings.ingest_manifest_dir = os.path.join(tmp, f"manifests_{workers}")
+            settings.lexical_index_dir = os.path.join(tmp, f"lexical_{workers}")
+            with registry.override("qdrant", QdrantClient(location=":memory:")):
+                report = ingest_pdfs(paths, collection="bench_bulk", workers=workers)
+            registry.clear("bm25")
+            first = first or report.seconds
+            print(f"{workers:>7} {report.seconds:>8.2f} {len(paths) / report.seconds:>8.1f}"
+                  f" {report.chunks_per_sec:>9.0f} {first / report.seconds:>7.2f}x"
+                  f" {report.parse_seconds:>8.2f} {report.embed_seconds:>8.2f}"
+                  f" {report.upsert_seconds:>9.2f} {len(report.failed):>7}")
+        for f in report.failed:
+            print(f"failed: {f.source}: {f.error}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
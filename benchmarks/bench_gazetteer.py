@@ -0,0 +1,75 @@
+"""City extraction latency with the bundled gazetteer vs 100k+ synthetic place names.
+
+    python benchmarks/bench_gazetteer.py --places 150000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path[:0] = [ROOT, HERE]
+os.environ.setdefault("GROQ_API_KEY", "offline")
+os.environ.setdefault("OPENWEATHER_API_KEY", "offline")
+
+from gazetteer import Gazetteer, Place, _parse_rows, _resolve_path  # noqa: E402
+from settings import settings  # noqa: E402
+
+QUERIES = [
+    "weather in Pune tomorrow please",
+    "Is it raining in São Paulo or Rio de Janeiro right now?",
+    "compare the temperature in new york city, bombay and Zürich",
+    "Should I carry an umbrella in Ho Chi Minh City this evening?",
+    "what's the weather like",
+    "forecast for Saint Petersburg and Kyiv over the next few hours, with wind speed",
+]
+
+_SYLLABLES = ["ka", "lo", "mi", "ra", "to", "sen", "var", "dun", "bel", "ost",
+              "ham", "pur", "abad", "ville", "burg", "ton", "nes", "qui", "zel", "dor"]
+
+
+def _synthetic_places(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    for i in range(n):
+        words = ["".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4))).title()
+                 for _ in range(rng.choice((1, 1, 1, 2, 2, 3)))]
+        yield Place(10_000_000 + i, " ".join(words), "XX", 0.0, 0.0, rng.randint(500, 50_000)), []
+
+
+def _measure(g: Gazetteer, repeat: int):
+    lat = []
+    for _ in range(repeat):
+        for q in QUERIES:
+            t0 = time.perf_counter()
+            g.find_all(q)
+            lat.append(time.perf_counter() - t0)
+    us = np.asarray(lat) * 1e6
+    return float(np.percentile(us, 50)), float(np.percentile(us, 99))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--places", type=int, default=150_000)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    with open(_resolve_path(settings.gazetteer_path), encoding="utf-8") as f:
+        bundled = list(_parse_rows(f))
+
+    for label, entries in [("bundled", bundled),
+                           (f"bundled+{args.places}", bundled + list(_synthetic_places(args.places)))]:
+        t0 = time.perf_counter()
+        g = Gazetteer(entries)
+        build_s = time.perf_counter() - t0
+        p50, p99 = _measure(g, args.repeat)
+        print(f"{label:>18}: {g.size:>7} places, built in {build_s:6.2f}s, "
+              f"find_all p50 {p50:6.1f} us, p99 {p99:6.1f} us")
+    print("sample:", {q: [p.name for p in g.find_all(q)] for q in QUERIES[:3]})
+
+
+if __name__ == "__main__":
+    main()
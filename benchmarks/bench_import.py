@@ -0,0 +1,136 @@
+"""Cold-start cost of the entry modules: import time, RSS and heavy deps loaded.
+
+Each module is imported in a fresh interpreter with ``-X importtime``; the
+report lists the total import time, peak RSS, the slowest top-level
+packages and which of the heavy dependencies (model runtimes, vector DB
+client, LLM SDK, graph runtime) were loaded by the import alone.
+
+    python benchmarks/bench_import.py
+    python benchmarks/bench_import.py --modules graph,eval_langsmith --repeat 5 --check
+
+``--check`` exits non-zero when a module exceeds its budget in ``BUDGETS_S``
+(best of ``--repeat`` runs) or imports one of ``HEAVY_MODULES`` eagerly.
+``tests/test_import_time.py`` checks only the eager imports: a single timed
+run is too noisy on a loaded CI machine.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+
+# Must only be imported when first used, never by importing an entry module.
+HEAVY_MODULES = (
+    "torch", "transformers", "sentence_transformers", "langchain_community",
+    "langchain_qdrant", "langchain_text_splitters", "qdrant_client",
+    "langchain_groq", "groq", "langgraph",
+)
+
+# Budgets for the summed ``-X importtime`` self times, in seconds. About
+# twice the measured time, so a slower machine passes but an eager import
+# of any heavy package does not.
+BUDGETS_S = {"settings": 0.5, "graph": 2.0, "eval_langsmith": 2.0}
+
+_PROBE = """
+import json, resource, sys, time
+t0 = time.perf_counter()
+import {module}
+wall = time.perf_counter() - t0
+heavy = sorted(m for m in {heavy!r} if m in sys.modules)
+rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print(json.dumps({{"wall_s": wall, "rss_mb": rss_mb, "heavy": heavy}}))
+"""
+
+
+def _parse_importtime(stderr: str) -> Dict[str, float]:
+    """Self time per top-level package, in seconds."""
+    per_package: Dict[str, float] = defaultdict(float)
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        per_package[name.strip().split(".")[0]] += int(self_us) / 1e6
+    return dict(per_package)
+
+
+def measure(module: str, env: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Import ``module`` in a fresh interpreter and report what it cost."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c",
+         _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        tail = proc.stderr.strip().splitlines()[-1:] or ["?"]
+        return {"module": module, "error": tail[0]}
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    packages = _parse_importtime(proc.stderr)
+    result.update(module=module, import_s=sum(packages.values()),
+                  top=sorted(packages.items(), key=lambda kv: -kv[1])[:8])
+    return result
+
+
+def check(result: Dict[str, Any], budgets: bool = True) -> List[str]:
+    """Budget violations for one ``measure`` result (eager imports only
+    unless ``budgets``)."""
+    if "error" in result:
+        return [f"{result['module']}: import failed ({result['error']})"]
+    problems = [f"{result['module']}: imports {m} eagerly" for m in result["heavy"]]
+    budget = BUDGETS_S.get(result["module"]) if budgets else None
+    if budget is not None and result["import_s"] > budget:
+        problems.append(f"{result['module']}: import took {result['import_s']:.2f}s "
+                        f"(budget {budget:.2f}s)")
+    return problems
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modules", default="settings,graph,eval_langsmith,app")
+    parser.add_argument("--repeat", type=int, default=3, help="keep the fastest of N runs")
+    parser.add_argument("--check", action="store_true", help="fail on budget violations")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if args.check:
+        # Importing must not need credentials; they are read on first use.
+        env.pop("GROQ_API_KEY", None)
+        env.pop("OPENWEATHER_API_KEY", None)
+    else:
+        env.setdefault("GROQ_API_KEY", "offline")
+        env.setdefault("OPENWEATHER_API_KEY", "offline")
+
+    results, problems = [], []
+    for module in [m.strip() for m in args.modules.split(",") if m.strip()]:
+        runs = [measure(module, env) for _ in range(max(1, args.repeat))]
+        ok = [r for r in runs if "error" not in r]
+        result = min(ok, key=lambda r: r["import_s"]) if ok else runs[0]
+        results.append(result)
+        if "error" in result:
+            print(f"{module:<16} skipped: {result['error']}")
+            if module in BUDGETS_S:
+                problems.extend(check(result))
+            continue
+        print(f"{module:<16} import {result['import_s'] * 1000:7.0f} ms   "
+              f"wall {result['wall_s'] * 1000:7.0f} ms   rss {result['rss_mb']:6.0f} MB   "
+              f"heavy: {', '.join(result['heavy']) or '-'}")
+        print("    " + ", ".join(f"{name} {s * 1000:.0f}ms" for name, s in result["top"]))
+        problems.extend(check(result))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.check:
+        for p in problems:
+            print("FAIL", p)
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
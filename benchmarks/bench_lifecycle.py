@@ -0,0 +1,149 @@
+"""Interactions maintenance: points reclaimed, run time and cache lookup cost.
+
+Fills an in-process Qdrant (``:memory:``) with a month of synthetic
+interactions: repeated weather questions for a few cities, document
+questions, and entries without a timestamp written before ``created_at``
+existed. The benchmark then runs a full maintenance pass and an incremental
+pass after new traffic arrives. It reports points expired, merged and
+evicted, how long each pass took, and the p50 semantic cache lookup
+(``query_points`` top-5) before and after. The in-process store keeps
+deleted rows, so the last line also times a compacted copy, which is what a
+server looks like after its vacuum optimizer runs.
+
+Incremental passes search for the new points' neighbours only while that is
+a small share of the collection (``--search-share`` overrides it); a search
+in the in-process store is a Python scan, so forcing it shows the worst case.
+
+    python benchmarks/bench_lifecycle.py --points 20000
+    python benchmarks/bench_lifecycle.py --points 20000 --max-points 5000
+    python benchmarks/bench_lifecycle.py --points 20000 --search-share 1
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import uuid
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path[:0] = [ROOT, HERE]
+os.environ.setdefault("GROQ_API_KEY", "offline")
+os.environ.setdefault("OPENWEATHER_API_KEY", "offline")
+
+from settings import settings  # noqa: E402
+from resources import registry  # noqa: E402
+from standins import HashingEmbeddings, synthetic_manual  # noqa: E402
+import lifecycle  # noqa: E402
+from lifecycle import InteractionMaintainer  # noqa: E402
+
+CITIES = ["mumbai", "pune", "delhi", "chennai", "kolkata", "bengaluru", "jaipur", "surat"]
+WEATHER = ["weather in {c}", "what's the weather in {c}?", "{c} weather today",
+           "is it raining in {c}", "temperature in {c} now"]
+DAY = 86400.0
+
+
+def interactions(n: int, now: float, seed: int = 0):
+    """``(query, metadata)`` pairs; ages spread over 30 days."""
+    rng = random.Random(seed)
+    _, doc_queries = synthetic_manual(max(4, n // 40), seed=seed)
+    for _ in range(n):
+        age = rng.random() * 30 * DAY
+        roll = rng.random()
+        if roll < 0.6:
+            city = rng.choice(CITIES)
+            yield rng.choice(WEATHER).format(c=city.title()), {
+                "route": "weather", "city": city, "created_at": now - age}
+        elif roll < 0.95:
+            yield rng.choice(doc_queries)[0], {
+                "route": "rag", "docs_version": "v1", "created_at": now - age}
+        else:
+            yield rng.choice(doc_queries)[0], {"route": "rag", "docs_version": "v1"}
+
+
+def fill(client, emb, items) -> int:
+    from qdrant_client.http.models import PointStruct
+    items = list(items)
+    for i in range(0, len(items), 1024):
+        batch = items[i:i + 1024]
+        vectors = emb.embed_documents([q for q, _ in batch])
+        client.upsert(settings.interactions_collection, points=[
+            PointStruct(id=str(uuid.uuid4()), vector=v,
+                        payload={"page_content": q, "metadata": {"query": q, **m}})
+            for (q, m), v in zip(batch, vectors)])
+    return len(items)
+
+
+def lookup_ms(client, emb, queries) -> float:
+    lat = []
+    for q in queries:
+        vector = emb.embed_query(q)
+        started = time.perf_counter()
+        client.query_points(settings.interactions_collection, query=vector, limit=5,
+                            with_payload=True, score_threshold=settings.semantic_cache_threshold)
+        lat.append(time.perf_counter() - started)
+    return float(np.percentile(np.asarray(lat) * 1000, 50))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--new", type=float, default=0.05, help="share of new traffic before pass 2")
+    parser.add_argument("--max-points", type=int, help="default: INTERACTION_MAX_POINTS")
+    parser.add_argument("--search-share", type=float,
+                        help="incremental search budget as a share of the collection")
+    args = parser.parse_args()
+    if args.max_points:
+        settings.interaction_max_points = args.max_points
+    if args.search_share is not None:
+        lifecycle._SEARCH_SHARE = args.search_share
+
+    from qdrant_client import QdrantClient
+    from qdrant_client.http.models import Distance, PointStruct, VectorParams
+    emb = HashingEmbeddings()
+    client = QdrantClient(location=":memory:")
+    client.create_collection(settings.interactions_collection,
+                             vectors_config=VectorParams(size=emb.dim, distance=Distance.COSINE))
+    now = time.time()
+    total = fill(client, emb, interactions(args.points, now))
+    probe = [f"weather in {c}" for c in CITIES] * 5
+    print(f"{total} interactions, TTL weather/rag/other = {settings.interaction_ttl_weather}/"
+          f"{settings.interaction_ttl_rag}/{settings.interaction_ttl_other}s, "
+          f"merge >= {settings.interaction_merge_threshold}, cap {settings.interaction_max_points}")
+    print(f"cache lookup p50 before: {lookup_ms(client, emb, probe):.2f} ms")
+
+    maintainer = InteractionMaintainer()
+    print(f"{'pass':<12} {'read':<12} {'scanned':>8} {'expired':>8} {'merged':>7} {'evicted':>8}"
+          f" {'reclaimed':>9} {'remaining':>9} {'seconds':>8}")
+    with registry.override("qdrant", client):
+        for name in ("full", "incremental"):
+            if name == "incremental":
+                fill(client, emb, ((q, {**m, "created_at": time.time()})
+                                   for q, m in interactions(int(args.points * args.new), now, seed=1)))
+            r = maintainer.run_once()
+            read = "new+similar" if r.incremental else "everything"
+            print(f"{name:<12} {read:<12} {r.scanned:>8} {r.expired:>8} {r.merged:>7} {r.evicted:>8}"
+                  f" {r.reclaimed:>9} {r.remaining:>9} {r.seconds:>8.2f}")
+    print(f"cache lookup p50 after:  {lookup_ms(client, emb, probe):.2f} ms")
+    # The in-process store keeps deleted rows in its arrays; a server drops
+    # them when its vacuum optimizer runs. A fresh copy shows that state.
+    compacted = QdrantClient(location=":memory:")
+    compacted.create_collection(settings.interactions_collection,
+                                vectors_config=VectorParams(size=emb.dim, distance=Distance.COSINE))
+    points, offset = [], None
+    while True:
+        page, offset = client.scroll(settings.interactions_collection, limit=1024, offset=offset,
+                                     with_payload=True, with_vectors=True)
+        points.extend(page)
+        if offset is None:
+            break
+    compacted.upsert(settings.interactions_collection, points=[
+        PointStruct(id=p.id, vector=p.vector, payload=p.payload) for p in points])
+    print(f"cache lookup p50 after, compacted copy: {lookup_ms(compacted, emb, probe):.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
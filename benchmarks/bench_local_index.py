@@ -0,0 +1,113 @@
+"""Benchmark the embedded local index against Qdrant.
+
+Builds both backends from the same random unit vectors and reports insert
+throughput, top-k query latency (p50/p95) and on-disk size.
+
+    python benchmarks/bench_local_index.py --sizes 10000 100000 1000000
+    python benchmarks/bench_local_index.py --qdrant-url http://localhost:6333
+
+Without ``--qdrant-url`` Qdrant runs in-process (``:memory:``), which is
+fine for small sizes but much slower than a server at 1M.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+from typing import Dict, List
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from qdrant_client import QdrantClient  # noqa: E402
+from qdrant_client.http.models import Distance, PointStruct, VectorParams  # noqa: E402
+from localindex import LocalVectorIndex  # noqa: E402
+
+BATCH = 2048
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    arr = np.asarray(samples) * 1000
+    return {"p50_ms": float(np.percentile(arr, 50)),
+            "p95_ms": float(np.percentile(arr, 95))}
+
+
+def _dir_size_mb(path: str) -> float:
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+    return total / (1024 * 1024)
+
+
+def bench_local(vectors: np.ndarray, queries: np.ndarray, k: int) -> Dict[str, float]:
+    with tempfile.TemporaryDirectory() as tmp:
+        idx = LocalVectorIndex(tmp)
+        start = time.perf_counter()
+        for i in range(0, len(vectors), BATCH):
+            block = vectors[i:i + BATCH]
+            ids = [str(j) for j in range(i, i + len(block))]
+            idx.upsert(ids, block, [{"i": j} for j in range(i, i + len(block))])
+        build = time.perf_counter() - start
+
+        lat = []
+        for q in queries:
+            t0 = time.perf_counter()
+            idx.search(q, k)
+            lat.append(time.perf_counter() - t0)
+        return {"insert_per_sec": len(vectors) / build,
+                "disk_mb": _dir_size_mb(tmp), **_percentiles(lat)}
+
+
+def bench_qdrant(client: QdrantClient, vectors: np.ndarray, queries: np.ndarray,
+                 k: int) -> Dict[str, float]:
+    name = f"bench_{uuid.uuid4().hex[:8]}"
+    client.create_collection(name, vectors_config=VectorParams(
+        size=vectors.shape[1], distance=Distance.COSINE))
+    try:
+        start = time.perf_counter()
+        for i in range(0, len(vectors), BATCH):
+            block = vectors[i:i + BATCH]
+            client.upsert(name, points=[
+                PointStruct(id=i + j, vector=v.tolist(), payload={"i": i + j})
+                for j, v in enumerate(block)])
+        build = time.perf_counter() - start
+
+        lat = []
+        for q in queries:
+            t0 = time.perf_counter()
+            client.query_points(name, query=q.tolist(), limit=k)
+            lat.append(time.perf_counter() - t0)
+        return {"insert_per_sec": len(vectors) / build, **_percentiles(lat)}
+    finally:
+        client.delete_collection(name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=4)
+    parser.add_argument("--qdrant-url", default=None)
+    parser.add_argument("--skip-qdrant", action="store_true")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    client = None
+    if not args.skip_qdrant:
+        client = (QdrantClient(url=args.qdrant_url) if args.qdrant_url
+                  else QdrantClient(location=":memory:"))
+
+    for n in args.sizes:
+        vectors = rng.standard_normal((n, args.dim), dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+        print(f"n={n:>9,}  local  {bench_local(vectors, queries, args.k)}")
+        if client is not None:
+            print(f"n={n:>9,}  qdrant {bench_qdrant(client, vectors, queries, args.k)}")
+
+
+if __name__ == "__main__":
+    main()
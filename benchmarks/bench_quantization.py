@@ -0,0 +1,230 @@
+"""Docs collection storage profiles: RAM, p95 search latency and recall@4.
+
+Compares the ``VECTOR_PROFILE`` options (``float``, ``int8``, ``binary``) on
+the same vectors. recall@4 is measured against exact float search.
+
+Qdrant's in-process mode (``:memory:``) accepts quantization settings but
+always searches exactly, so locally:
+
+- ``float`` is measured through the in-process Qdrant (``query_points``);
+- the quantized profiles are modelled in numpy the way Qdrant searches them.
+  Candidates are scored with int8 codes (99% quantile range) or sign bits
+  (Hamming). ``k * oversampling`` candidates are then rescored with the
+  full-precision originals, read from a memory-mapped file as if on disk.
+
+RAM is the vectors kept in memory plus an HNSW graph estimate
+(``2 * HNSW_M`` links per point). The numpy latencies show the shape of the
+trade-off, not Qdrant's SIMD speed. Binary quantization loses more recall
+on small models (384 dims) than on 1024+ dims; the rescore rows show how
+much oversampling wins back. Use ``--qdrant-url`` to run every
+profile against a real server with ``vectorstore.collection_config``
+and ``vectorstore.search_params``.
+
+    python benchmarks/bench_quantization.py --points 50000
+    python benchmarks/bench_quantization.py --vectors model --pages 400
+    python benchmarks/bench_quantization.py --qdrant-url http://localhost:6333
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path[:0] = [ROOT, HERE]
+os.environ.setdefault("GROQ_API_KEY", "offline")
+os.environ.setdefault("OPENWEATHER_API_KEY", "offline")
+
+from settings import settings  # noqa: E402
+from vectorstore import _DEFAULT_OVERSAMPLING, collection_config, search_params  # noqa: E402
+
+K = 4
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint16)
+
+
+def _normalize(x: np.ndarray) -> np.ndarray:
+    return (x / np.linalg.norm(x, axis=1, keepdims=True)).astype(np.float32)
+
+
+def clustered_vectors(n: int, dim: int, queries: int, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Unit vectors in topical clusters, like chunk embeddings of a document
+    set; queries are noisy copies of stored vectors."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(8, n // 200), dim))
+    docs = _normalize(centers[rng.integers(0, len(centers), n)] + 0.6 * rng.standard_normal((n, dim)))
+    picked = docs[rng.integers(0, n, queries)]
+    return docs, _normalize(picked + 0.04 * rng.standard_normal((queries, dim)))
+
+
+def model_vectors(pages: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Chunks and queries of a synthetic manual embedded with ``EMBEDDING_MODEL``."""
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    from embeddings import get_embeddings
+    from standins import synthetic_manual
+    page_texts, queries = synthetic_manual(pages)
+    splitter = RecursiveCharacterTextSplitter(chunk_size=settings.chunk_size,
+                                              chunk_overlap=settings.chunk_overlap)
+    chunks = [c for text in page_texts for c in splitter.split_text(text)]
+    emb = get_embeddings()
+    return (_normalize(np.asarray(emb.embed_documents(chunks))),
+            _normalize(np.asarray(emb.embed_documents([q for q, _ in queries]))))
+
+
+def _top(scores: np.ndarray, k: int) -> np.ndarray:
+    k = min(k, len(scores))
+    idx = np.argpartition(-scores, k - 1)[:k]
+    return idx[np.argsort(-scores[idx])]
+
+
+class Int8Index:
+    """Scalar quantization: one value range (99% quantile) for all dimensions."""
+
+    def __init__(self, docs: np.ndarray):
+        lo, hi = np.quantile(docs, [0.005, 0.995])
+        self.codes = (np.clip(np.rint((docs - lo) / (hi - lo) * 255), 0, 255) - 128).astype(np.int8)
+
+    def scores(self, q: np.ndarray) -> np.ndarray:
+        # lo and the +128 shift add the same term to every score for a query
+        return self.codes @ q
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes
+
+
+class BinaryIndex:
+    """Binary quantization: sign bits, scored by Hamming similarity."""
+
+    def __init__(self, docs: np.ndarray):
+        self.bits = np.packbits(docs > 0, axis=1)
+
+    def scores(self, q: np.ndarray) -> np.ndarray:
+        qbits = np.packbits(q > 0)
+        return -_POPCOUNT[np.bitwise_xor(self.bits, qbits)].sum(axis=1, dtype=np.int32)
+
+    @property
+    def nbytes(self) -> int:
+        return self.bits.nbytes
+
+
+def _measure(search: Callable[[np.ndarray], np.ndarray], queries: np.ndarray,
+             truth: List[set]) -> Dict[str, float]:
+    lat, hits = [], 0
+    for q, expected in zip(queries, truth):
+        t0 = time.perf_counter()
+        found = search(q)
+        lat.append(time.perf_counter() - t0)
+        hits += len(expected & set(int(i) for i in found[:K]))
+    ms = np.asarray(lat) * 1000
+    return {"p50_ms": float(np.percentile(ms, 50)), "p95_ms": float(np.percentile(ms, 95)),
+            "recall": hits / (K * len(queries))}
+
+
+def bench_local(docs: np.ndarray, queries: np.ndarray, truth: List[set],
+                oversampling: Dict[str, float]) -> List[Tuple[str, float, float, Dict[str, float]]]:
+    from qdrant_client import QdrantClient
+    from qdrant_client.http.models import PointStruct
+    n, dim = docs.shape
+    graph_mb = n * 2 * settings.hnsw_m * 4 / 2**20
+    rows = []
+
+    client = QdrantClient(location=":memory:")
+    client.create_collection("bench_float", **collection_config(dim, "float"))
+    for i in range(0, n, 2048):
+        client.upsert("bench_float", points=[
+            PointStruct(id=j, vector=docs[j].tolist()) for j in range(i, min(n, i + 2048))])
+    rows.append(("float (qdrant in-process)", docs.nbytes / 2**20 + graph_mb, 0.0, _measure(
+        lambda q: np.asarray([p.id for p in client.query_points(
+            "bench_float", query=q.tolist(), limit=K).points]),
+        queries, truth)))
+    # Same scan in numpy, for comparing latency with the modelled profiles
+    rows.append(("float (numpy)", docs.nbytes / 2**20 + graph_mb, 0.0,
+                 _measure(lambda q: _top(docs @ q, K), queries, truth)))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Originals "on disk": rescoring reads rows from a memory-mapped file
+        path = os.path.join(tmp, "originals.f32")
+        originals = np.memmap(path, dtype=np.float32, mode="w+", shape=docs.shape)
+        originals[:] = docs
+        originals.flush()
+        disk_mb = docs.nbytes / 2**20
+
+        for profile, index in (("int8", Int8Index(docs)), ("binary", BinaryIndex(docs))):
+            factor = oversampling[profile]
+
+            def rescored(q, index=index, factor=factor):
+                cand = _top(index.scores(q), int(np.ceil(K * factor)))
+                return cand[_top(np.asarray(originals[cand]) @ q, K)]
+
+            ram = index.nbytes / 2**20 + graph_mb
+            rows.append((f"{profile} x{factor:g} rescore", ram, disk_mb,
+                         _measure(rescored, queries, truth)))
+            rows.append((f"{profile} no rescore", ram, disk_mb,
+                         _measure(lambda q, index=index: _top(index.scores(q), K), queries, truth)))
+    return rows
+
+
+def bench_server(url: str, docs: np.ndarray, queries: np.ndarray, truth: List[set]
+                 ) -> List[Tuple[str, float, float, Dict[str, float]]]:
+    from qdrant_client import QdrantClient
+    from qdrant_client.http.models import PointStruct
+    client = QdrantClient(url=url, api_key=settings.qdrant_api_key or None)
+    settings.qdrant_url, settings.vector_backend = url, "qdrant"
+    rows = []
+    for profile in ("float", "int8", "binary"):
+        name = f"bench_quant_{profile}"
+        if client.collection_exists(name):
+            client.delete_collection(name)
+        client.create_collection(name, **collection_config(docs.shape[1], profile))
+        for i in range(0, len(docs), 1024):
+            client.upsert(name, wait=True, points=[
+                PointStruct(id=j, vector=docs[j].tolist()) for j in range(i, min(len(docs), i + 1024))])
+        params = search_params(profile)
+        rows.append((f"{profile} (server)", float("nan"), float("nan"), _measure(
+            lambda q, name=name, params=params: np.asarray([p.id for p in client.query_points(
+                name, query=q.tolist(), limit=K, search_params=params).points]),
+            queries, truth)))
+        client.delete_collection(name)
+    return rows
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vectors", choices=["clustered", "model"], default="clustered")
+    parser.add_argument("--points", type=int, default=50_000, help="clustered: stored vectors")
+    parser.add_argument("--dim", type=int, default=384, help="clustered: dimension")
+    parser.add_argument("--pages", type=int, default=400, help="model: synthetic manual pages")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--oversampling", type=float,
+                        help="default: QUANTIZATION_OVERSAMPLING or 2 (int8) / 3 (binary)")
+    parser.add_argument("--qdrant-url", help="also run every profile against this server")
+    args = parser.parse_args()
+
+    if args.vectors == "model":
+        docs, queries = model_vectors(args.pages)
+    else:
+        docs, queries = clustered_vectors(args.points, args.dim, args.queries)
+    exact = docs @ queries.T
+    truth = [set(int(i) for i in _top(exact[:, j], K)) for j in range(len(queries))]
+    factor = args.oversampling or settings.quantization_oversampling
+    oversampling = {p: factor or d for p, d in _DEFAULT_OVERSAMPLING.items()}
+
+    print(f"{len(docs)} vectors x {docs.shape[1]} dims, {len(queries)} queries, "
+          f"HNSW m={settings.hnsw_m} ef_construct={settings.hnsw_ef_construct}")
+    rows = bench_local(docs, queries, truth, oversampling)
+    if args.qdrant_url:
+        rows += bench_server(args.qdrant_url, docs, queries, truth)
+
+    print(f"{'profile':<27} {'RAM MB':>8} {'disk MB':>8} {'p50 ms':>8} {'p95 ms':>8} {'recall@4':>9}")
+    for name, ram, disk, m in rows:
+        print(f"{name:<27} {ram:>8.1f} {disk:>8.1f} {m['p50_ms']:>8.2f} {m['p95_ms']:>8.2f}"
+              f" {m['recall']:>9.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""Reranking stages: retrieval quality, redundancy and latency per ``RERANK_STAGES``.
+
+A synthetic manual is split with the configured chunking and stored in an
+in-process Qdrant (``:memory:``). ``--copies`` stores it as several
+revisions of the same document, the usual source of near-duplicate hits.
+Each pipeline retrieves ``RERANK_CANDIDATES`` chunks per question and keeps
+the top ``RETRIEVAL_K``; ``none`` is the plain top-k. It reports:
+
+- hit@k: the needle of the question is in the kept chunks;
+- dup: kept chunks that mostly repeat a higher-ranked one (word Jaccard >= 0.5);
+- pages: distinct pages covered, and context tokens after packing;
+- latency of retrieval plus reranking, and the mean time of each stage.
+
+Feature-hashing embeddings are used by default; ``--embeddings model`` uses
+``EMBEDDING_MODEL``. Cross-encoder pipelines run when sentence-transformers
+and ``CROSS_ENCODER_MODEL`` are available.
+
+    python benchmarks/bench_rerank.py --pages 60 --copies 2
+    python benchmarks/bench_rerank.py --pipelines none,mmr --mmr-lambda 0.7
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from contextlib import ExitStack
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path[:0] = [ROOT, HERE]
+os.environ.setdefault("GROQ_API_KEY", "offline")
+os.environ.setdefault("OPENWEATHER_API_KEY", "offline")
+
+from settings import settings  # noqa: E402
+from resources import registry  # noqa: E402
+from standins import HashingEmbeddings, synthetic_manual  # noqa: E402
+
+_WORD = re.compile(r"\w+")
+
+
+def _words(text: str) -> Set[str]:
+    return set(_WORD.findall(text.lower()))
+
+
+def duplicates(texts: List[str], threshold: float = 0.5) -> int:
+    """Chunks whose words mostly repeat an earlier chunk of the list."""
+    seen: List[Set[str]] = []
+    dups = 0
+    for text in texts:
+        words = _words(text)
+        if any(len(words & s) / max(len(words | s), 1) >= threshold for s in seen):
+            dups += 1
+        seen.append(words)
+    return dups
+
+
+def load_corpus(pages: int, copies: int) -> List[tuple]:
+    from langchain_core.documents import Document
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    from embeddings import get_embeddings
+    from vectorstore import _chunk_to_point, ensure_collection, get_qdrant_client
+
+    page_texts, queries = synthetic_manual(pages)
+    splitter = RecursiveCharacterTextSplitter(chunk_size=settings.chunk_size,
+                                              chunk_overlap=settings.chunk_overlap)
+    chunks = [Document(page_content=c, metadata={"source": f"manual_rev{r}.pdf", "page": p})
+              for r in range(copies)
+              for p, text in enumerate(page_texts)
+              for c in splitter.split_text(text)]
+    client = get_qdrant_client()
+    ensure_collection(client, settings.docs_collection)
+    vectors = get_embeddings().embed_documents([c.page_content for c in chunks])
+    for i in range(0, len(chunks), 512):
+        client.upsert(settings.docs_collection, points=[
+            _chunk_to_point(c, v) for c, v in zip(chunks[i:i + 512], vectors[i:i + 512])])
+    print(f"{pages} pages x {copies} revision(s): {len(chunks)} chunks "
+          f"(size {settings.chunk_size}, overlap {settings.chunk_overlap})")
+    return queries
+
+
+def run(spec: str, queries: List[tuple], k: int) -> Optional[Dict[str, float]]:
+    from context import build_context
+    from rag import _retrieve, _wants_vectors
+    from rerank import build_pipeline
+    try:
+        pipeline = build_pipeline("" if spec == "none" else spec)
+    except (ImportError, OSError) as exc:
+        print(f"{spec:<20} skipped: {type(exc).__name__}: {exc}")
+        return None
+    n = k if pipeline is None else max(k, settings.rerank_candidates)
+
+    latencies, stage_s = [], {}
+    hits = dups = pages = tokens = 0
+    for question, needle in queries:
+        started = time.perf_counter()
+        docs = _retrieve(question, n, _wants_vectors(pipeline))
+        if pipeline is not None:
+            result = pipeline.run([question], [docs], k)
+            docs = result.docs[0]
+            for name, seconds in result.timings.items():
+                stage_s[name] = stage_s.get(name, 0.0) + seconds
+        latencies.append(time.perf_counter() - started)
+        docs = docs[:k]
+        hits += any(needle in d.page_content for d in docs)
+        dups += duplicates([d.page_content for d in docs])
+        pages += len({d.metadata.get("page") for d in docs})
+        tokens += build_context(docs).tokens
+
+    ms = np.asarray(latencies) * 1000
+    count = len(queries)
+    return {"hit": hits / count, "dup": dups / (k * count), "pages": pages / count,
+            "tokens": tokens / count, "p50": float(np.percentile(ms, 50)),
+            "p95": float(np.percentile(ms, 95)),
+            "stages": ", ".join(f"{name} {s / count * 1000:.2f}ms" for name, s in stage_s.items())}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=60)
+    parser.add_argument("--copies", type=int, default=2, help="revisions of the manual stored")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--pipelines", default="none,mmr,cross_encoder,cross_encoder+mmr",
+        help="comma-separated; join stages with '+', e.g. none,mmr,cross_encoder+mmr")
+    parser.add_argument("--candidates", type=int, help="default: RERANK_CANDIDATES")
+    parser.add_argument("--mmr-lambda", type=float, help="default: MMR_LAMBDA")
+    parser.add_argument("--embeddings", choices=["hashing", "model"], default="hashing")
+    args = parser.parse_args()
+
+    settings.hybrid_search = False
+    settings.embedding_cache_enabled = False
+    if args.candidates:
+        settings.rerank_candidates = args.candidates
+    if args.mmr_lambda is not None:
+        settings.mmr_lambda = args.mmr_lambda
+    k = settings.retrieval_k
+
+    from qdrant_client import QdrantClient
+    with ExitStack() as stack:
+        stack.enter_context(registry.override("qdrant", QdrantClient(location=":memory:")))
+        if args.embeddings == "hashing":
+            stack.enter_context(registry.override("embeddings", HashingEmbeddings()))
+        queries = load_corpus(args.pages, args.copies)[:args.queries]
+
+        print(f"{len(queries)} queries, k={k}, candidates={settings.rerank_candidates}, "
+              f"mmr_lambda={settings.mmr_lambda}")
+        print(f"{'pipeline':<20} {'hit@k':>6} {'dup':>6} {'pages':>6} {'tokens':>7}"
+              f" {'p50 ms':>7} {'p95 ms':>7}  per stage")
+        for spec in [s.strip() for s in args.pipelines.split(",") if s.strip()]:
+            m = run(spec.replace("+", ","), queries, k)
+            if m is not None:
+                print(f"{spec:<20} {m['hit']:>6.3f} {m['dup']:>6.3f} {m['pages']:>6.2f}"
+                      f" {m['tokens']:>7.0f} {m['p50']:>7.2f} {m['p95']:>7.2f}  {m['stages']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
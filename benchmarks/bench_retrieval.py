@@ -0,0 +1,104 @@
+"""Recall@k and latency for dense-only, lexical-only and hybrid retrieval.
+
+Ingests ``data/sample.pdf`` into a throwaway local index and queries it.
+If the sample has no extractable text (the bundled file is a placeholder), a
+synthetic manual with part numbers and section titles is generated instead.
+
+    python benchmarks/bench_retrieval.py -k 4
+    python benchmarks/bench_retrieval.py --pdf my_manual.pdf --embedding-model sentence-transformers/all-MiniLM-L6-v2
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path[:0] = [ROOT, HERE]
+os.environ.setdefault("GROQ_API_KEY", "offline")
+os.environ.setdefault("OPENWEATHER_API_KEY", "offline")
+
+from langchain_core.documents import Document  # noqa: E402
+from settings import settings  # noqa: E402
+from resources import registry  # noqa: E402
+import rag  # noqa: E402
+import vectorstore  # noqa: E402
+from standins import HashingEmbeddings, synthetic_manual, write_text_pdf  # noqa: E402
+
+
+def _has_text(pdf_path: str) -> bool:
+    try:
+        from pypdf import PdfReader
+        return any(p.extract_text().strip() for p in PdfReader(pdf_path).pages)
+    except Exception:
+        return False
+
+
+def _evaluate(name: str, search: Callable[[str], List[Document]],
+              queries: List[Tuple[str, str]], k: int) -> Dict[str, float]:
+    hits, lat = 0, []
+    for query, needle in queries:
+        t0 = time.perf_counter()
+        docs = search(query)[:k]
+        lat.append(time.perf_counter() - t0)
+        hits += any(needle in d.page_content for d in docs)
+    ms = np.asarray(lat) * 1000
+    return {"mode": name, f"recall@{k}": hits / len(queries),
+            "p50_ms": float(np.percentile(ms, 50)), "p95_ms": float(np.percentile(ms, 95))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pdf", default=os.path.join(ROOT, "data", "sample.pdf"))
+    parser.add_argument("--pages", type=int, default=40, help="synthetic fallback size")
+    parser.add_argument("--embedding-model", default=None,
+                        help="HuggingFace model; default is an offline hashing stand-in")
+    parser.add_argument("-k", type=int, default=4)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_retrieval_")
+    settings.vector_backend = "local"
+    settings.local_index_dir = os.path.join(tmp, "index")
+    settings.lexical_index_dir = os.path.join(tmp, "lexical")
+    settings.ingest_manifest_dir = os.path.join(tmp, "manifests")
+    settings.retrieval_k = args.k
+
+    pdf_path, queries = args.pdf, None
+    if not _has_text(pdf_path):
+        pages, queries = synthetic_manual(args.pages)
+        pdf_path = os.path.join(tmp, "synthetic.pdf")
+        write_text_pdf(pdf_path, pages)
+        print(f"{args.pdf} has no text; using synthetic manual ({args.pages} pages)")
+    if queries is None:
+        parser.error("custom PDFs need labelled queries; only the synthetic set is built in")
+
+    if args.embedding_model:
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+        embeddings = HuggingFaceEmbeddings(model_name=args.embedding_model)
+    else:
+        embeddings = HashingEmbeddings()
+
+    with registry.override("embeddings", embeddings):
+        report = vectorstore.ingest_pdf_pipeline(pdf_path)
+        print(f"ingested {report.chunks} chunks in {report.seconds:.2f}s")
+        lexical = vectorstore.get_lexical_index()
+
+        def dense(q):
+            return vectorstore.get_vectorstore().similarity_search(q, k=args.k)
+
+        def lexical_only(q):
+            return vectorstore.fetch_documents([pid for pid, _ in lexical.search(q, args.k)])
+
+        def hybrid(q):
+            return rag.retrieve_docs(q, k=args.k)
+
+        for name, fn in [("dense", dense), ("lexical", lexical_only), ("hybrid", hybrid)]:
+            print(_evaluate(name, fn, queries, args.k))
+
+
+if __name__ == "__main__":
+    main()
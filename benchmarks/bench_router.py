@@ -0,0 +1,148 @@
+"""Routing accuracy, latency and LLM-fallback rate: keyword+LLM vs local classifier.
+
+The labelled queries below are disjoint from ``route_classifier.ROUTE_EXAMPLES``.
+With the offline ``GROQ_API_KEY`` the LLM is an oracle stub that returns the
+gold label after ``--llm-latency-ms``, so the baseline's accuracy is an upper
+bound; set a real key to measure the actual Groq router.
+
+    python benchmarks/bench_router.py
+    python benchmarks/bench_router.py --embedding-model sentence-transformers/all-MiniLM-L6-v2 --margin 0.03
+"""
+import argparse
+import os
+import sys
+import time
+import types
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path[:0] = [ROOT, HERE]
+os.environ.setdefault("GROQ_API_KEY", "offline")
+os.environ.setdefault("OPENWEATHER_API_KEY", "offline")
+
+from settings import settings  # noqa: E402
+from resources import registry  # noqa: E402
+from route_classifier import CentroidRouter  # noqa: E402
+import router  # noqa: E402
+from standins import HashingEmbeddings  # noqa: E402
+
+
+LABELLED: List[Tuple[str, str]] = [
+    ("weather in Hyderabad", "weather"),
+    ("Is it raining in Kolkata?", "weather"),
+    ("how humid is Chennai today", "weather"),
+    ("Will it be sunny in Rome this weekend?", "weather"),
+    ("Do I need a raincoat in Amsterdam?", "weather"),
+    ("Is it hot outside in Dubai?", "weather"),
+    ("How cold will it get in Oslo tonight?", "weather"),
+    ("Should I carry an umbrella in Mumbai tomorrow?", "weather"),
+    ("Any chance of snow in Zurich?", "weather"),
+    ("What's it like outside in Toronto right now?", "weather"),
+    ("Is there a thunderstorm in Houston?", "weather"),
+    ("Temperature in Cairo please", "weather"),
+    ("Is it freezing in Helsinki?", "weather"),
+    ("How sunny is Goa at the moment?", "weather"),
+    ("Wind speed in Wellington", "weather"),
+    ("Is it a good day for a picnic in Pune, weather-wise?", "weather"),
+    ("Summarize the uploaded PDF", "rag"),
+    ("What does chapter 4 say about maintenance?", "rag"),
+    ("List the error codes in the manual", "rag"),
+    ("Who wrote the document?", "rag"),
+    ("What are the conclusions of the report?", "rag"),
+    ("Explain the architecture diagram described in the paper", "rag"),
+    ("How do I replace the filter according to the guide?", "rag"),
+    ("What is the refund policy in the terms?", "rag"),
+    ("Give me the table of contents", "rag"),
+    ("What dataset was used in the experiments?", "rag"),
+    ("Describe the installation prerequisites", "rag"),
+    ("Which section covers calibration?", "rag"),
+    ("What does PN-4471 refer to?", "rag"),
+    ("Summarize the limitations discussed by the authors", "rag"),
+    ("What is the recommended torque for the bolts?", "rag"),
+    ("Explain the glossary entry for latency", "rag"),
+    ("How is the weather station sensor calibrated in the manual?", "rag"),
+    ("What does the document say about climate risk disclosure?", "rag"),
+]
+
+
+def _oracle_llm(latency_s: float) -> Callable:
+    gold = dict(LABELLED)
+
+    def llm(prompt):
+        time.sleep(latency_s)
+        query = prompt.to_string().rsplit("Query:", 1)[-1].strip()
+        return types.SimpleNamespace(content=gold.get(query, "rag"))
+
+    return llm
+
+
+def _evaluate(name: str, route: Callable[[str], Tuple[str, object]]) -> Dict[str, object]:
+    router.reset_route_stats()
+    correct, lat = 0, []
+    for query, label in LABELLED:
+        t0 = time.perf_counter()
+        got, _ = route(query)
+        lat.append(time.perf_counter() - t0)
+        correct += got == label
+    ms = np.asarray(lat) * 1000
+    sources = router.route_stats()
+    return {
+        "router": name,
+        "accuracy": correct / len(LABELLED),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "mean_ms": float(ms.mean()),
+        "llm_fallback_rate": sources["llm"] / len(LABELLED),
+        **{f"via_{k}": v for k, v in sources.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--embedding-model", default=None,
+                        help="HuggingFace model; default is an offline hashing stand-in")
+    parser.add_argument("--margin", type=float, default=settings.local_router_margin)
+    parser.add_argument("--llm-latency-ms", type=float, default=350.0,
+                        help="latency of the offline oracle LLM stub")
+    args = parser.parse_args()
+
+    if args.embedding_model:
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+        embeddings = HuggingFaceEmbeddings(model_name=args.embedding_model)
+    else:
+        embeddings = HashingEmbeddings()
+    settings.local_router_margin = args.margin
+
+    if settings.groq_api_key == "offline":
+        llm = _oracle_llm(args.llm_latency_ms / 1000)
+        router.get_llm = lambda *a, **k: llm
+
+    t0 = time.perf_counter()
+    classifier = CentroidRouter(embeddings)
+    build_ms = (time.perf_counter() - t0) * 1000
+    # Warm the query embeddings the way the semantic cache does before routing
+    for query, _ in LABELLED:
+        embeddings.embed_query(query)
+
+    rows = []
+    settings.local_router_enabled = False
+    rows.append(_evaluate("keyword+llm", router.route_query))
+    settings.local_router_enabled = True
+    with registry.override("route_classifier", classifier):
+        rows.append(_evaluate("keyword+local+llm", router.route_query))
+        rows.append(_evaluate("local only", lambda q: (classifier.classify(q)[0], None)))
+
+    print(f"{len(LABELLED)} labelled queries, margin {args.margin}, "
+          f"classifier built in {build_ms:.1f} ms")
+    header = list(rows[0])
+    print(" | ".join(f"{h:>17}" for h in header))
+    for row in rows:
+        print(" | ".join(f"{v:>17.3f}" if isinstance(v, float) else f"{v!s:>17}"
+                         for v in row.values()))
+
+
+if __name__ == "__main__":
+    main()
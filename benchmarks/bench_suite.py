@@ -0,0 +1,304 @@
+"""Offline benchmark suite: ingestion throughput, per-route query latency, concurrency scaling.
+
+Runs without network access against deterministic stand-ins:
+
+- LLM: ``OfflineChatModel`` behind the real scheduler, ``--llm-latency-ms`` per call
+- OpenWeatherMap: a local HTTP stub server (``OWMStubServer``), ``--owm-latency-ms``
+- Qdrant: in-process ``:memory:``
+- embeddings: ``EMBEDDING_MODEL`` (default), a tiny model (``--embeddings tiny``)
+  or feature hashing when no model files are available (``--embeddings hashing``)
+
+Results are written as JSON; with ``--baseline`` they are compared metric by
+metric and the run exits with status 1 if any got worse by more than
+``--threshold`` (relative).
+
+    python benchmarks/bench_suite.py --embeddings tiny --save-baseline benchmarks/baseline.json
+    python benchmarks/bench_suite.py --embeddings tiny --baseline benchmarks/baseline.json --out run.json
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import sys
+import tempfile
+import time
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path[:0] = [ROOT, HERE]
+os.environ.setdefault("GROQ_API_KEY", "offline")
+os.environ.setdefault("OPENWEATHER_API_KEY", "offline")
+
+from settings import settings  # noqa: E402
+from resources import registry  # noqa: E402
+from scheduler import LLMScheduler, ScheduledChatModel  # noqa: E402
+from standins import (HashingEmbeddings, OfflineChatModel, OWMStubServer,  # noqa: E402
+                      synthetic_manual, write_text_pdf)
+
+TINY_MODEL = "sentence-transformers/paraphrase-MiniLM-L3-v2"
+
+WEATHER_QUERIES = [
+    "weather in Pune",
+    "Should I carry an umbrella in Mumbai today?",
+    "how humid is Singapore",
+    "Is it raining in London and Paris?",
+    "temperature in Tokyo",
+    "Is it windy in Chicago right now?",
+]
+
+Metrics = Dict[str, Dict[str, Any]]
+
+
+def _metric(metrics: Metrics, name: str, value: float, better: str, unit: str = "") -> None:
+    metrics[name] = {"value": round(float(value), 4), "better": better, "unit": unit}
+
+
+def _latency(metrics: Metrics, prefix: str, seconds: List[float]) -> None:
+    ms = np.asarray(seconds) * 1000
+    for q in (50, 95, 99):
+        _metric(metrics, f"{prefix}.p{q}_ms", np.percentile(ms, q), "lower", "ms")
+
+
+# ---- environment ----
+
+def _setup(stack: ExitStack, args) -> OfflineChatModel:
+    """Point every external service at a local stand-in; returns the fake LLM."""
+    tmp = stack.enter_context(tempfile.TemporaryDirectory(prefix="bench_suite_"))
+    settings.vector_backend = "qdrant"
+    settings.qdrant_url = ":memory:"
+    settings.lexical_index_dir = os.path.join(tmp, "lexical")
+    settings.ingest_manifest_dir = os.path.join(tmp, "manifests")
+    # Measure the uncached paths; the answer cache would serve repeat queries
+    settings.embedding_cache_enabled = False
+    settings.semantic_cache_enabled = False
+
+    if args.embeddings == "hashing":
+        stack.enter_context(registry.override("embeddings", HashingEmbeddings()))
+        # Hashing vectors carry no meaning, so route with the stub LLM instead
+        settings.local_router_enabled = False
+    elif args.embeddings == "tiny":
+        settings.embedding_model = TINY_MODEL
+
+    owm = stack.enter_context(OWMStubServer(latency_ms=args.owm_latency_ms))
+    settings.openweather_url = owm.url
+
+    fake = OfflineChatModel(latency_ms=args.llm_latency_ms)
+    stack.enter_context(registry.override(
+        "llm_scheduler", LLMScheduler(max_concurrency=settings.llm_max_concurrency)))
+    stack.enter_context(registry.override("llm", ScheduledChatModel(inner=fake)))
+    return fake
+
+
+def _flush() -> None:
+    # Background interaction summaries must not leak into the next measurement
+    from interactions import interaction_writer
+    interaction_writer.wait_idle(settings.interaction_flush_timeout)
+
+
+# ---- phases ----
+
+def bench_ingestion(metrics: Metrics, tmp: str, sample_pdf: str,
+                    page_counts: List[int]) -> List[Tuple[str, str]]:
+    """Ingest ``sample_pdf`` and synthetic manuals; returns the RAG queries of the first manual."""
+    from vectorstore import ingest_pdf_pipeline
+
+    sources = [("sample", sample_pdf)]
+    rag_queries: List[Tuple[str, str]] = []
+    for n in page_counts:
+        pages, queries = synthetic_manual(n, seed=n)
+        path = os.path.join(tmp, f"synthetic_{n}.pdf")
+        write_text_pdf(path, pages)
+        sources.append((f"synthetic_{n}p", path))
+        rag_queries = rag_queries or queries
+
+    for name, path in sources:
+        try:
+            report = ingest_pdf_pipeline(path, source=f"{name}.pdf")
+        except Exception as exc:
+            # The bundled data/sample.pdf is only a placeholder
+            print(f"ingest {name:>16}: skipped, {path} did not parse ({type(exc).__name__})")
+            continue
+        _metric(metrics, f"ingest.{name}.seconds", report.seconds, "lower", "s")
+        _metric(metrics, f"ingest.{name}.chunks_per_s", report.chunks_per_sec, "higher", "chunks/s")
+        _metric(metrics, f"ingest.{name}.pages_per_s",
+                report.pages / report.seconds if report.seconds else 0.0, "higher", "pages/s")
+        print(f"ingest {name:>16}: {report.pages:>4} pages, {report.chunks:>5} chunks "
+              f"in {report.seconds:6.2f}s ({report.chunks_per_sec:7.1f} chunks/s)")
+    return rag_queries
+
+
+def bench_routes(metrics: Metrics, fake: OfflineChatModel, rag_queries: List[Tuple[str, str]],
+                 repeat: int) -> None:
+    """Latency distribution per route through the compiled graph."""
+    from graph import build_graph
+    from weather import weather_cache
+
+    graph = build_graph()
+    scenarios = {
+        # Cold weather cache: every query goes to the stub server
+        "weather": (WEATHER_QUERIES, "weather", True),
+        "rag": ([q for q, _ in rag_queries], "rag", False),
+    }
+    for route, (queries, expected, cold) in scenarios.items():
+        graph.invoke({"query": queries[0], "meta": {}})  # warm-up
+        lat, misrouted = [], 0
+        for i in range(repeat):
+            if cold:
+                weather_cache.clear()
+            t0 = time.perf_counter()
+            state = graph.invoke({"query": queries[i % len(queries)], "meta": {}})
+            lat.append(time.perf_counter() - t0)
+            misrouted += state.get("route") != expected
+        _latency(metrics, f"query.{route}", lat)
+        _metric(metrics, f"query.{route}.misrouted", misrouted / repeat, "lower")
+        _flush()
+
+    # Framework overhead: warm cache, template answer, zero-latency LLM
+    latency_ms, fake.latency_ms = fake.latency_ms, 0.0
+    try:
+        lat = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            graph.invoke({"query": "temperature in Pune", "meta": {}})
+            lat.append(time.perf_counter() - t0)
+        _latency(metrics, "query.overhead", lat)
+    finally:
+        fake.latency_ms = latency_ms
+    _flush()
+
+    for route in ("weather", "rag", "overhead"):
+        row = {k.rsplit(".", 1)[1]: v["value"] for k, v in metrics.items()
+               if k.startswith(f"query.{route}.p")}
+        print(f"query {route:>9}: " + "  ".join(f"{k} {v:8.2f}" for k, v in row.items()))
+
+
+def bench_concurrency(metrics: Metrics, rag_queries: List[Tuple[str, str]],
+                      levels: List[int], batch: int) -> None:
+    """Throughput of ``run_batch`` over a mixed workload at each concurrency level."""
+    from graph import run_batch
+    from weather import weather_cache
+
+    mix = [q for q, _ in rag_queries[:batch // 2]]
+    mix += [WEATHER_QUERIES[i % len(WEATHER_QUERIES)] for i in range(batch - len(mix))]
+    base_qps: Optional[float] = None
+    for level in levels:
+        weather_cache.clear()
+        t0 = time.perf_counter()
+        states = run_batch(mix, concurrency=level)
+        elapsed = time.perf_counter() - t0
+        qps = len(mix) / elapsed
+        base_qps = base_qps or qps
+        errors = sum(bool(s.get("error")) for s in states)
+        _metric(metrics, f"concurrency.c{level}.qps", qps, "higher", "queries/s")
+        _metric(metrics, f"concurrency.c{level}.speedup", qps / base_qps, "higher", "x")
+        print(f"concurrency {level:>3}: {qps:7.1f} queries/s ({qps / base_qps:4.1f}x), "
+              f"{errors} errors")
+        _flush()
+
+
+# ---- baseline comparison ----
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float,
+            min_delta_ms: float = 1.0, zero_tolerance: float = 1e-6) -> List[Dict[str, Any]]:
+    """One row per metric in both runs; ``regressed`` if it got worse by more
+    than ``threshold`` (relative). Millisecond metrics also need to move by at
+    least ``min_delta_ms`` to count, so sub-millisecond jitter is ignored.
+    From a zero baseline any change worse than ``zero_tolerance`` regresses."""
+    rows = []
+    for name, now in results["metrics"].items():
+        base = baseline.get("metrics", {}).get(name)
+        if base is None:
+            continue
+        b, v = base["value"], now["value"]
+        worse = (v - b) if now["better"] == "lower" else (b - v)
+        if b:
+            change = worse / abs(b)
+        else:
+            change = math.inf if worse > zero_tolerance else 0.0
+        regressed = change > threshold
+        if now.get("unit") == "ms" and abs(v - b) < min_delta_ms:
+            regressed = False
+        rows.append({"metric": name, "baseline": b, "value": v,
+                     "worse_by": round(change, 4), "regressed": regressed})
+    return rows
+
+
+def _print_comparison(rows: List[Dict[str, Any]], threshold: float) -> None:
+    print(f"\n{'metric':<36} {'baseline':>10} {'now':>10} {'worse by':>9}")
+    for r in rows:
+        flag = "  REGRESSION" if r["regressed"] else ""
+        print(f"{r['metric']:<36} {r['baseline']:>10.3f} {r['value']:>10.3f} "
+              f"{r['worse_by']:>+9.1%}{flag}")
+    bad = sum(r["regressed"] for r in rows)
+    print(f"{bad} of {len(rows)} metrics regressed by more than {threshold:.0%}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--embeddings", choices=["model", "tiny", "hashing"], default="model")
+    parser.add_argument("--llm-latency-ms", type=float, default=150.0)
+    parser.add_argument("--owm-latency-ms", type=float, default=40.0)
+    parser.add_argument("--pdf", default=os.path.join(ROOT, "data", "sample.pdf"),
+                        help="real document to measure ingestion on")
+    parser.add_argument("--pages", default="50,400",
+                        help="comma-separated sizes of the synthetic PDFs to ingest")
+    parser.add_argument("--repeat", type=int, default=30, help="queries per route")
+    parser.add_argument("--concurrency", default="1,2,4,8")
+    parser.add_argument("--batch", type=int, default=32, help="queries per concurrency run")
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--baseline", help="compare against this results JSON")
+    parser.add_argument("--save-baseline", help="write results JSON here as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="relative slow-down that counts as a regression")
+    args = parser.parse_args()
+
+    config = {k: getattr(args, k) for k in
+              ("embeddings", "pdf", "llm_latency_ms", "owm_latency_ms", "pages", "repeat",
+               "concurrency", "batch")}
+    metrics: Metrics = {}
+    with ExitStack() as stack:
+        fake = _setup(stack, args)
+        from tracing import tracer
+        tracer.reset()
+        tmp = stack.enter_context(tempfile.TemporaryDirectory(prefix="bench_suite_pdf_"))
+        rag_queries = bench_ingestion(metrics, tmp, args.pdf,
+                                      [int(n) for n in args.pages.split(",")])
+        bench_routes(metrics, fake, rag_queries, args.repeat)
+        bench_concurrency(metrics, rag_queries,
+                          [int(n) for n in args.concurrency.split(",")], args.batch)
+        spans = tracer.stats()
+
+    results = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "host": {"python": platform.python_version(), "machine": platform.machine(),
+                 "cpus": os.cpu_count()},
+        "config": config,
+        "metrics": metrics,
+        "spans": spans,
+    }
+    for path in (args.out, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+            print(f"wrote {path}")
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("config") != config:
+        print("warning: baseline was recorded with a different configuration:",
+              baseline.get("config"))
+    rows = compare(results, baseline, args.threshold)
+    _print_comparison(rows, args.threshold)
+    return 1 if any(r["regressed"] for r in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
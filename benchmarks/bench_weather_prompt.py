@@ -0,0 +1,95 @@
+"""Prompt tokens and summary latency: raw ``str(json)`` prompt vs compact record vs template.
+
+Tokens are counted like the RAG context (tiktoken, or the offline word
+count). Offline, the LLM is a stand-in whose latency grows with prompt size
+(``--base-ms`` + ``--per-token-ms`` per prompt token); set a real
+``GROQ_API_KEY`` to time Groq instead.
+
+    python benchmarks/bench_weather_prompt.py --runs 20
+"""
+import argparse
+import os
+import sys
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path[:0] = [ROOT, HERE]
+os.environ.setdefault("GROQ_API_KEY", "offline")
+os.environ.setdefault("OPENWEATHER_API_KEY", "offline")
+
+from langchain_core.prompts import ChatPromptTemplate  # noqa: E402
+from settings import settings  # noqa: E402
+from context import get_token_counter  # noqa: E402
+from llm import render_weather_prompt  # noqa: E402
+import weather  # noqa: E402
+from standins import LatencyModelLLM, owm_response  # noqa: E402
+
+# The prompt as it was before the compact record: the repr of the raw JSON
+RAW_TEMPLATE = ChatPromptTemplate.from_template(
+    "You are a helpful assistant. Summarize the current weather clearly and concisely.\n"
+    "User asked: {user_query}\n"
+    "Weather JSON:\n{weather_json}\n"
+    "Return a user-friendly, actionable summary in 3-6 sentences, with °C and any alerts."
+)
+
+QUERIES = {
+    "overview": ("weather in Pune", {"Pune": owm_response("Pune")}),
+    "fact": ("temperature in Pune", {"Pune": owm_response("Pune")}),
+    "two cities": ("compare the weather in Pune and Mumbai",
+                   {"Pune": owm_response("Pune"), "Mumbai": owm_response("Mumbai", 1275339)}),
+}
+
+
+def _single(by_city: Dict) -> Dict:
+    return next(iter(by_city.values())) if len(by_city) == 1 else by_city
+
+
+def _timed(fn: Callable[[], object], runs: int) -> List[float]:
+    out = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        out.append((time.perf_counter() - t0) * 1000)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--base-ms", type=float, default=150.0)
+    parser.add_argument("--per-token-ms", type=float, default=0.4)
+    args = parser.parse_args()
+
+    count = get_token_counter()
+    if settings.groq_api_key == "offline":
+        llm = LatencyModelLLM(count, args.base_ms, args.per_token_ms)
+        weather.get_llm = lambda: llm
+    llm = weather.get_llm()
+
+    print(f"{'query':>11} | {'raw tok':>7} | {'compact tok':>11} | {'saved':>6} | "
+          f"{'raw ms':>7} | {'compact ms':>10} | {'auto ms':>8} | auto path")
+    for name, (query, by_city) in QUERIES.items():
+        data = _single(by_city)
+        raw_prompt = RAW_TEMPLATE.partial(weather_json=str(data), user_query=query)
+        compact_prompt = render_weather_prompt(weather.compact_weather(data), query)
+        raw_tokens = count(raw_prompt.invoke({}).to_string())
+        compact_tokens = count(compact_prompt.invoke({}).to_string())
+
+        raw_ms = _timed(lambda: (raw_prompt | llm).invoke({}), args.runs)
+        settings.weather_summary_mode = "llm"
+        compact_ms = _timed(lambda: weather.summarize_weather(query, data), args.runs)
+        settings.weather_summary_mode = "auto"
+        auto_ms = _timed(lambda: weather.summarize_weather(query, data), args.runs)
+        path = "template" if weather.template_summary(query, data) is not None else "llm"
+
+        print(f"{name:>11} | {raw_tokens:>7} | {compact_tokens:>11} | "
+              f"{1 - compact_tokens / raw_tokens:>6.0%} | {np.median(raw_ms):>7.1f} | "
+              f"{np.median(compact_ms):>10.1f} | {np.median(auto_ms):>8.2f} | {path}")
+
+
+if __name__ == "__main__":
+    main()
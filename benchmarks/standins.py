@@ -0,0 +1,304 @@
+"""Deterministic, offline stand-ins shared by the benchmarks."""
+import hashlib
+import itertools
+import json
+import random
+import re
+import threading
+import time
+import types
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+
+class HashingEmbeddings(Embeddings):
+    """Bag-of-words feature hashing; no model download, stable across runs."""
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def _embed(self, text: str) -> List[float]:
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for tok in re.findall(r"[a-z0-9]+(?:-[a-z0-9]+)*", text.lower()):
+            h = int.from_bytes(hashlib.blake2b(tok.encode(), digest_size=8).digest(), "little")
+            vec[h % self.dim] += 1.0 if (h >> 63) else -1.0
+        norm = np.linalg.norm(vec)
+        return (vec / norm if norm else vec).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_text_pdf(path: str, pages: Sequence[str], width: int = 95) -> None:
+    """Write a minimal multi-page PDF (Helvetica, one text line per row)
+    that pypdf can extract text from."""
+    objects: List[bytes] = []
+    page_ids: List[int] = []
+    font_id = 3
+    objects.append(b"")  # 1: catalog, filled below
+    objects.append(b"")  # 2: pages, filled below
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    for text in pages:
+        lines: List[str] = []
+        for para in text.split("\n"):
+            words, line = para.split(), ""
+            for w in words:
+                if len(line) + len(w) + 1 > width:
+                    lines.append(line)
+                    line = w
+                else:
+                    line = f"{line} {w}".strip()
+            lines.append(line)
+        ops = ["BT", "/F1 9 Tf", "11 TL", "40 800 Td"]
+        ops += [f"({_pdf_escape(line)}) Tj T*" for line in lines[:70]]
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1", "replace")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append((
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {content_id} 0 R >>"
+        ).encode())
+        page_ids.append(len(objects))
+    kids = " ".join(f"{i} 0 R" for i in page_ids)
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[1] = f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for off in offsets:
+        out += b"%010d 00000 n \n" % off
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+_TOPICS = ["pump", "valve", "filter", "compressor", "sensor", "bearing",
+           "gasket", "motor", "controller", "coupling"]
+_VERBS = ["inspect", "replace", "lubricate", "calibrate", "tighten", "clean"]
+_ACRONYMS = ["PLC", "VFD", "HMI", "RTD", "PID", "SCADA"]
+
+
+def synthetic_manual(n_pages: int, seed: int = 0) -> Tuple[List[str], List[Tuple[str, str]]]:
+    """Pages of a fake equipment manual plus ``(query, needle)`` pairs,
+    where ``needle`` is a string found only in the relevant chunk(s)."""
+    rng = random.Random(seed)
+    pages: List[str] = []
+    queries: List[Tuple[str, str]] = []
+    for p in range(n_pages):
+        paras = []
+        for s in range(4):
+            topic = rng.choice(_TOPICS)
+            part = f"PN-{rng.randint(1000, 9999)}-{rng.choice('ABCDEFGH')}{rng.choice('KLMNPQRS')}"
+            acr = rng.choice(_ACRONYMS)
+            title = f"Section {p + 1}.{s + 1} {topic.title()} service"
+            body = " ".join(
+                f"{rng.choice(_VERBS).title()} the {topic} every {rng.randint(2, 48)} hours "
+                f"and log the reading on the {acr} panel."
+                for _ in range(rng.randint(3, 6)))
+            paras.append(f"{title}\nUse replacement part {part} for the {topic}. {body}")
+            queries.append((f"Which component uses part {part}?", part))
+            if s == 0:
+                queries.append((f"What does {title.split(' ', 2)[2].lower()} in section {p + 1}.{s + 1} cover?",
+                                f"Section {p + 1}.{s + 1} "))
+        pages.append("\n".join(paras))
+    return pages, queries
+
+
+def owm_response(city: str = "Pune", city_id: int = 1259229, seed: int = 0) -> Dict[str, Any]:
+    """A full-size OpenWeatherMap /data/2.5/weather response."""
+    rng = random.Random(f"{city}-{seed}")
+    temp = round(rng.uniform(5, 35), 2)
+    return {
+        "coord": {"lon": round(rng.uniform(-180, 180), 4), "lat": round(rng.uniform(-60, 60), 4)},
+        "weather": [{"id": 500, "main": "Rain", "description": "light rain", "icon": "10d"}],
+        "base": "stations",
+        "main": {"temp": temp, "feels_like": round(temp + rng.uniform(-3, 3), 2),
+                 "temp_min": round(temp - 2, 2), "temp_max": round(temp + 2, 2),
+                 "pressure": rng.randint(995, 1025), "humidity": rng.randint(30, 95),
+                 "sea_level": 1010, "grnd_level": 950},
+        "visibility": 10000,
+        "wind": {"speed": round(rng.uniform(0, 12), 2), "deg": rng.randint(0, 359),
+                 "gust": round(rng.uniform(0, 18), 2)},
+        "rain": {"1h": round(rng.uniform(0, 3), 2)},
+        "clouds": {"all": rng.randint(0, 100)},
+        "dt": 1718000000,
+        "sys": {"type": 2, "id": 2040000 + seed, "country": "IN",
+                "sunrise": 1717977000, "sunset": 1718024000},
+        "timezone": 19800, "id": city_id, "name": city, "cod": 200,
+    }
+
+
+class LatencyModelLLM:
+    """Callable LLM stand-in: sleeps ``base_ms + per_token_ms * prompt_tokens``."""
+
+    def __init__(self, count_tokens: Callable[[str], int], base_ms: float = 150.0,
+                 per_token_ms: float = 0.4, reply: str = "Light rain, about 27°C."):
+        self.count_tokens = count_tokens
+        self.base_ms = base_ms
+        self.per_token_ms = per_token_ms
+        self.reply = reply
+        self.calls = 0
+
+    def __call__(self, prompt) -> Any:
+        self.calls += 1
+        tokens = self.count_tokens(prompt.to_string())
+        time.sleep((self.base_ms + self.per_token_ms * tokens) / 1000)
+        return types.SimpleNamespace(content=self.reply)
+
+
+_WEATHERISH = re.compile(
+    r"\b(weather|rain\w*|sunny|hot|cold|humid\w*|wind\w*|umbrella|snow\w*|forecast|temperature)\b", re.I)
+
+
+class OfflineChatModel(BaseChatModel):
+    """Deterministic, prompt-aware stand-in for the Groq chat model.
+
+    Answers the repo's prompts plausibly: routing prompts get a keyword
+    label, RAG prompts the first context line, weather prompts the compact
+    record, summary prompts a truncated answer. ``latency_ms`` simulates
+    the network/inference time of each call; with ``rate_limit_every`` set,
+    every n-th call fails like a Groq 429 carrying ``retry_after`` seconds.
+    """
+
+    latency_ms: float = 0.0
+    rate_limit_every: int = 0
+    retry_after: Optional[float] = None
+    _calls: Any = PrivateAttr(default_factory=itertools.count)
+
+    @property
+    def _llm_type(self) -> str:
+        return "offline-stub"
+
+    @staticmethod
+    def _after(text: str, marker: str) -> str:
+        tail = text.split(marker, 1)[1] if marker in text else text
+        return next((line.strip() for line in tail.splitlines() if line.strip()), "")
+
+    def reply(self, prompt: str) -> str:
+        if "Classify the user query" in prompt:
+            return "weather" if _WEATHERISH.search(prompt.rsplit("Query:", 1)[-1]) else "rag"
+        if "Context:" in prompt:
+            return self._after(prompt, "Context:")[:300] or "I could not find that in the document."
+        if "Weather:" in prompt:
+            return "Current conditions: " + self._after(prompt, "Weather:")
+        if "Summarize the following response" in prompt:
+            return self._after(prompt, "retrieval:")[:200]
+        return prompt[-200:]
+
+    def _call(self, messages: List[BaseMessage]) -> str:
+        n = next(self._calls) + 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        if self.rate_limit_every and n % self.rate_limit_every == 0:
+            raise RateLimited(self.retry_after)
+        return self.reply(str(messages[-1].content))
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None,
+                  **kwargs: Any) -> ChatResult:
+        content = self._call(messages)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+    def _stream(self, messages: List[BaseMessage], stop=None, run_manager=None,
+                **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        for word in re.findall(r"\S+\s*", self._call(messages)):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word))
+
+
+class RateLimited(Exception):
+    """Shaped like ``groq.RateLimitError``: status 429 with a ``Retry-After`` header."""
+
+    status_code = 429
+
+    def __init__(self, retry_after: Optional[float] = None):
+        super().__init__("Error code: 429 - rate limit reached")
+        headers = {} if retry_after is None else {"retry-after": str(retry_after)}
+        self.response = types.SimpleNamespace(status_code=429, headers=headers)
+
+
+class FakeOWMSession:
+    """``requests.Session`` stand-in answering OpenWeatherMap calls from :func:`owm_response`."""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self.calls: List[Dict[str, Any]] = []
+
+    def get(self, url: str, params: Dict[str, Any] = None, timeout: float = None):
+        params = params or {}
+        self.calls.append(params)
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        city = str(params.get("q") or params.get("id"))
+        data = owm_response(city.title(), int(params.get("id") or 0))
+        return types.SimpleNamespace(raise_for_status=lambda: None, json=lambda: data)
+
+
+class OWMStubServer:
+    """Local HTTP server answering ``/data/2.5/weather`` like OpenWeatherMap.
+
+    Use as a context manager and point ``settings.openweather_url`` at
+    :attr:`url`; each response is delayed by ``latency_ms``.
+    """
+
+    def __init__(self, latency_ms: float = 0.0, host: str = "127.0.0.1", port: int = 0):
+        stub = self
+        self.latency_ms = latency_ms
+        self.requests = 0
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                parsed = urllib.parse.urlparse(self.path)
+                params = dict(urllib.parse.parse_qsl(parsed.query))
+                stub.requests += 1
+                if stub.latency_ms:
+                    time.sleep(stub.latency_ms / 1000)
+                if parsed.path != "/data/2.5/weather":
+                    self.send_error(404)
+                    return
+                if not params.get("appid"):
+                    self.send_error(401, "Invalid API key")
+                    return
+                city = params.get("q") or f"City {params.get('id')}"
+                body = json.dumps(owm_response(city.title(), int(params.get("id") or 0))).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        host, port = self._server.server_address[:2]
+        self.url = f"http://{host}:{port}/data/2.5/weather"
+
+    def __enter__(self) -> "OWMStubServer":
+        threading.Thread(target=self._server.serve_forever, name="owm-stub", daemon=True).start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._server.shutdown()
+        self._server.server_close()
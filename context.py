@@ -0,0 +1,180 @@
+"""Token-budgeted context packing for RAG prompts.
+
+Retrieved chunks are taken in relevance order until
+``settings.context_token_budget`` is spent:
+
+- text a chunk shares with an already selected chunk of the same page (the
+  ``chunk_overlap`` region of adjacent chunks) is dropped, and the remainder
+  is attached directly before/after that chunk so the passage reads through;
+- a chunk that no longer fits is cut at the last sentence end that does, and
+  smaller lower-ranked chunks may still fill what is left.
+
+Chunks are tracked as ``(text, start, end)`` spans and joined once at the
+end. Tokens are counted with ``tiktoken`` (``settings.context_encoding``),
+which approximates the Groq model's tokenizer; without the encoding files
+(offline) a word/punctuation count is used instead.
+"""
+import re
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+from settings import settings
+from resources import registry
+from tracing import tracer
+
+SEPARATOR = "\n\n"
+_MIN_OVERLAP = 16  # shorter shared text is left alone
+_SENTENCE_END = re.compile(r"[.!?](?=\s|$)")
+_APPROX_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+Span = List  # [text, start, end]
+
+
+@dataclass
+class PackedContext:
+    text: str
+    tokens: int
+    raw_tokens: int          # all retrieved chunks, untrimmed
+    overlap_tokens: int      # removed as duplicated between chunks
+    dropped_tokens: int      # left out for lack of budget
+    docs_used: int
+    docs_total: int
+
+    @property
+    def saved_tokens(self) -> int:
+        return max(self.raw_tokens - self.tokens, 0)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "context_tokens": self.tokens,
+            "context_tokens_saved": self.saved_tokens,
+            "context_overlap_tokens": self.overlap_tokens,
+            "context_dropped_tokens": self.dropped_tokens,
+            "context_docs": self.docs_used,
+        }
+
+
+def _approx_tokens(text: str) -> int:
+    return len(_APPROX_TOKEN.findall(text))
+
+
+def _load_counter() -> Callable[[str], int]:
+    try:
+        import tiktoken
+        enc = tiktoken.get_encoding(settings.context_encoding)
+    except Exception:
+        return _approx_tokens
+    return lambda text: len(enc.encode(text, disallowed_special=()))
+
+
+def get_token_counter() -> Callable[[str], int]:
+    """Shared ``text -> token count`` function."""
+    return registry.get("tokenizer", settings.context_encoding, _load_counter)
+
+
+def _suffix_prefix_overlap(a: str, a_start: int, a_end: int,
+                           b: str, b_start: int, b_end: int) -> int:
+    """Length of the longest suffix of ``a[a_start:a_end]`` that starts ``b[b_start:b_end]``."""
+    if b_end - b_start < _MIN_OVERLAP:
+        return 0
+    window = max(a_start, a_end - max(settings.chunk_overlap, _MIN_OVERLAP))
+    probe = b[b_start:b_start + _MIN_OVERLAP]
+    i = a.find(probe, window, a_end)
+    while i != -1:
+        n = a_end - i
+        if n <= b_end - b_start and b.startswith(a[i:a_end], b_start):
+            return n
+        i = a.find(probe, i + 1, a_end)
+    return 0
+
+
+def _group(doc: Document) -> Tuple[object, object]:
+    # Chunks are split per page, so only chunks of one page can overlap
+    return doc.metadata.get("source"), doc.metadata.get("page")
+
+
+def _sentence_prefix(text: str, start: int, end: int, budget: int,
+                     count: Callable[[str], int]) -> Tuple[int, int]:
+    """End offset and token count of the longest whole-sentence prefix within ``budget``."""
+    cut, used = start, 0
+    for m in _SENTENCE_END.finditer(text, start, end):
+        tokens = count(text[cut:m.end()])
+        if used + tokens > budget:
+            break
+        cut, used = m.end(), used + tokens
+    return cut, used
+
+
+def build_context(docs: Sequence[Document], budget: Optional[int] = None) -> PackedContext:
+    """Pack ``docs`` (most relevant first) into at most ``budget`` tokens."""
+    budget = settings.context_token_budget if budget is None else budget
+    started = time.perf_counter()
+    count = get_token_counter()
+    sep_tokens = count(SEPARATOR)
+
+    blocks: List[List[Span]] = []
+    by_group: Dict[Tuple[object, object], List[Tuple[Span, List[Span]]]] = {}
+    used = raw = overlap = dropped = docs_used = 0
+
+    for doc in docs:
+        text = doc.page_content
+        full_tokens = count(text)
+        raw += full_tokens
+        start, end = 0, len(text)
+        anchor: Optional[Tuple[Span, List[Span], bool]] = None  # (span, block, after)
+
+        siblings = by_group.setdefault(_group(doc), [])
+        best = 0
+        for span, block in siblings:
+            a, a_start, a_end = span
+            if a.find(text, a_start, a_end) != -1:
+                start, anchor = end, None  # fully contained in a selected chunk
+                break
+            # Keep the longest overlap; short ones can be repeated phrases
+            n = _suffix_prefix_overlap(a, a_start, a_end, text, 0, len(text))
+            if n > best:
+                best, start, end, anchor = n, n, len(text), (span, block, True)
+            n = _suffix_prefix_overlap(text, 0, len(text), a, a_start, a_end)
+            if n > best:
+                best, start, end, anchor = n, 0, len(text) - n, (span, block, False)
+
+        if start >= end:
+            overlap += full_tokens
+            continue
+        tokens = full_tokens if (start, end) == (0, len(text)) else count(text[start:end])
+        overlap += full_tokens - tokens
+
+        sep = 0 if anchor or not blocks else sep_tokens
+        if used + sep + tokens > budget:
+            if anchor is not None and not anchor[2]:
+                # A cut chunk no longer leads into the one it preceded
+                anchor, sep = None, (sep_tokens if blocks else 0)
+            cut, fit = _sentence_prefix(text, start, end, budget - used - sep, count)
+            if cut == start:
+                dropped += tokens
+                continue
+            dropped += max(tokens - fit, 0)
+            end, tokens = cut, fit
+
+        span: Span = [text, start, end]
+        if anchor is None:
+            block = [span]
+            blocks.append(block)
+        else:
+            other, block, after = anchor
+            i = next(j for j, s in enumerate(block) if s is other)
+            block.insert(i + 1 if after else i, span)
+        siblings.append((span, block))
+        used += sep + tokens
+        docs_used += 1
+
+    joined = SEPARATOR.join("".join(t[s:e] for t, s, e in block) for block in blocks)
+    tracer.record("context.pack", time.perf_counter() - started, tokens=used, docs=docs_used)
+    return PackedContext(
+        text=joined, tokens=used, raw_tokens=raw + sep_tokens * max(len(docs) - 1, 0),
+        overlap_tokens=overlap, dropped_tokens=dropped,
+        docs_used=docs_used, docs_total=len(docs),
+    )
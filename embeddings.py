@@ -1,7 +1,227 @@
-from typing import Optional
-from langchain_community.embeddings import HuggingFaceEmbeddings
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
 from settings import settings
+from resources import registry
+from tracing import span
+
+
+def _text_key(model_name: str, text: str) -> str:
+    # Whitespace differences don't change the tokenized input, so collapse
+    # them to let trivially different queries share a cache entry.
+    normalized = re.sub(r"\s+", " ", text).strip()
+    return hashlib.sha1(f"{model_name}\x00{normalized}".encode("utf-8")).hexdigest()
+
+
+class _DiskTier:
+    """Append-only on-disk vector store: a float32 memmap plus a key log.
+
+    Row ``i`` of ``vectors.f32`` belongs to line ``i`` of ``keys.txt``. The
+    vector is written before its key, so a crash never leaves a key pointing
+    at garbage.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._vec_path = os.path.join(directory, "vectors.f32")
+        self._key_path = os.path.join(directory, "keys.txt")
+        self._dim_path = os.path.join(directory, "dim")
+        self.index: Dict[str, int] = {}
+        self.dim: Optional[int] = None
+        self._mm: Optional[np.memmap] = None
+        self._capacity = 0
+
+        if os.path.exists(self._dim_path) and os.path.exists(self._key_path):
+            with open(self._dim_path) as f:
+                self.dim = int(f.read().strip())
+            with open(self._key_path) as f:
+                for row, line in enumerate(f):
+                    self.index[line.rstrip("\n")] = row
+            self._open(max(len(self.index), 1))
+
+    def _open(self, min_rows: int) -> None:
+        assert self.dim is not None
+        row_bytes = self.dim * 4
+        size = os.path.getsize(self._vec_path) if os.path.exists(self._vec_path) else 0
+        capacity = size // row_bytes
+        if capacity < min_rows:
+            capacity = max(min_rows, capacity * 2, 1024)
+            with open(self._vec_path, "ab") as f:
+                f.truncate(capacity * row_bytes)
+        self._mm = None
+        self._mm = np.memmap(self._vec_path, dtype=np.float32, mode="r+",
+                             shape=(capacity, self.dim))
+        self._capacity = capacity
+
+    def get(self, key: str) -> Optional[List[float]]:
+        row = self.index.get(key)
+        if row is None or self._mm is None:
+            return None
+        return self._mm[row].tolist()
+
+    def put_many(self, items: List[Tuple[str, List[float]]]) -> None:
+        items = [(k, v) for k, v in items if k not in self.index]
+        if not items:
+            return
+        if self.dim is None:
+            self.dim = len(items[0][1])
+            with open(self._dim_path, "w") as f:
+                f.write(str(self.dim))
+        start = len(self.index)
+        if self._mm is None or start + len(items) > self._capacity:
+            self._open(start + len(items))
+        assert self._mm is not None
+        self._mm[start:start + len(items)] = np.asarray(
+            [v for _, v in items], dtype=np.float32)
+        self._mm.flush()
+        with open(self._key_path, "a") as f:
+            for offset, (key, _) in enumerate(items):
+                f.write(key + "\n")
+                self.index[key] = start + offset
+
+
+class CachedEmbeddings(Embeddings):
+    """Drop-in embeddings wrapper with an LRU memory tier and a disk tier.
+
+    Entries are keyed by model name plus a hash of the text, so switching
+    models never serves stale vectors. Only cache misses reach the wrapped
+    model, and they are embedded together in a single batch.
+    """
+
+    def __init__(self, base: Embeddings, model_name: str,
+                 max_entries: int = 4096, cache_dir: Optional[str] = None):
+        self.base = base
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk: Optional[_DiskTier] = None
+        if cache_dir:
+            safe = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+            self._disk = _DiskTier(os.path.join(cache_dir, safe))
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
 
-def get_embeddings() -> HuggingFaceEmbeddings:
+    def __getattr__(self, name):
+        # Keep wrapped-model attributes (e.g. ``.client``) reachable.
+        if name == "base":
+            raise AttributeError(name)
+        return getattr(self.base, name)
+
+    def _lookup(self, key: str) -> Optional[List[float]]:
+        vec = self._memory.get(key)
+        if vec is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            return vec
+        if self._disk is not None:
+            vec = self._disk.get(key)
+            if vec is not None:
+                self.disk_hits += 1
+                self._remember(key, vec)
+                return vec
+        return None
+
+    def _remember(self, key: str, vec: List[float]) -> None:
+        self._memory[key] = vec
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [_text_key(self.model_name, t) for t in texts]
+        out: List[Optional[List[float]]] = [None] * len(texts)
+        pending: Dict[str, List[int]] = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                if key in pending:
+                    pending[key].append(i)
+                    continue
+                vec = self._lookup(key)
+                if vec is None:
+                    pending[key] = [i]
+                else:
+                    out[i] = vec
+
+        if pending:
+            miss_keys = list(pending)
+            with span("embed.model", texts=len(miss_keys)):
+                vectors = self.base.embed_documents(
+                    [texts[pending[k][0]] for k in miss_keys])
+            with self._lock:
+                self.misses += len(miss_keys)
+                for key, vec in zip(miss_keys, vectors):
+                    self._remember(key, vec)
+                    for i in pending[key]:
+                        out[i] = vec
+                if self._disk is not None:
+                    self._disk.put_many(list(zip(miss_keys, vectors)))
+        return out  # type: ignore[return-value]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = _text_key(self.model_name, text)
+        with self._lock:
+            vec = self._lookup(key)
+        if vec is not None:
+            return vec
+        with span("embed.model", texts=1):
+            vec = self.base.embed_query(text)
+        with self._lock:
+            self.misses += 1
+            self._remember(key, vec)
+            if self._disk is not None:
+                self._disk.put_many([(key, vec)])
+        return vec
+
+    def stats(self) -> Dict[str, float]:
+        hits = self.memory_hits + self.disk_hits
+        total = hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "memory_entries": len(self._memory),
+            "disk_entries": len(self._disk.index) if self._disk else 0,
+            "hit_rate": hits / total if total else 0.0,
+        }
+
+
+def embedding_dimension(embeddings: Embeddings) -> int:
+    """Vector size produced by ``embeddings``."""
+    client = getattr(embeddings, "client", None)
+    if client is not None and hasattr(client, "get_sentence_embedding_dimension"):
+        return int(client.get_sentence_embedding_dimension())
+    # Generic providers: probe once (cheap with the cache above)
+    return len(embeddings.embed_query("dimension probe"))
+
+
+def get_embeddings() -> Embeddings:
     # You can swap this for other providers if desired.
-    return HuggingFaceEmbeddings(model_name=settings.embedding_model)
+    # The model is loaded once per process and shared (see resources.py);
+    # vectors are cached in memory and on disk (see CachedEmbeddings).
+    model_name = settings.embedding_model
+
+    def _build() -> Embeddings:
+        # Pulls in sentence-transformers/torch, so only on first use
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+        base = HuggingFaceEmbeddings(model_name=model_name)
+        if not settings.embedding_cache_enabled:
+            return base
+        return CachedEmbeddings(
+            base, model_name,
+            max_entries=settings.embedding_cache_size,
+            cache_dir=settings.embedding_cache_dir or None,
+        )
+
+    return registry.get("embeddings", model_name, _build)
+
+
+registry.register_warmer("embeddings", get_embeddings)
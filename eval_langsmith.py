@@ -2,28 +2,149 @@
 
 - Requires LANGSMITH_API_KEY and tracing enabled.
 - Compares model answers against simple expected references using LLM-as-judge.
+- All answers are produced up front with one ``graph.run_batch`` call.
+- ``--offline`` runs without any service: stub LLM, stub OpenWeatherMap,
+  a throwaway local vector index and local checks instead of LangSmith.
+
+    python eval_langsmith.py
+    python eval_langsmith.py --offline --concurrency 8
 """
+import argparse
 import os
-from typing import Dict
+import sys
+import tempfile
+import time
+from contextlib import ExitStack
+from typing import Dict, List
 from dotenv import load_dotenv
 load_dotenv()
 
-from langsmith import Client
-from langsmith.evaluation import evaluate, LangChainStringEvaluator
-from llm import get_llm
-from graph import build_graph
+from settings import settings
+from graph import build_graph, run_batch
+from interactions import interaction_writer
+from scheduler import get_scheduler
+
+DATASET = [
+    {"input": "What's the weather in London right now?", "route": "weather"},
+    {"input": "Summarize the PDF's main contribution.", "route": "rag"},
+]
+
 
 def task_runner(example: Dict) -> str:
-    graph = build_graph()
-    out = graph.invoke({"query": example["input"], "meta": {}})
+    """Single-example runner (one graph walk); kept for ad-hoc use."""
+    out = build_graph().invoke({"query": example["input"], "meta": {}})
     return out.get("answer", "")
 
+
+def batch_answers(dataset: List[Dict], concurrency: int = None) -> Dict[str, Dict]:
+    """Final graph state per input, computed in one batch."""
+    inputs = [ex["input"] for ex in dataset]
+    return dict(zip(inputs, run_batch(inputs, concurrency=concurrency)))
+
+
+def _offline_setup(stack: ExitStack) -> List[Dict]:
+    """Swap every external service for a local stand-in; returns the dataset."""
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+    from standins import (FakeOWMSession, HashingEmbeddings, OfflineChatModel,
+                          synthetic_manual, write_text_pdf)
+    from resources import registry
+    from scheduler import LLMScheduler, ScheduledChatModel
+    from vectorstore import ingest_pdf_to_qdrant
+
+    tmp = tempfile.mkdtemp(prefix="eval_offline_")
+    settings.vector_backend = "local"
+    settings.local_index_dir = os.path.join(tmp, "index")
+    settings.lexical_index_dir = os.path.join(tmp, "lexical")
+    settings.ingest_manifest_dir = os.path.join(tmp, "manifests")
+    settings.embedding_cache_dir = None
+    # Hashing embeddings carry no meaning, so route with the stub LLM instead
+    settings.local_router_enabled = False
+    stack.enter_context(registry.override("embeddings", HashingEmbeddings()))
+    # The stub goes through a scheduler of its own, without Groq's rate limits
+    stack.enter_context(registry.override(
+        "llm_scheduler", LLMScheduler(max_concurrency=settings.llm_max_concurrency)))
+    stack.enter_context(registry.override(
+        "llm", ScheduledChatModel(inner=OfflineChatModel(latency_ms=50))))
+    stack.enter_context(registry.override("http", FakeOWMSession(latency_ms=30)))
+
+    pages, queries = synthetic_manual(6)
+    pdf_path = os.path.join(tmp, "manual.pdf")
+    write_text_pdf(pdf_path, pages)
+    ingest_pdf_to_qdrant(pdf_path, source="manual.pdf")
+
+    doc_questions = [{"input": q, "route": "rag", "needle": needle} for q, needle in queries[:12]]
+    weather_questions = [{"input": q, "route": "weather"} for q in [
+        "What's the weather in London right now?", "weather in London",
+        "temperature in Pune", "Is it raining in Mumbai and Pune?",
+        "how humid is Singapore", "weather in Tokyo",
+    ]]
+    return weather_questions + doc_questions
+
+
+def _offline_report(dataset: List[Dict], concurrency: int, sequential: bool) -> None:
+    t0 = time.perf_counter()
+    if sequential:
+        graph = build_graph()
+        states = {}
+        for ex in dataset:
+            try:
+                states[ex["input"]] = graph.invoke({"query": ex["input"], "meta": {}})
+            except Exception as exc:
+                states[ex["input"]] = {"error": str(exc)}
+    else:
+        states = batch_answers(dataset, concurrency)
+    elapsed = time.perf_counter() - t0
+
+    route_ok = answered = found = needles = 0
+    for ex in dataset:
+        state = states[ex["input"]]
+        route_ok += state.get("route") == ex["route"]
+        answered += bool(state.get("answer")) and not state.get("error")
+        if "needle" in ex:
+            needles += 1
+            found += any(ex["needle"] in d.page_content for d in state.get("docs") or [])
+    n = len(dataset)
+    mode = "sequential" if sequential else f"batch (concurrency {concurrency})"
+    print(f"{n} examples, {mode}: {elapsed:.2f}s")
+    print(f"route accuracy {route_ok / n:.0%} · answered {answered / n:.0%} · "
+          f"retrieval hit {found}/{needles}")
+    sched = get_scheduler().stats()
+    print(f"LLM calls {sched['completed']} · queue wait p95 {sched['wait_ms_p95']} ms · "
+          f"max queue depth {sched['max_queue_depth']}")
+
+
 def main():
-    # Create a tiny inline dataset
-    dataset = [
-        {"input": "What's the weather in London right now?"},
-        {"input": "Summarize the PDF's main contribution."},
-    ]
+    parser = argparse.ArgumentParser(description="Evaluate the assistant")
+    parser.add_argument("--offline", action="store_true",
+                        help="stub LLM, weather and vector backends; no LangSmith")
+    parser.add_argument("--concurrency", type=int, default=None,
+                        help="default: BATCH_CONCURRENCY")
+    parser.add_argument("--sequential", action="store_true",
+                        help="offline only: walk the graph once per example for comparison")
+    args = parser.parse_args()
+    if args.offline:
+        # Settings are resolved on first use, so stand-in keys still apply
+        os.environ.setdefault("GROQ_API_KEY", "offline")
+        os.environ.setdefault("OPENWEATHER_API_KEY", "offline")
+    args.concurrency = args.concurrency or settings.batch_concurrency
+
+    if args.offline:
+        with ExitStack() as stack:
+            dataset = _offline_setup(stack)
+            _offline_report(dataset, args.concurrency, args.sequential)
+            # Stored interactions must be written while the stand-ins are active
+            interaction_writer.wait_idle(settings.interaction_flush_timeout)
+        return None
+
+    from langsmith.evaluation import evaluate, LangChainStringEvaluator
+    from llm import get_llm
+
+    # Answers for the whole dataset in one batch; evaluate() only looks them up
+    states = batch_answers(DATASET, args.concurrency)
+
+    def batched_task(example: Dict) -> str:
+        state = states[example["input"]]
+        return state.get("answer") or state.get("error", "")
 
     # LLM-as-judge (uses same Groq LLM behind the scenes)
     judge = LangChainStringEvaluator("criteria",
@@ -37,10 +158,11 @@ def main():
     )
 
     results = evaluate(
-        task=task_runner,
-        data=dataset,
+        batched_task,
+        data=[{"input": ex["input"]} for ex in DATASET],
         evaluators=[judge],
         experiment_prefix="weather-rag-groq-demo",
+        max_concurrency=args.concurrency,
     )
     print("Evaluation complete. See LangSmith for run details.")
     return results
@@ -0,0 +1,216 @@
+"""Offline city gazetteer and multi-city extraction.
+
+Places are loaded from a compact TSV (``settings.gazetteer_path``, optionally
+gzipped) with one row per city::
+
+    id  name  country  lat  lon  population  aliases(comma-separated)
+
+IDs are GeoNames IDs, which OpenWeatherMap also uses as city IDs. The bundled
+``data/cities.tsv`` covers major cities; a larger file can be generated from a
+GeoNames dump (``cities500.txt`` has ~200k places)::
+
+    python gazetteer.py build cities500.txt data/cities500.tsv.gz
+
+Names and aliases are normalized (case, diacritics, punctuation) and compiled
+into a trie over word tokens. :meth:`Gazetteer.find_all` scans a query once,
+taking the longest name starting at each word, so the cost depends on the
+query length, not on the number of places.
+"""
+import gzip
+import os
+import re
+import sys
+import unicodedata
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from settings import settings
+from resources import registry
+
+
+@dataclass(frozen=True, slots=True)
+class Place:
+    id: int
+    name: str
+    country: str
+    lat: float
+    lon: float
+    population: int = 0
+
+
+_TOKEN = re.compile(r"[^\W_]+")
+_END = ""  # trie key holding the places for a complete name; never a token
+
+# Ordinary words that are also place names somewhere. As a single-word
+# match they only count when capitalized and not the first word.
+_COMMON_WORDS = frozenset("""
+    a about after all also an and any are as at be best but by can cold day
+    do does for from get go good had has have hope how hot if in is it just
+    like long may much new nice no not now of on or out please rain show so
+    sun sunny the there this to today tomorrow union university up use was
+    weather what when where which who why will with worth you
+""".split())
+
+
+def _strip_accents(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text.replace("ß", "ss"))
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def _tokens(text: str) -> List[str]:
+    """Word tokens with accents removed, original case kept."""
+    return _TOKEN.findall(_strip_accents(text))
+
+
+def normalize(text: str) -> str:
+    """'São  Paulo!' -> 'sao paulo'"""
+    return " ".join(_tokens(text)).lower()
+
+
+class Gazetteer:
+    def __init__(self, entries: Iterable[Tuple[Place, Iterable[str]]]):
+        """``entries`` are ``(place, aliases)`` pairs; the name is always indexed."""
+        self._root: Dict[str, dict] = {}
+        self.size = 0
+        for place, aliases in entries:
+            self.size += 1
+            for name in {normalize(n) for n in (place.name, *aliases)}:
+                if name:
+                    self._insert(name.split(), place)
+        self._sort(self._root)
+
+    def _insert(self, words: List[str], place: Place) -> None:
+        node = self._root
+        for word in words:
+            node = node.setdefault(word, {})
+        node.setdefault(_END, []).append(place)
+
+    def _sort(self, node: dict) -> None:
+        # Ambiguous names resolve to the most populous place
+        stack = [node]
+        while stack:
+            n = stack.pop()
+            for key, child in n.items():
+                if key == _END:
+                    n[_END] = tuple(sorted(child, key=lambda p: -p.population))
+                else:
+                    stack.append(child)
+
+    @classmethod
+    def from_file(cls, path: str) -> "Gazetteer":
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            return cls(_parse_rows(f))
+
+    @staticmethod
+    def _accept(words: List[str], start: int, length: int) -> bool:
+        if length > 1:
+            return True
+        word = words[start]
+        if len(word) < 3 or word.lower() in _COMMON_WORDS:
+            # 'LA', 'Nice' ... but not 'la' or 'nice'
+            return start > 0 and (word.isupper() if len(word) < 3 else word[0].isupper())
+        return True
+
+    def find_all(self, text: str) -> List[Place]:
+        """Distinct places mentioned in ``text``, in order of appearance."""
+        words = _tokens(text)
+        lowered = [w.lower() for w in words]
+        found: List[Place] = []
+        i, n = 0, len(words)
+        while i < n:
+            node, j, best = self._root, i, None
+            while j < n:
+                node = node.get(lowered[j])
+                if node is None:
+                    break
+                j += 1
+                if _END in node:
+                    best = (j, node[_END])
+            if best is not None and self._accept(words, i, best[0] - i):
+                place = best[1][0]
+                if place not in found:
+                    found.append(place)
+                i = best[0]
+            else:
+                i += 1
+        return found
+
+    def find(self, text: str) -> Optional[Place]:
+        """First place mentioned in ``text``."""
+        found = self.find_all(text)
+        return found[0] if found else None
+
+
+def _parse_rows(lines: Iterable[str]) -> Iterable[Tuple[Place, List[str]]]:
+    for line in lines:
+        if not line.strip() or line.startswith("#"):
+            continue
+        cols = line.rstrip("\n").split("\t")
+        place = Place(int(cols[0]), cols[1], cols[2], float(cols[3]),
+                      float(cols[4]), int(cols[5] or 0))
+        aliases = [a for a in cols[6].split(",") if a] if len(cols) > 6 else []
+        yield place, aliases
+
+
+def _resolve_path(path: str) -> str:
+    if os.path.isabs(path) or os.path.exists(path):
+        return path
+    # Relative default: next to this module, whatever the working directory
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), path)
+
+
+def get_gazetteer() -> Gazetteer:
+    """Shared gazetteer for ``settings.gazetteer_path``."""
+    path = _resolve_path(settings.gazetteer_path)
+    return registry.get("gazetteer", path, lambda: Gazetteer.from_file(path))
+
+
+def extract_places(text: str) -> List[Place]:
+    return get_gazetteer().find_all(text)
+
+
+def resolve_place(name: str) -> Optional[Place]:
+    return get_gazetteer().find(name)
+
+
+registry.register_warmer("gazetteer", get_gazetteer)
+
+
+# ---- GeoNames import ----
+
+_LATIN_ALIAS = re.compile(r"^[a-z][a-z ]+$")
+
+
+def build_from_geonames(src: str, dest: str, min_population: int = 0) -> int:
+    """Convert a GeoNames ``cities*.txt`` dump into the gazetteer TSV format.
+
+    Alternate names are kept when they normalize to plain Latin words.
+    Returns the number of places written.
+    """
+    opener = gzip.open if dest.endswith(".gz") else open
+    written = 0
+    with open(src, encoding="utf-8") as f, opener(dest, "wt", encoding="utf-8") as out:
+        out.write("# id\tname\tcountry\tlat\tlon\tpopulation\taliases\n")
+        for line in f:
+            cols = line.rstrip("\n").split("\t")
+            population = int(cols[14] or 0)
+            if population < min_population:
+                continue
+            name_key = normalize(cols[1])
+            aliases = sorted({
+                a for a in (normalize(x) for x in [cols[2], *cols[3].split(",")])
+                if a and a != name_key and _LATIN_ALIAS.match(a)
+            })
+            out.write("\t".join([cols[0], cols[1], cols[8], cols[4], cols[5],
+                                 str(population), ",".join(aliases)]) + "\n")
+            written += 1
+    return written
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 4 or sys.argv[1] != "build":
+        sys.exit("usage: python gazetteer.py build <geonames cities.txt> <out.tsv[.gz]> [min_population]")
+    count = build_from_geonames(sys.argv[2], sys.argv[3],
+                                int(sys.argv[4]) if len(sys.argv) > 4 else 0)
+    print(f"wrote {count} places to {sys.argv[3]}")
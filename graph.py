@@ -1,10 +1,22 @@
-from typing import TypedDict, Literal, Optional, Dict, Any, List
-from langgraph.graph import StateGraph, END
-from router import route_query
-from weather import fetch_weather, summarize_weather
-from rag import retrieve_docs, synthesize_answer
-from llm import get_llm, render_summary_prompt
-from vectorstore import upsert_interaction
+from typing import TypedDict, Literal, Optional, Dict, Any, List, Callable, Iterator, Tuple
+import asyncio
+import contextlib
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from router import route_query, aroute_query, is_weather_query, split_cities
+from weather import (
+    fetch_weather, fetch_weather_many, summarize_weather, afetch_weather_many,
+    asummarize_weather, city_key,
+)
+from rag import retrieve_docs, retrieve_docs_batch, synthesize_answer, aretrieve_docs, asynthesize_answer
+from embeddings import get_embeddings
+from resources import get_io_executor
+from context import build_context
+from scheduler import enter_lane
+from tracing import traced, tracer
+from interactions import interaction_writer, write_interactions, PendingInteraction
+from semantic_cache import semantic_cache
+from settings import settings
 
 
 class AppState(TypedDict, total=False):
@@ -14,52 +26,155 @@ class AppState(TypedDict, total=False):
     weather_json: Optional[Dict[str, Any]]
     docs: Optional[List[Dict[str, Any]]]
     answer: Optional[str]
+    error: Optional[str]
     meta: Dict[str, Any]
 
 
+def _apply_cache(state: AppState, meta: Dict[str, Any],
+                 hit: Optional[Dict[str, Any]]) -> AppState:
+    if hit is None:
+        return {**state, "meta": {**meta, "cache": "miss"}}
+    return {
+        **state,
+        "route": hit.get("route", "unknown"),
+        "answer": hit["answer"],
+        "meta": {**meta, "cache": "hit", "cache_score": hit["score"]},
+    }
+
+
+def cache_node(state: AppState) -> AppState:
+    meta = {**(state.get("meta") or {}), "started_at": time.perf_counter()}
+    if not settings.semantic_cache_enabled:
+        return {**state, "meta": meta}
+    return _apply_cache(state, meta, semantic_cache.lookup(state["query"]))
+
+
 def router_node(state: AppState) -> AppState:
     route, city = route_query(state["query"])
     return {**state, "route": route, "city": city}
 
 
-def weather_node(state: AppState) -> AppState:
+def _require_city(state: AppState) -> None:
     if state.get("route") == "weather" and not state.get("city"):
         raise ValueError(
             "Could not infer city from query. Try asking: 'What's the weather in <city>?'"
         )
-    city = state.get("city", "")
-    wjson = fetch_weather(city)
+
+
+def weather_node(state: AppState) -> AppState:
+    _require_city(state)
+    cities = split_cities(state.get("city")) or [state.get("city", "")]
+    by_city = fetch_weather_many(cities)
+    wjson = by_city[cities[0]] if len(cities) == 1 else by_city
     summary = summarize_weather(state["query"], wjson)
     return {**state, "weather_json": wjson, "answer": summary}
 
 
 def rag_node(state: AppState) -> AppState:
-    docs = retrieve_docs(state["query"], k=4)
-    answer = synthesize_answer(state["query"], docs)
-    return {**state, "docs": docs, "answer": answer}
+    docs = retrieve_docs(state["query"])
+    packed = build_context(docs)
+    answer = synthesize_answer(state["query"], docs, packed)
+    meta = {**(state.get("meta") or {}), **packed.stats()}
+    return {**state, "docs": docs, "answer": answer, "meta": meta}
+
+
+def _observe_latency(state: AppState) -> None:
+    started = (state.get("meta") or {}).get("started_at")
+    if started is not None:
+        semantic_cache.observe(state.get("route"), time.perf_counter() - started)
+
+
+def _store_interaction(state: AppState) -> None:
+    # Summarize + store off the response path; indexed by the query so the
+    # semantic cache can match repeat questions
+    metadata = semantic_cache.entry_metadata(state)
+    if settings.interaction_write_behind:
+        interaction_writer.submit(state.get("answer", ""), metadata,
+                                  embed_text=state.get("query"))
+    else:
+        write_interactions([PendingInteraction(
+            state.get("answer", ""), metadata, state.get("query"))])
 
 
 def finalize_node(state: AppState) -> AppState:
-    llm = get_llm()
-    prompt = render_summary_prompt(state.get("answer", ""))
-    compact = (prompt | llm).invoke({})
-    compact_text = getattr(compact, "content", str(compact))
-    upsert_interaction(
-        compact_text,
-        metadata={"route": state.get("route"), "query": state.get("query")}
-    )
+    _observe_latency(state)
+    _store_interaction(state)
     return state
 
 
-def build_graph():
+# ---- Async variants (use with graph.ainvoke) ----
+
+async def afinalize_node(state: AppState) -> AppState:
+    _observe_latency(state)
+    if settings.interaction_write_behind and interaction_writer.policy != "block":
+        # Only a queue append
+        _store_interaction(state)
+    else:
+        # A write in line (summary, embedding, upsert) or an enqueue that may
+        # wait for room must not stall the event loop
+        await asyncio.to_thread(_store_interaction, state)
+    return state
+
+
+async def acache_node(state: AppState) -> AppState:
+    meta = {**(state.get("meta") or {}), "started_at": time.perf_counter()}
+    if not settings.semantic_cache_enabled:
+        return {**state, "meta": meta}
+    hit = await asyncio.to_thread(semantic_cache.lookup, state["query"])
+    return _apply_cache(state, meta, hit)
+
+
+async def arouter_node(state: AppState) -> AppState:
+    query = state["query"]
+    if is_weather_query(query) or not settings.speculative_retrieval:
+        route, city = await aroute_query(query)
+        return {**state, "route": route, "city": city}
+
+    # Retrieval is the likely next step; start it while the LLM routes
+    speculative = asyncio.create_task(aretrieve_docs(query))
+    route, city = await aroute_query(query)
+    if route == "rag":
+        return {**state, "route": route, "city": city, "docs": await speculative}
+    speculative.cancel()
+    with contextlib.suppress(BaseException):
+        await speculative
+    return {**state, "route": route, "city": city}
+
+
+async def aweather_node(state: AppState) -> AppState:
+    _require_city(state)
+    cities = split_cities(state.get("city")) or [state.get("city", "")]
+    # Several cities in one query are fetched concurrently
+    by_city = await afetch_weather_many(cities)
+    wjson = by_city[cities[0]] if len(cities) == 1 else by_city
+    summary = await asummarize_weather(state["query"], wjson)
+    return {**state, "weather_json": wjson, "answer": summary}
+
+
+async def arag_node(state: AppState) -> AppState:
+    docs = state.get("docs")
+    if docs is None:
+        docs = await aretrieve_docs(state["query"])
+    packed = build_context(docs)
+    answer = await asynthesize_answer(state["query"], docs, packed)
+    meta = {**(state.get("meta") or {}), **packed.stats()}
+    return {**state, "docs": docs, "answer": answer, "meta": meta}
+
+
+def _compile(nodes: Dict[str, Callable]):
+    # langgraph is only needed to build the graph, not to import this module
+    from langgraph.graph import StateGraph, END
     g = StateGraph(AppState)
 
-    g.add_node("router", router_node)
-    g.add_node("weather", weather_node)
-    g.add_node("rag", rag_node)
-    g.add_node("finalize", finalize_node)
+    for name, fn in nodes.items():
+        g.add_node(name, traced(name, fn))
 
-    g.set_entry_point("router")
+    g.set_entry_point("cache")
+    g.add_conditional_edges(
+        "cache",
+        lambda s: "hit" if s.get("answer") else "miss",
+        {"hit": END, "miss": "router"}
+    )
     g.add_conditional_edges(
         "router",
         lambda s: s.get("route", "unknown"),
@@ -75,3 +190,218 @@ def build_graph():
     g.add_edge("finalize", END)
 
     return g.compile()
+
+
+def build_graph():
+    return _compile({
+        "cache": cache_node,
+        "router": router_node,
+        "weather": weather_node,
+        "rag": rag_node,
+        "finalize": finalize_node,
+    })
+
+
+def build_async_graph():
+    """Graph whose nodes do non-blocking I/O; run it with ``await g.ainvoke(...)``."""
+    return _compile({
+        "cache": acache_node,
+        "router": arouter_node,
+        "weather": aweather_node,
+        "rag": arag_node,
+        "finalize": afinalize_node,
+    })
+
+
+# ---- Streaming ----
+
+# Only tokens from these nodes are part of the answer (the router's LLM
+# call is streamed too, but it is just a label).
+ANSWER_NODES = ("weather", "rag")
+
+
+class _StreamTimer:
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.first_token: Optional[float] = None
+        self.tokens = 0
+
+    def token(self) -> None:
+        if self.first_token is None:
+            self.first_token = time.perf_counter()
+        self.tokens += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        ended = time.perf_counter()
+        first = self.first_token if self.first_token is not None else ended
+        gen_seconds = ended - first
+        return {
+            "ttft_s": round(first - self.started, 4),
+            "total_s": round(ended - self.started, 4),
+            "stream_tokens": self.tokens,
+            "tokens_per_s": round(self.tokens / gen_seconds, 1) if gen_seconds > 0 else None,
+        }
+
+
+def _answer_token(payload: Tuple[Any, Dict[str, Any]]) -> str:
+    chunk, metadata = payload
+    if metadata.get("langgraph_node") not in ANSWER_NODES:
+        return ""
+    content = getattr(chunk, "content", "")
+    return content if isinstance(content, str) else ""
+
+
+def _with_stream_metrics(state: Optional[AppState], timer: _StreamTimer) -> AppState:
+    state = dict(state or {})
+    state["meta"] = {**(state.get("meta") or {}), **timer.metrics()}
+    return state
+
+
+def stream_graph(graph, inputs: AppState) -> Iterator[Tuple[str, Any]]:
+    """Run ``graph`` and yield ``("token", text)`` while the answer is generated.
+
+    The last item is ``("state", final_state)``; its ``meta`` carries
+    time-to-first-token (``ttft_s``), ``total_s``, ``stream_tokens`` and
+    ``tokens_per_s``. Cache hits yield no tokens, only the final state.
+    """
+    timer = _StreamTimer()
+    final: Optional[AppState] = None
+    with tracer.request("query", query=inputs.get("query")) as trace:
+        for mode, payload in graph.stream(inputs, stream_mode=["messages", "values"]):
+            if mode == "values":
+                final = payload
+                continue
+            text = _answer_token(payload)
+            if text:
+                timer.token()
+                yield "token", text
+        if trace is not None:
+            trace.attrs.update(route=(final or {}).get("route"), tokens=timer.tokens)
+    yield "state", _with_stream_metrics(final, timer)
+
+
+async def astream_graph(graph, inputs: AppState):
+    """Async counterpart of :func:`stream_graph` (for ``build_async_graph()``)."""
+    timer = _StreamTimer()
+    final: Optional[AppState] = None
+    with tracer.request("query", query=inputs.get("query")) as trace:
+        async for mode, payload in graph.astream(inputs, stream_mode=["messages", "values"]):
+            if mode == "values":
+                final = payload
+                continue
+            text = _answer_token(payload)
+            if text:
+                timer.token()
+                yield "token", text
+        if trace is not None:
+            trace.attrs.update(route=(final or {}).get("route"), tokens=timer.tokens)
+    yield "state", _with_stream_metrics(final, timer)
+
+
+# ---- Batch ----
+
+def _failed(state: AppState, exc: BaseException) -> AppState:
+    return {**state, "error": f"{type(exc).__name__}: {exc}"}
+
+
+def _collect(futures: Dict[int, Future], states: List[AppState],
+             apply: Callable[[AppState, Any], AppState]) -> None:
+    for i, fut in futures.items():
+        try:
+            states[i] = apply(states[i], fut.result())
+        except Exception as exc:
+            states[i] = _failed(states[i], exc)
+
+
+def _batch_weather(idx: List[int], states: List[AppState], pool: ThreadPoolExecutor) -> None:
+    wanted: Dict[int, List[str]] = {}
+    for i in idx:
+        try:
+            _require_city(states[i])
+        except ValueError as exc:
+            states[i] = _failed(states[i], exc)
+            continue
+        wanted[i] = split_cities(states[i].get("city")) or [states[i].get("city", "")]
+
+    # Each distinct city is fetched once for the whole batch
+    unique: Dict[str, str] = {}
+    for cities in wanted.values():
+        for city in cities:
+            unique.setdefault(city_key(city), city)
+    io = get_io_executor()
+    fetched = {key: io.submit(fetch_weather, city) for key, city in unique.items()}
+
+    summaries: Dict[int, Future] = {}
+    for i, cities in wanted.items():
+        try:
+            by_city = {c: fetched[city_key(c)].result() for c in cities}
+        except Exception as exc:
+            states[i] = _failed(states[i], exc)
+            continue
+        wjson = by_city[cities[0]] if len(cities) == 1 else by_city
+        states[i] = {**states[i], "weather_json": wjson}
+        summaries[i] = pool.submit(summarize_weather, states[i]["query"], wjson)
+    _collect(summaries, states, lambda s, answer: {**s, "answer": answer})
+
+
+def _batch_rag(idx: List[int], states: List[AppState], pool: ThreadPoolExecutor) -> None:
+    try:
+        doc_lists = retrieve_docs_batch([states[i]["query"] for i in idx])
+    except Exception as exc:
+        for i in idx:
+            states[i] = _failed(states[i], exc)
+        return
+
+    answers: Dict[int, Future] = {}
+    for i, docs in zip(idx, doc_lists):
+        packed = build_context(docs)
+        meta = {**(states[i].get("meta") or {}), **packed.stats()}
+        states[i] = {**states[i], "docs": docs, "meta": meta}
+        answers[i] = pool.submit(synthesize_answer, states[i]["query"], docs, packed)
+    _collect(answers, states, lambda s, answer: {**s, "answer": answer})
+
+
+def run_batch(queries: List[str], concurrency: Optional[int] = None) -> List[AppState]:
+    """Answer many queries; returns final states in input order.
+
+    Queries are grouped by route instead of walking the graph one by one:
+    all of them are embedded in one model call, document questions share one
+    batched vector search, each distinct city is fetched once, and LLM calls
+    (routing fallbacks, summaries, answers) run on ``concurrency`` workers
+    (``settings.batch_concurrency``). A failing query gets ``error`` set
+    rather than failing the batch.
+    """
+    concurrency = concurrency or settings.batch_concurrency
+    if not queries:
+        return []
+    if settings.semantic_cache_enabled or settings.local_router_enabled:
+        # Later per-query lookups (cache, router) then hit the embedding cache
+        with contextlib.suppress(Exception):
+            get_embeddings().embed_documents(list(queries))
+
+    states: List[AppState] = []
+    for query in queries:
+        state: AppState = {"query": query, "meta": {}}
+        try:
+            states.append(cache_node(state))
+        except Exception as exc:
+            states.append(_failed(state, exc))
+
+    # Batch LLM calls yield to interactive ones sharing the scheduler
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch-llm",
+                            initializer=enter_lane, initargs=("batch",)) as pool:
+        pending = [i for i, s in enumerate(states) if not s.get("answer") and not s.get("error")]
+        routed = {i: pool.submit(router_node, states[i]) for i in pending}
+        _collect(routed, states, lambda s, out: out)
+
+        by_route: Dict[str, List[int]] = {"weather": [], "rag": []}
+        for i in pending:
+            if not states[i].get("error") and states[i].get("route") in by_route:
+                by_route[states[i]["route"]].append(i)
+        _batch_weather(by_route["weather"], states, pool)
+        _batch_rag(by_route["rag"], states, pool)
+
+    for i in by_route["weather"] + by_route["rag"]:
+        if states[i].get("answer") and not states[i].get("error"):
+            states[i] = finalize_node(states[i])
+    return states
@@ -0,0 +1,193 @@
+"""Write-behind persistence for answered interactions.
+
+Summarizing an answer and writing it to ``settings.interactions_collection``
+only serves future lookups, so it is kept off the response path: the graph
+enqueues the answer and a background worker summarizes, embeds and upserts
+queued items in micro-batches.
+
+The queue is bounded. When it is full the ``interaction_backpressure``
+policy decides what happens: ``drop_oldest`` (default), ``drop_new`` or
+``block`` (wait up to ``interaction_block_timeout`` seconds, then drop).
+Pending items are flushed at interpreter exit (once a writer has been used).
+"""
+import atexit
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from settings import settings
+from llm import get_llm, render_summary_prompt
+from scheduler import llm_lane
+from vectorstore import upsert_interactions
+
+
+@dataclass
+class PendingInteraction:
+    answer: str
+    metadata: Dict[str, Any]
+    embed_text: Optional[str] = None
+
+
+def summarize_answers(answers: List[str]) -> List[str]:
+    """Compact 1-2 sentence nuggets for a batch of answers (one LLM batch call).
+
+    An answer whose summarization fails is stored truncated instead.
+    """
+    llm = get_llm()
+    prompts = [render_summary_prompt(a).invoke({}) for a in answers]
+    # Behind any user-facing call waiting for the LLM
+    with llm_lane("background"):
+        outputs = llm.batch(prompts, return_exceptions=True)
+    summaries = []
+    for answer, out in zip(answers, outputs):
+        if isinstance(out, Exception):
+            summaries.append(answer[:300])
+        else:
+            summaries.append(getattr(out, "content", str(out)))
+    return summaries
+
+
+def write_interactions(batch: List[PendingInteraction]) -> None:
+    summaries = summarize_answers([item.answer for item in batch])
+    upsert_interactions([
+        (summary, item.metadata, item.embed_text)
+        for summary, item in zip(summaries, batch)
+    ])
+
+
+class InteractionWriter:
+    def __init__(self, sink: Callable[[List[PendingInteraction]], None] = write_interactions,
+                 max_queue: Optional[int] = None, batch_size: Optional[int] = None,
+                 batch_wait: Optional[float] = None, policy: Optional[str] = None):
+        self.sink = sink
+        # Unset options read the settings on use, so the shared writer can
+        # be created at import time.
+        self._max_queue = max_queue
+        self._batch_size = batch_size
+        self._batch_wait = batch_wait
+        self._policy = policy
+        self._items: Deque[PendingInteraction] = deque()
+        self._cond = threading.Condition()
+        self._busy = False
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        self._exit_hook = False
+        self.counters = {"enqueued": 0, "written": 0, "dropped": 0,
+                         "batches": 0, "failed_batches": 0}
+
+    @property
+    def max_queue(self) -> int:
+        return self._max_queue or settings.interaction_queue_size
+
+    @property
+    def batch_size(self) -> int:
+        return self._batch_size or settings.interaction_batch_size
+
+    @property
+    def batch_wait(self) -> float:
+        return settings.interaction_batch_wait if self._batch_wait is None else self._batch_wait
+
+    @property
+    def policy(self) -> str:
+        return self._policy or settings.interaction_backpressure
+
+    def submit(self, answer: str, metadata: Dict[str, Any],
+               embed_text: Optional[str] = None) -> bool:
+        """Queue an interaction for writing; returns False if it was dropped."""
+        item = PendingInteraction(answer, metadata, embed_text)
+        with self._cond:
+            self._ensure_worker()
+            if len(self._items) >= self.max_queue:
+                if self.policy == "drop_oldest":
+                    self._items.popleft()
+                    self.counters["dropped"] += 1
+                elif self.policy == "block":
+                    deadline = time.monotonic() + settings.interaction_block_timeout
+                    while len(self._items) >= self.max_queue:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.counters["dropped"] += 1
+                            return False
+                        self._cond.wait(remaining)
+                else:
+                    self.counters["dropped"] += 1
+                    return False
+            self._items.append(item)
+            self.counters["enqueued"] += 1
+            self._cond.notify_all()
+        return True
+
+    def _ensure_worker(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._closed = False
+            self._thread = threading.Thread(target=self._run, name="interaction-writer",
+                                            daemon=True)
+            self._thread.start()
+        if not self._exit_hook:
+            # Registered on first use, so importing never resolves settings
+            atexit.register(lambda: self.close(timeout=settings.interaction_flush_timeout))
+            self._exit_hook = True
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._items and not self._closed:
+                    self._cond.wait()
+                if not self._items and self._closed:
+                    return
+                # Give a micro-batch a moment to fill up
+                deadline = time.monotonic() + self.batch_wait
+                while len(self._items) < self.batch_size and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = [self._items.popleft()
+                         for _ in range(min(self.batch_size, len(self._items)))]
+                self._busy = True
+                self._cond.notify_all()
+            try:
+                self.sink(batch)
+                ok = True
+            except Exception:
+                ok = False
+            with self._cond:
+                self._busy = False
+                self.counters["batches"] += 1
+                if ok:
+                    self.counters["written"] += len(batch)
+                else:
+                    self.counters["failed_batches"] += 1
+                self._cond.notify_all()
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Block until the queue is drained and no batch is in flight."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._cond.notify_all()
+            while self._items or self._busy:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """Flush pending items and stop the worker."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+            return not thread.is_alive()
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {**self.counters, "queued": len(self._items)}
+
+
+interaction_writer = InteractionWriter()
@@ -0,0 +1,160 @@
+"""BM25 inverted index for lexical retrieval over the docs collection.
+
+Postings are stored per term as two parallel ``array`` buffers (row numbers
+and term frequencies) so they stay compact and can be viewed as NumPy arrays
+without copying at query time. Documents are appended incrementally; a
+delete tombstones the row and prunes it from the postings of its terms, so
+document frequencies and posting sizes only count live rows. The index is
+persisted next to the other caches.
+"""
+import os
+import pickle
+import re
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens; compound tokens (``AB-1234``, ``v2.1``) are
+    kept whole and also split into their parts."""
+    tokens: List[str] = []
+    for tok in _TOKEN.findall(text.lower()):
+        tokens.append(tok)
+        if not tok.isalnum():
+            tokens.extend(p for p in re.split(r"[-_./]", tok) if p)
+    return tokens
+
+
+class BM25Index:
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        self._df: Dict[str, int] = {}
+        # Distinct terms of each live row, so deletes only touch their own df
+        self._terms: List[Tuple[str, ...]] = []
+        self._lengths = array("I")
+        self._alive = array("B")
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._total_len = 0
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def add(self, ids: Sequence[str], texts: Sequence[str]) -> None:
+        with self._lock:
+            self.delete(i for i in ids if i in self._rows)
+            for pid, text in zip(ids, texts):
+                row = len(self._ids)
+                tokens = tokenize(text)
+                counts: Dict[str, int] = {}
+                for tok in tokens:
+                    counts[tok] = counts.get(tok, 0) + 1
+                for tok, tf in counts.items():
+                    rows, tfs = self._postings.setdefault(tok, (array("I"), array("I")))
+                    rows.append(row)
+                    tfs.append(tf)
+                    self._df[tok] = self._df.get(tok, 0) + 1
+                self._terms.append(tuple(counts))
+                self._ids.append(str(pid))
+                self._rows[str(pid)] = row
+                self._lengths.append(len(tokens))
+                self._alive.append(1)
+                self._total_len += len(tokens)
+
+    def delete(self, ids: Iterable[str]) -> int:
+        removed = 0
+        with self._lock:
+            dead: Dict[str, List[int]] = {}
+            for pid in list(ids):
+                row = self._rows.pop(str(pid), None)
+                if row is None:
+                    continue
+                self._alive[row] = 0
+                self._total_len -= self._lengths[row]
+                for tok in self._terms[row]:
+                    dead.setdefault(tok, []).append(row)
+                self._terms[row] = ()
+                removed += 1
+            for tok, rows in dead.items():
+                self._prune(tok, rows)
+        return removed
+
+    def _prune(self, tok: str, dead_rows: List[int]) -> None:
+        # One pass per term over its posting, however many rows went
+        df = self._df[tok] - len(dead_rows)
+        if df <= 0:
+            del self._df[tok], self._postings[tok]
+            return
+        self._df[tok] = df
+        rows, tfs = self._postings[tok]
+        rows_np = np.frombuffer(rows, dtype=np.uint32)
+        keep = ~np.isin(rows_np, dead_rows)
+        self._postings[tok] = (array("I", rows_np[keep].tobytes()),
+                               array("I", np.frombuffer(tfs, dtype=np.uint32)[keep].tobytes()))
+
+    def search(self, query: str, k: int = 4) -> List[Tuple[str, float]]:
+        """Top-k ``(id, bm25 score)`` pairs, best first."""
+        with self._lock:
+            n_docs = len(self._rows)
+            if n_docs == 0:
+                return []
+            n_rows = len(self._ids)
+            lengths = np.frombuffer(self._lengths, dtype=np.uint32)
+            alive = np.frombuffer(self._alive, dtype=np.uint8)
+            avgdl = self._total_len / n_docs or 1.0
+            scores = np.zeros(n_rows, dtype=np.float32)
+            for tok in set(tokenize(query)):
+                posting = self._postings.get(tok)
+                df = self._df.get(tok, 0)
+                if posting is None or df == 0:
+                    continue
+                rows = np.frombuffer(posting[0], dtype=np.uint32)
+                tfs = np.frombuffer(posting[1], dtype=np.uint32).astype(np.float32)
+                idf = np.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+                norm = self.k1 * (1 - self.b + self.b * lengths[rows] / avgdl)
+                scores[rows] += idf * tfs * (self.k1 + 1) / (tfs + norm)
+            scores[alive[:n_rows] == 0] = 0.0
+            hits = np.flatnonzero(scores > 0)
+            if hits.size == 0:
+                return []
+            k = min(k, hits.size)
+            top = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+            top = top[np.argsort(-scores[top])]
+            return [(self._ids[r], float(scores[r])) for r in top]
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._lock:
+            state = {k: v for k, v in self.__dict__.items() if k != "_lock"}
+            tmp = path + ".tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        index = cls()
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                index.__dict__.update(pickle.load(f))
+        return index
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]],
+                           weights: Optional[Sequence[float]] = None,
+                           k: int = 60) -> List[Tuple[str, float]]:
+    """Fuse ranked ID lists: ``score(d) = sum_i w_i / (k + rank_i(d))``."""
+    weights = weights or [1.0] * len(rankings)
+    fused: Dict[str, float] = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, key in enumerate(ranking, start=1):
+            fused[key] = fused.get(key, 0.0) + weight / (k + rank)
+    return sorted(fused.items(), key=lambda kv: kv[1], reverse=True)
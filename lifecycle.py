@@ -0,0 +1,399 @@
+"""Lifecycle management for the interactions collection.
+
+Every answered query adds a point to ``settings.interactions_collection``
+(see ``interactions.py``); without maintenance the collection, and with it
+the cost of every semantic cache lookup, grows forever. A maintenance run:
+
+1. creates payload indexes on ``metadata.route`` and ``metadata.created_at``
+   (idempotent) so the next step is a filtered delete on the server;
+2. expires entries older than the TTL of their route
+   (``INTERACTION_TTL_WEATHER`` / ``_RAG`` / ``_OTHER``);
+3. merges near-duplicates: entries of the same route, city and docs version
+   whose vectors are at least ``INTERACTION_MERGE_THRESHOLD`` similar are
+   folded into the newest one, which counts them in ``metadata.merged``.
+   Similarities are computed in ``INTERACTION_MAINTENANCE_BLOCK``-sized
+   blocks. After the first run only points added since the previous run are
+   read, together with their neighbours above the threshold (one batched
+   vector search), as long as that takes few searches compared to the size
+   of the collection; otherwise the run reads everything;
+4. evicts the oldest entries beyond ``INTERACTION_MAX_POINTS`` (incremental
+   runs read payloads, without vectors, only when the count is over the cap).
+
+Entries written before ``created_at`` existed get the time of the run, so
+their TTL starts then. Runs happen in a background thread every
+``INTERACTION_MAINTENANCE_INTERVAL`` seconds or from the command line:
+
+    python lifecycle.py            # full run, prints the report
+    python lifecycle.py --dry-run  # only count what would be reclaimed
+"""
+import argparse
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from settings import settings
+from tracing import span, tracer
+from vectorstore import get_qdrant_client
+
+ROUTES = ("weather", "rag")
+_INDEXED = (("metadata.route", "keyword"), ("metadata.created_at", "float"))
+# Near-duplicates fetched per new point in incremental runs
+_NEIGHBOURS = 32
+# Incremental runs search for at most this share of the collection's size;
+# a search in the in-process store costs about 1/100 of reading everything
+_SEARCH_SHARE = 0.002
+
+
+@dataclass
+class LifecycleReport:
+    scanned: int = 0
+    expired: int = 0
+    merged: int = 0
+    evicted: int = 0
+    backfilled: int = 0  # entries that had no created_at
+    remaining: int = 0
+    seconds: float = 0.0
+    dry_run: bool = False
+    incremental: bool = False  # only new points and their neighbours were read
+
+    @property
+    def reclaimed(self) -> int:
+        return self.expired + self.merged + self.evicted
+
+    def stats(self) -> Dict[str, Any]:
+        return {**asdict(self), "reclaimed": self.reclaimed}
+
+
+def route_ttl(route: Optional[str]) -> Optional[float]:
+    if route == "weather":
+        return settings.interaction_ttl_weather
+    if route == "rag":
+        return settings.interaction_ttl_rag
+    return settings.interaction_ttl_other
+
+
+def _ttl_filters(now: float) -> List[Tuple[str, Any]]:
+    """``(route, filter)`` matching the expired entries of each route."""
+    from qdrant_client.http import models
+    out = []
+    for route in ROUTES + ("other",):
+        ttl = route_ttl(route if route != "other" else None)
+        if ttl is None:
+            continue
+        old = models.FieldCondition(key="metadata.created_at", range=models.Range(lt=now - ttl))
+        if route == "other":
+            flt = models.Filter(must=[old], must_not=[models.FieldCondition(
+                key="metadata.route", match=models.MatchAny(any=list(ROUTES)))])
+        else:
+            flt = models.Filter(must=[old, models.FieldCondition(
+                key="metadata.route", match=models.MatchValue(value=route))])
+        out.append((route, flt))
+    return out
+
+
+def _expired(meta: Dict[str, Any], now: float) -> bool:
+    if meta.get("created_at") is None:
+        return False
+    ttl = route_ttl(meta.get("route") if meta.get("route") in ROUTES else None)
+    return ttl is not None and float(meta["created_at"]) < now - ttl
+
+
+def _newer_than(since: float):
+    """Entries created after ``since``, or without a timestamp yet."""
+    from qdrant_client.http import models
+    return models.Filter(should=[
+        models.FieldCondition(key="metadata.created_at", range=models.Range(gt=since)),
+        models.IsEmptyCondition(is_empty=models.PayloadField(key="metadata.created_at")),
+    ])
+
+
+def _group_key(meta: Dict[str, Any]) -> str:
+    # Only entries that could answer the same cache lookup are merged
+    return "\x00".join(str(meta.get(k) or "") for k in ("route", "city", "docs_version"))
+
+
+def _newest_first(metas: List[Dict[str, Any]], now: float
+                  ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Creation times, the newest-first order and group labels in that order."""
+    created = np.array([float(m.get("created_at") or now) for m in metas])
+    order = np.argsort(-created, kind="stable")
+    _, groups = np.unique([_group_key(metas[i]) for i in order], return_inverse=True)
+    return created, order, groups
+
+
+def duplicate_parents(vectors: np.ndarray, groups: np.ndarray, threshold: float,
+                      new: Optional[np.ndarray] = None, block: int = 1024) -> np.ndarray:
+    """For rows sorted newest first: index of the newest newer row in the same
+    group with cosine similarity >= ``threshold``, or -1.
+
+    Only rows flagged in ``new`` are compared against (all when None); the
+    ``n x n`` similarities are computed one ``block x block`` tile at a time.
+    """
+    n = len(vectors)
+    unit = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    cols = np.arange(n) if new is None else np.flatnonzero(new)
+    parent = np.full(n, -1, dtype=np.int64)
+    for r0 in range(0, n, block):
+        rows = np.arange(r0, min(n, r0 + block))
+        # Only newer rows (smaller index) can absorb a row
+        row_cols = cols[cols < rows[-1]]
+        for c0 in range(0, len(row_cols), block):
+            tile = row_cols[c0:c0 + block]
+            hit = ((unit[rows] @ unit[tile].T >= threshold)
+                   & (groups[rows][:, None] == groups[tile][None, :])
+                   & (tile[None, :] < rows[:, None]))
+            found = hit.any(axis=1) & (parent[rows] == -1)
+            # Columns ascend, so the first hit is the newest match
+            parent[rows[found]] = tile[hit[found].argmax(axis=1)]
+    return parent
+
+
+class InteractionMaintainer:
+    """Runs maintenance passes, on demand or periodically in a thread."""
+
+    def __init__(self, collection: Optional[str] = None):
+        self._collection = collection
+        self._lock = threading.Lock()
+        # created_at of the newest entry seen by the last run
+        self._since: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_report: Optional[LifecycleReport] = None
+        # Background runs that raised, and the latest such error
+        self.failed_runs = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def collection(self) -> str:
+        return self._collection or settings.interactions_collection
+
+    def ensure_indexes(self, client) -> None:
+        for field_name, schema in _INDEXED:
+            client.create_payload_index(self.collection, field_name=field_name,
+                                        field_schema=schema)
+
+    def _expire(self, client, now: float, report: LifecycleReport) -> None:
+        from qdrant_client.http import models
+        for route, flt in _ttl_filters(now):
+            with span("lifecycle.expire", route=route):
+                expired = client.count(self.collection, count_filter=flt, exact=True).count
+                if expired and not report.dry_run:
+                    client.delete(self.collection, points_selector=models.FilterSelector(filter=flt))
+            report.expired += expired
+
+    def _scan(self, client, now: float, dry_run: bool, flt: Any = None,
+              with_vectors: bool = True):
+        ids: List[str] = []
+        vectors: List[List[float]] = []
+        metas: List[Dict[str, Any]] = []
+        offset = None
+        while True:
+            points, offset = client.scroll(self.collection, scroll_filter=flt,
+                                           limit=settings.interaction_maintenance_block,
+                                           offset=offset, with_payload=True,
+                                           with_vectors=with_vectors)
+            for p in points:
+                meta = (p.payload or {}).get("metadata") or {}
+                if dry_run and _expired(meta, now):
+                    # Nothing was deleted; leave out what would have expired
+                    continue
+                ids.append(str(p.id))
+                vectors.append(p.vector)
+                metas.append(meta)
+            if offset is None:
+                return ids, vectors, metas
+
+    def _neighbours(self, client, now: float, dry_run: bool, ids: List[str], vectors: List[List[float]],
+                    metas: List[Dict[str, Any]]) -> bool:
+        """Append the entries new points may absorb (similar enough, any group)
+        to ``ids``/``vectors``/``metas``; False, appending nothing, when that
+        would take more searches than reading the whole collection is worth."""
+        from qdrant_client.http.models import QueryRequest
+        # New points that merge into a newer new point don't need a search
+        # of their own; their near-duplicates are mostly the newer one's
+        _, order, groups = _newest_first(metas, now)
+        block = settings.interaction_maintenance_block
+        parent = duplicate_parents(np.asarray(vectors, dtype=np.float32)[order], groups,
+                                   settings.interaction_merge_threshold, block=block)
+        queries = [vectors[order[pos]] for pos in np.flatnonzero(parent < 0)]
+        if len(queries) > _SEARCH_SHARE * client.count(self.collection, exact=True).count:
+            return False
+        seen = set(ids)
+        for i in range(0, len(queries), block):
+            # Unfiltered: the in-process store and the local index evaluate
+            # filters point by point. duplicate_parents checks the groups.
+            responses = client.query_batch_points(self.collection, requests=[
+                QueryRequest(query=v, limit=_NEIGHBOURS,
+                             score_threshold=settings.interaction_merge_threshold,
+                             with_payload=True, with_vector=True)
+                for v in queries[i:i + block]])
+            for res in responses:
+                for p in res.points:
+                    meta = (p.payload or {}).get("metadata") or {}
+                    if str(p.id) in seen or (dry_run and _expired(meta, now)):
+                        continue
+                    seen.add(str(p.id))
+                    ids.append(str(p.id))
+                    vectors.append(p.vector)
+                    metas.append(meta)
+        return True
+
+    def _overflow(self, client, now: float, dry_run: bool, gone: int,
+                  skip: List[str]) -> Tuple[List[str], int]:
+        """Oldest entries beyond the cap and the count before evicting them,
+        read without vectors and only when the collection is over the cap."""
+        total = client.count(self.collection, exact=True).count - gone
+        cap = settings.interaction_max_points
+        if cap is None or total <= cap:
+            return [], total
+        skipped = set(skip)
+        ids, _, metas = self._scan(client, now, dry_run, with_vectors=False)
+        entries = sorted(((float(m.get("created_at") or now), pid)
+                          for pid, m in zip(ids, metas) if pid not in skipped), reverse=True)
+        return [pid for _, pid in entries[cap:]], total
+
+    def _delete(self, client, ids: List[str]) -> None:
+        from qdrant_client.http import models
+        block = settings.interaction_maintenance_block
+        for i in range(0, len(ids), block):
+            client.delete(self.collection,
+                          points_selector=models.PointIdsList(points=ids[i:i + block]))
+
+    def run_once(self, full: bool = False, dry_run: bool = False) -> LifecycleReport:
+        """One maintenance pass; ``full`` compares all entries, not only new ones."""
+        with self._lock:
+            return self._run(full, dry_run)
+
+    def _run(self, full: bool, dry_run: bool) -> LifecycleReport:
+        started = time.perf_counter()
+        now = time.time()
+        report = LifecycleReport(dry_run=dry_run)
+        client = get_qdrant_client()
+        if not client.collection_exists(self.collection):
+            return report
+        if not dry_run:
+            self.ensure_indexes(client)
+        self._expire(client, now, report)
+
+        since = None if full else self._since
+        with span("lifecycle.scan"):
+            if since is not None:
+                ids, vectors, metas = self._scan(client, now, dry_run, _newer_than(since))
+                if ids and not self._neighbours(client, now, dry_run, ids, vectors, metas):
+                    since = None
+            if since is None:
+                ids, vectors, metas = self._scan(client, now, dry_run)
+        report.incremental = since is not None
+        report.scanned = len(ids)
+        merged: List[str] = []
+        kept: List[str] = []
+        if ids:
+            merged, kept = self._merge(client, now, dry_run, since, ids, vectors, metas, report)
+
+        cap = settings.interaction_max_points
+        if since is None:
+            evicted = [] if cap is None else kept[cap:]
+            count = len(kept)
+        else:
+            # Nothing was deleted in a dry run; discount what would have been
+            gone = report.expired + report.merged if dry_run else 0
+            evicted, count = self._overflow(client, now, dry_run, gone, merged if dry_run else [])
+        report.evicted = len(evicted)
+        if evicted and not dry_run:
+            with span("lifecycle.evict", points=len(evicted)):
+                self._delete(client, evicted)
+        report.remaining = count - len(evicted)
+        stamps = [float(m["created_at"]) for m in metas if m.get("created_at") is not None]
+        if stamps and not dry_run:
+            self._since = max(stamps + ([self._since] if self._since is not None else []))
+        self._finish(report, started)
+        return report
+
+    def _merge(self, client, now: float, dry_run: bool, since: Optional[float],
+               ids: List[str], vectors: List[List[float]], metas: List[Dict[str, Any]],
+               report: LifecycleReport) -> Tuple[List[str], List[str]]:
+        """Backfill timestamps and fold near-duplicates into their newest
+        entry; returns the merged ids and the surviving ids, newest first."""
+        missing = [pid for pid, m in zip(ids, metas) if m.get("created_at") is None]
+        report.backfilled = len(missing)
+        if missing and not dry_run:
+            client.set_payload(self.collection, payload={"created_at": now},
+                               points=missing, key="metadata")
+        created, order, groups = _newest_first(metas, now)
+        new = None if since is None else created[order] > since
+
+        with span("lifecycle.merge", points=len(ids)):
+            parent = duplicate_parents(np.asarray(vectors, dtype=np.float32)[order], groups,
+                                       settings.interaction_merge_threshold, new,
+                                       settings.interaction_maintenance_block)
+            root = parent.copy()
+            absorbed = np.zeros(len(ids), dtype=np.int64)
+            for pos in np.flatnonzero(parent >= 0):
+                # Parents are newer, so already resolved to a surviving entry
+                root[pos] = parent[pos] if root[parent[pos]] < 0 else root[parent[pos]]
+                absorbed[root[pos]] += 1 + int(metas[order[pos]].get("merged") or 0)
+            merged = [ids[order[pos]] for pos in np.flatnonzero(root >= 0)]
+            report.merged = len(merged)
+            if not dry_run and merged:
+                self._delete(client, merged)
+                by_count: Dict[int, List[str]] = {}
+                for pos in np.flatnonzero(absorbed):
+                    total = int(metas[order[pos]].get("merged") or 0) + int(absorbed[pos])
+                    by_count.setdefault(total, []).append(ids[order[pos]])
+                for total, points in by_count.items():
+                    client.set_payload(self.collection, payload={"merged": total},
+                                       points=points, key="metadata")
+        return merged, [ids[order[pos]] for pos in np.flatnonzero(root < 0)]
+
+    def _finish(self, report: LifecycleReport, started: float) -> None:
+        report.seconds = time.perf_counter() - started
+        tracer.record("lifecycle.run", report.seconds, reclaimed=report.reclaimed)
+        self.last_report = report
+
+    def start(self, interval: float) -> "InteractionMaintainer":
+        """Run a pass every ``interval`` seconds in a daemon thread."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, args=(interval,),
+                                            name="interaction-maintenance", daemon=True)
+            self._thread.start()
+        return self
+
+    def _loop(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                # Backend down or busy: record it and try again next period
+                self.failed_runs += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+maintainer = InteractionMaintainer()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Expire, merge and cap the interactions collection.")
+    parser.add_argument("--dry-run", action="store_true", help="count only, delete nothing")
+    parser.add_argument("--collection", help="default: INTERACTIONS_COLLECTION")
+    args = parser.parse_args(argv)
+    report = InteractionMaintainer(args.collection).run_once(full=True, dry_run=args.dry_run)
+    verb = "would reclaim" if args.dry_run else "reclaimed"
+    print(f"{args.collection or settings.interactions_collection}: "
+          f"{verb} {report.reclaimed} of {report.scanned + report.expired} points "
+          f"(expired {report.expired}, merged {report.merged}, evicted {report.evicted}); "
+          f"{report.remaining} remain, {report.backfilled} got a timestamp, {report.seconds:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,31 +1,44 @@
-from typing import Any, Dict, Optional
-from langchain_groq import ChatGroq
+from typing import Optional
 from langchain_core.prompts import ChatPromptTemplate
 from settings import settings
+from resources import registry
+from scheduler import ScheduledChatModel
 
 
-def get_llm(temperature: float = 0.2) -> ChatGroq:
-    return ChatGroq(
-        temperature=temperature,
-        model=settings.groq_model,
-        api_key=settings.groq_api_key,
-        # Optional: request batching etc. could be added here
-    )
+def get_llm(temperature: float = 0.2) -> ScheduledChatModel:
+    # One client per (model, temperature), shared across the process.
+    # Calls go through the shared scheduler, which owns retries.
+    model = settings.groq_model
+
+    def _build() -> ScheduledChatModel:
+        from langchain_groq import ChatGroq
+        return ScheduledChatModel(inner=ChatGroq(
+            temperature=temperature,
+            model=model,
+            api_key=settings.groq_api_key,
+            max_retries=0,
+        ))
+
+    return registry.get("llm", (model, temperature), _build)
+
+
+registry.register_warmer("llm", get_llm)
 
 
-def render_weather_prompt(data: Dict[str, Any], user_query: str) -> ChatPromptTemplate:
+def render_weather_prompt(weather: str, user_query: str) -> ChatPromptTemplate:
+    """``weather`` is the compact record text from ``weather.compact_weather``."""
     template = (
         """You are a helpful assistant. Summarize the current weather clearly and concisely.
 """
         """User asked: {user_query}
 """
-        """Weather JSON:
-{weather_json}
+        """Weather:
+{weather}
 """
         """Return a user-friendly, actionable summary in 3-6 sentences, with °C and any alerts."""
     )
     return ChatPromptTemplate.from_template(template).partial(
-        weather_json=str(data), user_query=user_query
+        weather=weather, user_query=user_query
     )
 
 
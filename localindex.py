@@ -0,0 +1,503 @@
+"""Embedded, zero-service vector index backed by memory-mapped files.
+
+Selected with ``VECTOR_BACKEND=local``. Each collection lives in its own
+directory under ``settings.local_index_dir``:
+
+- ``vectors.f32``  L2-normalized float32 rows (memmap, grown by doubling)
+- ``alive.u8``     one byte per row; 0 marks a deleted/overwritten row
+- ``payloads.jsonl`` one ``{"id", "payload"}`` line per row, read lazily
+- ``meta.json``    vector dimension
+
+Writes append and tombstone; once ``settings.local_index_compact_ratio`` of
+the rows are dead the files are rewritten with live rows only, which
+renumbers rows. Row numbers are therefore only meaningful under the index
+lock, which the client and store hold while turning hits into points.
+
+Top-k cosine search is a single matrix-vector product over the memmap,
+with ``argpartition`` to pick candidates instead of a full sort.
+
+``LocalIndexClient`` mirrors the subset of the ``QdrantClient`` API used in
+this repo, so ingestion code runs unchanged; ``LocalVectorStore`` is the
+LangChain vector store used for retrieval.
+"""
+import json
+import operator
+import os
+import threading
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from qdrant_client.http.models import (
+    CollectionDescription, CollectionsResponse, CountResult, Filter, FilterSelector,
+    IsEmptyCondition, MatchAny, PointIdsList, PointStruct, QueryRequest, QueryResponse, Record, ScoredPoint, VectorParams,
+)
+
+from settings import settings
+
+
+class LocalVectorIndex:
+    """Append-only vector index with tombstone deletes and compaction for one
+    collection."""
+
+    def __init__(self, directory: str, dim: Optional[int] = None,
+                 compact_ratio: Optional[float] = None):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._vec_path = os.path.join(directory, "vectors.f32")
+        self._alive_path = os.path.join(directory, "alive.u8")
+        self._payload_path = os.path.join(directory, "payloads.jsonl")
+        self._meta_path = os.path.join(directory, "meta.json")
+        self._lock = threading.RLock()
+        self._vectors: Optional[np.memmap] = None
+        self._alive: Optional[np.memmap] = None
+        self._capacity = 0
+        self._offsets: List[int] = []
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._reader: Optional[Any] = None
+        self._compact_ratio = compact_ratio
+        self.dim = dim
+
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path) as f:
+                self.dim = int(json.load(f)["dim"])
+        elif dim is not None:
+            self._write_meta()
+        if os.path.exists(self._payload_path):
+            self._load_payload_offsets()
+        if self.dim is not None:
+            self._reserve(max(len(self._ids), 1))
+            for pid, row in list(self._rows.items()):
+                if not self._alive[row]:
+                    del self._rows[pid]
+
+    def _write_meta(self) -> None:
+        with open(self._meta_path, "w") as f:
+            json.dump({"dim": self.dim}, f)
+
+    def _load_payload_offsets(self) -> None:
+        with open(self._payload_path, "rb") as f:
+            offset = 0
+            for line in f:
+                pid = json.loads(line)["id"]
+                self._rows[pid] = len(self._ids)
+                self._ids.append(pid)
+                self._offsets.append(offset)
+                offset += len(line)
+
+    @property
+    def compact_ratio(self) -> float:
+        return settings.local_index_compact_ratio if self._compact_ratio is None else self._compact_ratio
+
+    def _reserve(self, rows: int) -> None:
+        assert self.dim is not None
+        size = os.path.getsize(self._vec_path) if os.path.exists(self._vec_path) else 0
+        capacity = size // (self.dim * 4)
+        if capacity < rows:
+            capacity = max(rows, capacity * 2, 1024)
+            with open(self._vec_path, "ab") as f:
+                f.truncate(capacity * self.dim * 4)
+            with open(self._alive_path, "ab") as f:
+                f.truncate(capacity)
+        self._vectors = np.memmap(self._vec_path, dtype=np.float32, mode="r+",
+                                  shape=(capacity, self.dim))
+        self._alive = np.memmap(self._alive_path, dtype=np.uint8, mode="r+",
+                                shape=(capacity,))
+        self._capacity = capacity
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def upsert(self, ids: Sequence[str], vectors: Sequence[Sequence[float]],
+               payloads: Sequence[Dict[str, Any]]) -> None:
+        if not ids:
+            return
+        mat = np.asarray(vectors, dtype=np.float32)
+        # Like Qdrant, the last write of an id within one batch wins
+        last = {str(pid): i for i, pid in enumerate(ids)}
+        if len(last) < len(ids):
+            keep = sorted(last.values())
+            ids, payloads, mat = [ids[i] for i in keep], [payloads[i] for i in keep], mat[keep]
+        norms = np.linalg.norm(mat, axis=1, keepdims=True)
+        mat /= np.where(norms == 0, 1.0, norms)
+        with self._lock:
+            if self.dim is None:
+                self.dim = mat.shape[1]
+                self._write_meta()
+            if mat.shape[1] != self.dim:
+                raise ValueError(f"Expected vectors of size {self.dim}, got {mat.shape[1]}")
+            start = len(self._ids)
+            if self._vectors is None or start + len(ids) > self._capacity:
+                self._reserve(start + len(ids))
+            assert self._vectors is not None and self._alive is not None
+            self._vectors[start:start + len(ids)] = mat
+            with open(self._payload_path, "ab") as f:
+                offset = f.tell()
+                for i, (pid, payload) in enumerate(zip(ids, payloads)):
+                    pid = str(pid)
+                    line = (json.dumps({"id": pid, "payload": payload},
+                                       ensure_ascii=False) + "\n").encode("utf-8")
+                    f.write(line)
+                    old = self._rows.get(pid)
+                    if old is not None:
+                        self._alive[old] = 0
+                    row = start + i
+                    self._rows[pid] = row
+                    self._ids.append(pid)
+                    self._offsets.append(offset)
+                    offset += len(line)
+            self._alive[start:start + len(ids)] = 1
+            self._vectors.flush()
+            self._alive.flush()
+            self._maybe_compact()
+
+    def delete(self, ids: Iterable[str]) -> int:
+        removed = 0
+        with self._lock:
+            for pid in ids:
+                row = self._rows.pop(str(pid), None)
+                if row is not None and self._alive is not None:
+                    self._alive[row] = 0
+                    removed += 1
+            if removed and self._alive is not None:
+                self._alive.flush()
+                self._maybe_compact()
+        return removed
+
+    def dead_ratio(self) -> float:
+        with self._lock:
+            return (len(self._ids) - len(self._rows)) / len(self._ids) if self._ids else 0.0
+
+    def _maybe_compact(self) -> None:
+        if self._ids and self.dead_ratio() >= self.compact_ratio:
+            self.compact()
+
+    def compact(self) -> int:
+        """Rewrite the files with live rows only; returns the rows reclaimed."""
+        with self._lock:
+            dead = len(self._ids) - len(self._rows)
+            if not dead or self._vectors is None:
+                return 0
+            live = sorted(self._rows.values())
+            vectors = np.asarray(self._vectors[live])
+            ids = [self._ids[r] for r in live]
+            offsets: List[int] = []
+            tmp = {path: path + ".tmp"
+                   for path in (self._vec_path, self._alive_path, self._payload_path)}
+            vectors.tofile(tmp[self._vec_path])
+            np.ones(len(live), dtype=np.uint8).tofile(tmp[self._alive_path])
+            reader = self._payload_reader()
+            with open(tmp[self._payload_path], "wb") as out:
+                for r in live:
+                    reader.seek(self._offsets[r])
+                    offsets.append(out.tell())
+                    out.write(reader.readline())
+            # Unmap and close before swapping the files underneath
+            reader.close()
+            self._reader = self._vectors = self._alive = None
+            for path, new in tmp.items():
+                os.replace(new, path)
+            self._ids, self._offsets = ids, offsets
+            self._rows = {pid: row for row, pid in enumerate(ids)}
+            self._reserve(max(len(ids), 1))
+        return dead
+
+    def row(self, pid: str) -> Optional[int]:
+        return self._rows.get(pid)
+
+    def _payload_reader(self) -> Any:
+        # One handle for the index's lifetime instead of an open() per hit;
+        # appends are written through a separate handle and closed first
+        if self._reader is None:
+            self._reader = open(self._payload_path, "rb")
+        return self._reader
+
+    def payload(self, row: int) -> Dict[str, Any]:
+        with self._lock:
+            reader = self._payload_reader()
+            reader.seek(self._offsets[row])
+            return json.loads(reader.readline())["payload"]
+
+    def vector(self, row: int) -> List[float]:
+        assert self._vectors is not None
+        return self._vectors[row].tolist()
+
+    def search(self, query: Sequence[float], k: int = 4) -> List[Tuple[str, float, int]]:
+        """Top-k ``(id, cosine score, row)`` for ``query``, best first."""
+        with self._lock:
+            n = len(self._ids)
+            if n == 0 or not self._rows or self._vectors is None:
+                return []
+            vectors = self._vectors[:n]
+            alive = self._alive[:n].astype(bool)
+        q = np.asarray(query, dtype=np.float32)
+        q /= np.linalg.norm(q) or 1.0
+        scores = vectors @ q
+        scores[~alive] = -np.inf
+        k = min(k, int(alive.sum()))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self._ids[r], float(scores[r]), int(r)) for r in top]
+
+    def live_rows(self) -> Iterable[Tuple[str, int]]:
+        with self._lock:
+            items = sorted(self._rows.items(), key=lambda kv: kv[1])
+        return items
+
+
+def _payload_value(payload: Dict[str, Any], key: str) -> Any:
+    value: Any = payload
+    for part in key.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def _condition(payload: Dict[str, Any], cond: Any) -> bool:
+    if isinstance(cond, IsEmptyCondition):
+        return _payload_value(payload, cond.is_empty.key) in (None, [], {})
+    value = _payload_value(payload, cond.key)
+    if cond.range is not None:
+        r = cond.range
+        return isinstance(value, (int, float)) and all(
+            bound is None or test(value, bound) for bound, test in (
+                (r.gt, operator.gt), (r.gte, operator.ge),
+                (r.lt, operator.lt), (r.lte, operator.le)))
+    if isinstance(cond.match, MatchAny):
+        return value in cond.match.any
+    return value == cond.match.value
+
+
+def _matches(payload: Dict[str, Any], flt: Optional[Filter]) -> bool:
+    # ``must``/``should``/``must_not`` with value or any-of matches, ranges and
+    # is-empty checks; filters are evaluated by scanning, there are no payload
+    # indexes
+    if flt is None:
+        return True
+    return (all(_condition(payload, c) for c in flt.must or [])
+            and (not flt.should or any(_condition(payload, c) for c in flt.should))
+            and not any(_condition(payload, c) for c in flt.must_not or []))
+
+
+class LocalIndexClient:
+    """Minimal ``QdrantClient`` look-alike over a directory of local indexes."""
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._indexes: Dict[str, LocalVectorIndex] = {}
+
+    def index(self, collection_name: str) -> LocalVectorIndex:
+        with self._lock:
+            idx = self._indexes.get(collection_name)
+            if idx is None:
+                idx = LocalVectorIndex(os.path.join(self.root, collection_name))
+                self._indexes[collection_name] = idx
+            return idx
+
+    def collection_exists(self, collection_name: str) -> bool:
+        return os.path.exists(os.path.join(self.root, collection_name, "meta.json"))
+
+    def get_collections(self) -> CollectionsResponse:
+        names = [n for n in sorted(os.listdir(self.root)) if self.collection_exists(n)]
+        return CollectionsResponse(
+            collections=[CollectionDescription(name=n) for n in names])
+
+    def create_collection(self, collection_name: str, vectors_config: VectorParams,
+                          **kwargs: Any) -> bool:
+        with self._lock:
+            self._indexes[collection_name] = LocalVectorIndex(
+                os.path.join(self.root, collection_name), dim=vectors_config.size)
+        return True
+
+    def upsert(self, collection_name: str, points: Sequence[PointStruct], **kwargs: Any) -> None:
+        self.index(collection_name).upsert(
+            [str(p.id) for p in points],
+            [p.vector for p in points],  # type: ignore[misc]
+            [p.payload or {} for p in points],
+        )
+
+    def _filtered(self, idx: LocalVectorIndex, flt: Optional[Filter]) -> List[str]:
+        with idx._lock:
+            return [pid for pid, row in idx.live_rows() if _matches(idx.payload(row), flt)]
+
+    def delete(self, collection_name: str, points_selector: Union[PointIdsList, FilterSelector],
+               **kwargs: Any) -> None:
+        idx = self.index(collection_name)
+        if isinstance(points_selector, FilterSelector):
+            idx.delete(self._filtered(idx, points_selector.filter))
+        else:
+            idx.delete(str(p) for p in points_selector.points)
+
+    def count(self, collection_name: str, count_filter: Optional[Filter] = None,
+              **kwargs: Any) -> CountResult:
+        idx = self.index(collection_name)
+        if count_filter is None:
+            return CountResult(count=len(idx))
+        return CountResult(count=len(self._filtered(idx, count_filter)))
+
+    def set_payload(self, collection_name: str, payload: Dict[str, Any], points: Sequence[str],
+                    key: Optional[str] = None, **kwargs: Any) -> None:
+        # Rows are append-only, so a payload update rewrites the point
+        idx = self.index(collection_name)
+        ids, vectors, payloads = [], [], []
+        with idx._lock:
+            for pid in points:
+                row = idx.row(str(pid))
+                if row is None:
+                    continue
+                current = idx.payload(row)
+                target = current
+                for part in (key.split(".") if key else []):
+                    target = target.setdefault(part, {})
+                target.update(payload)
+                ids.append(str(pid))
+                vectors.append(idx.vector(row))
+                payloads.append(current)
+            if ids:
+                idx.upsert(ids, vectors, payloads)
+
+    def create_payload_index(self, collection_name: str, field_name: str,
+                             **kwargs: Any) -> None:
+        # Filters scan the payloads; nothing to build
+        return None
+
+    def retrieve(self, collection_name: str, ids: Sequence[str],
+                 with_payload: bool = True, with_vectors: bool = False,
+                 **kwargs: Any) -> List[Record]:
+        idx = self.index(collection_name)
+        out = []
+        with idx._lock:
+            for pid in ids:
+                row = idx.row(str(pid))
+                if row is None:
+                    continue
+                out.append(Record(
+                    id=str(pid),
+                    payload=idx.payload(row) if with_payload else None,
+                    vector=idx.vector(row) if with_vectors else None,
+                ))
+        return out
+
+    def query_points(self, collection_name: str, query: Sequence[float],
+                     limit: int = 10, query_filter: Optional[Filter] = None,
+                     with_payload: bool = True, with_vectors: bool = False,
+                     score_threshold: Optional[float] = None,
+                     **kwargs: Any) -> QueryResponse:
+        idx = self.index(collection_name)
+        # Over-fetch when filtering, since filters are applied after scoring
+        fetch = limit if query_filter is None else max(limit * 8, 64)
+        points: List[ScoredPoint] = []
+        with idx._lock:
+            for pid, score, row in idx.search(query, fetch):
+                if score_threshold is not None and score < score_threshold:
+                    break
+                payload = idx.payload(row) if (with_payload or query_filter) else None
+                if query_filter is not None and not _matches(payload or {}, query_filter):
+                    continue
+                points.append(ScoredPoint(
+                    id=pid, version=0, score=score,
+                    payload=payload if with_payload else None,
+                    vector=idx.vector(row) if with_vectors else None,
+                ))
+                if len(points) == limit:
+                    break
+        return QueryResponse(points=points)
+
+    def query_batch_points(self, collection_name: str, requests: Sequence[QueryRequest],
+                           **kwargs: Any) -> List[QueryResponse]:
+        # In-process, so a "batch" is just a loop without round trips
+        return [self.query_points(
+            collection_name, query=r.query, limit=r.limit or 10, query_filter=r.filter,
+            with_payload=bool(r.with_payload), with_vectors=bool(r.with_vector),
+            score_threshold=r.score_threshold,
+        ) for r in requests]
+
+    def scroll(self, collection_name: str, scroll_filter: Optional[Filter] = None,
+               limit: int = 10, offset: Optional[int] = None,
+               with_payload: bool = True, with_vectors: bool = False,
+               **kwargs: Any) -> Tuple[List[Record], Optional[int]]:
+        idx = self.index(collection_name)
+        out: List[Record] = []
+        with idx._lock:
+            rows = [r for r in idx.live_rows() if offset is None or r[1] >= offset]
+            for pid, row in rows:
+                payload = idx.payload(row)
+                if not _matches(payload, scroll_filter):
+                    continue
+                if len(out) == limit:
+                    return out, row
+                out.append(Record(
+                    id=pid,
+                    payload=payload if with_payload else None,
+                    vector=idx.vector(row) if with_vectors else None,
+                ))
+        return out, None
+
+
+class LocalVectorStore(VectorStore):
+    """LangChain vector store over a :class:`LocalVectorIndex`."""
+
+    def __init__(self, index: LocalVectorIndex, embedding: Embeddings,
+                 collection_name: str = ""):
+        self.index = index
+        self.embedding = embedding
+        self.collection_name = collection_name
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None,
+                  ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        ids = [str(i) for i in ids] if ids else [str(uuid.uuid4()) for _ in texts]
+        vectors = self.embedding.embed_documents(texts)
+        self.index.upsert(ids, vectors, [
+            {"page_content": t, "metadata": m} for t, m in zip(texts, metadatas)])
+        return ids
+
+    def similarity_search_with_score(self, query: str, k: int = 4,
+                                     **kwargs: Any) -> List[Tuple[Document, float]]:
+        vector = self.embedding.embed_query(query)
+        return self.similarity_search_with_score_by_vector(vector, k)
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4
+                                               ) -> List[Tuple[Document, float]]:
+        out = []
+        with self.index._lock:
+            hits = [(pid, score, self.index.payload(row))
+                    for pid, score, row in self.index.search(embedding, k)]
+        for pid, score, payload in hits:
+            metadata = dict(payload.get("metadata") or {})
+            metadata.update({"_id": pid, "_collection_name": self.collection_name})
+            out.append((Document(page_content=payload.get("page_content", ""),
+                                 metadata=metadata), score))
+        return out
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [d for d, _ in self.similarity_search_with_score(query, k)]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4,
+                                    **kwargs: Any) -> List[Document]:
+        return [d for d, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def _select_relevance_score_fn(self):
+        return self._cosine_relevance_score_fn
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings,
+                   metadatas: Optional[List[dict]] = None, *,
+                   directory: str, **kwargs: Any) -> "LocalVectorStore":
+        store = cls(LocalVectorIndex(directory), embedding)
+        store.add_texts(texts, metadatas)
+        return store
@@ -1,23 +1,159 @@
-from typing import List, Tuple, Dict, Any
+import asyncio
+from typing import Iterator, List, Optional, Tuple, Dict, Any
 from langchain_core.documents import Document
 from langchain_core.runnables import RunnableParallel, RunnablePassthrough
 from langchain_core.output_parsers import StrOutputParser
-from vectorstore import get_vectorstore
+from vectorstore import (
+    get_vectorstore, get_lexical_index, fetch_documents,
+    asearch_documents, afetch_documents, search_documents_batch, search_params,
+)
+from embeddings import get_embeddings
 from llm import get_llm, render_rag_prompt
+from lexical import reciprocal_rank_fusion
+from resources import get_io_executor
+from context import PackedContext, build_context
+from rerank import build_pipeline
+from settings import settings
+from tracing import in_context, span
 
 
-def retrieve_docs(question: str, k: int = 4) -> List[Document]:
-    vs = get_vectorstore()
-    retriever = vs.as_retriever(search_kwargs={"k": k})
-    docs = retriever.invoke(question)
-    return docs
+def _doc_key(doc: Document) -> str:
+    return str(doc.metadata.get("_id") or doc.page_content)
 
 
-def synthesize_answer(question: str, docs: List[Document]) -> str:
-    # Merge document contents into a single context
-    context_parts = [d.page_content[:1200] for d in docs] if docs else []
-    context = "\n\n".join(
-        context_parts) if context_parts else "(no relevant context)"
+def _fuse(dense: List[Document], lexical_hits: List[str], k: int
+          ) -> Tuple[List[str], Dict[str, Document]]:
+    fused = reciprocal_rank_fusion(
+        [[_doc_key(d) for d in dense], lexical_hits],
+        weights=[settings.dense_weight, settings.lexical_weight],
+        k=settings.rrf_k,
+    )[:k]
+    return [key for key, _ in fused], {_doc_key(d): d for d in dense}
+
+
+def _dense_kwargs(k: int) -> Dict[str, Any]:
+    # Quantized profiles oversample and rescore (see vectorstore.search_params)
+    params = search_params()
+    return {"k": k} if params is None else {"k": k, "search_params": params}
+
+
+def _lexical_search(lexical, question: str, n: int) -> List[Tuple[str, float]]:
+    with span("bm25.search", k=n):
+        return lexical.search(question, n)
+
+
+def _candidate_k(k: int, pipeline) -> int:
+    # Reranking needs more candidates than it returns
+    return k if pipeline is None else max(k, settings.rerank_candidates)
+
+
+def _wants_vectors(pipeline) -> bool:
+    # MMR compares the candidates' stored vectors; the search returns them
+    return pipeline is not None and "mmr" in pipeline.names
+
+
+def retrieve_docs(question: str, k: Optional[int] = None) -> List[Document]:
+    """Top-``k`` chunks; over-fetched and reranked when ``RERANK_STAGES`` is set."""
+    k = k or settings.retrieval_k
+    pipeline = build_pipeline()
+    docs = _retrieve(question, _candidate_k(k, pipeline), _wants_vectors(pipeline))
+    return docs if pipeline is None else pipeline.rerank(question, docs, k)
+
+
+def _dense_search(question: str, k: int, with_vectors: bool) -> List[Document]:
+    with span("qdrant.search", k=k):
+        if with_vectors:
+            vector = get_embeddings().embed_query(question)
+            return search_documents_batch([vector], k, with_vectors=True)[0]
+        return get_vectorstore().as_retriever(search_kwargs=_dense_kwargs(k)).invoke(question)
+
+
+def _retrieve(question: str, k: int, with_vectors: bool = False) -> List[Document]:
+    lexical = get_lexical_index() if settings.hybrid_search else None
+    if lexical is None or len(lexical) == 0:
+        return _dense_search(question, k, with_vectors)
+
+    # Dense and lexical searches overlap; fuse their rankings with RRF
+    n = max(k, settings.hybrid_candidates)
+    lexical_future = get_io_executor().submit(in_context(_lexical_search), lexical, question, n)
+    dense = _dense_search(question, n, with_vectors)
+    lexical_hits = [pid for pid, _ in lexical_future.result()]
+
+    keys, by_key = _fuse(dense, lexical_hits, k)
+    for doc in fetch_documents([key for key in keys if key not in by_key]):
+        by_key[_doc_key(doc)] = doc
+    return [by_key[key] for key in keys if key in by_key]
+
+
+def retrieve_docs_batch(questions: List[str], k: Optional[int] = None) -> List[List[Document]]:
+    """:func:`retrieve_docs` for many questions: one embedding call and one
+    batched dense search; lexical results are fused per question."""
+    k = k or settings.retrieval_k
+    if not questions:
+        return []
+    pipeline = build_pipeline()
+    vectors = get_embeddings().embed_documents(list(questions))
+    doc_lists = _retrieve_batch(questions, vectors, _candidate_k(k, pipeline),
+                                _wants_vectors(pipeline))
+    if pipeline is None:
+        return doc_lists
+    return pipeline.run(questions, doc_lists, k, vectors).docs
+
+
+def _retrieve_batch(questions: List[str], vectors: List[List[float]], k: int,
+                    with_vectors: bool = False) -> List[List[Document]]:
+    lexical = get_lexical_index() if settings.hybrid_search else None
+    hybrid = lexical is not None and len(lexical) > 0
+    n = max(k, settings.hybrid_candidates) if hybrid else k
+    dense_lists = search_documents_batch(vectors, n, with_vectors=with_vectors)
+    if not hybrid:
+        return dense_lists
+
+    fused = []
+    missing: List[str] = []
+    for question, dense in zip(questions, dense_lists):
+        keys, by_key = _fuse(dense, [pid for pid, _ in _lexical_search(lexical, question, n)], k)
+        fused.append((keys, by_key))
+        missing.extend(key for key in keys if key not in by_key)
+    # Lexical-only hits of every question are loaded in one request
+    fetched = {_doc_key(d): d for d in fetch_documents(list(dict.fromkeys(missing)))}
+    return [[by_key.get(key) or fetched[key] for key in keys if key in by_key or key in fetched]
+            for keys, by_key in fused]
+
+
+async def aretrieve_docs(question: str, k: Optional[int] = None) -> List[Document]:
+    """Async :func:`retrieve_docs`; dense and lexical searches run concurrently."""
+    k = k or settings.retrieval_k
+    pipeline = build_pipeline()
+    docs = await _aretrieve(question, _candidate_k(k, pipeline), _wants_vectors(pipeline))
+    if pipeline is None:
+        return docs
+    # Vector fetch and cross-encoder are blocking; keep them off the event loop
+    return await asyncio.to_thread(pipeline.rerank, question, docs, k)
+
+
+async def _aretrieve(question: str, k: int, with_vectors: bool = False) -> List[Document]:
+    lexical = get_lexical_index() if settings.hybrid_search else None
+    if lexical is None or len(lexical) == 0:
+        return await asearch_documents(question, k, with_vectors=with_vectors)
+
+    n = max(k, settings.hybrid_candidates)
+    dense, lexical_results = await asyncio.gather(
+        asearch_documents(question, n, with_vectors=with_vectors),
+        asyncio.to_thread(_lexical_search, lexical, question, n),
+    )
+    keys, by_key = _fuse(dense, [pid for pid, _ in lexical_results], k)
+    for doc in await afetch_documents([key for key in keys if key not in by_key]):
+        by_key[_doc_key(doc)] = doc
+    return [by_key[key] for key in keys if key in by_key]
+
+
+def _rag_chain(question: str, docs: List[Document],
+               packed: Optional[PackedContext] = None):
+    # Merge document contents into a single, token-budgeted context
+    if packed is None:
+        packed = build_context(docs or [])
+    context = packed.text or "(no relevant context)"
 
     # Get LLM and render a *clean* prompt
     llm = get_llm()
@@ -26,5 +162,27 @@ def synthesize_answer(question: str, docs: List[Document]) -> str:
         question=question
     )
 
-    chain = prompt | llm | StrOutputParser()
-    return chain.invoke({})
+    return prompt | llm | StrOutputParser()
+
+
+def stream_answer(question: str, docs: List[Document],
+                  packed: Optional[PackedContext] = None) -> Iterator[str]:
+    """Yield the answer text piece by piece as the LLM produces it.
+
+    Pass ``packed`` (from :func:`context.build_context`) to reuse a context
+    that was already built, e.g. to report its token usage.
+    """
+    for chunk in _rag_chain(question, docs, packed).stream({}):
+        if chunk:
+            yield chunk
+
+
+def synthesize_answer(question: str, docs: List[Document],
+                      packed: Optional[PackedContext] = None) -> str:
+    # Built on the stream so graph streaming (stream_mode="messages") sees tokens
+    return "".join(stream_answer(question, docs, packed))
+
+
+async def asynthesize_answer(question: str, docs: List[Document],
+                             packed: Optional[PackedContext] = None) -> str:
+    return await _rag_chain(question, docs, packed).ainvoke({})
@@ -0,0 +1,285 @@
+"""Reranking of retrieved chunks before they are packed into the prompt.
+
+Retrieval over-fetches ``settings.rerank_candidates`` chunks and the stages
+named in ``settings.rerank_stages`` run over them in order:
+
+- ``mmr``: maximal marginal relevance. The candidates' stored vectors come
+  back with the candidate search (never re-embedded; only chunks found
+  otherwise, like lexical-only hits, are loaded in one extra request) and a
+  single NumPy similarity matrix drives the greedy selection, so a chunk that mostly
+  repeats an already selected one (adjacent chunks share ``chunk_overlap``)
+  gives way to one that adds something new.
+- ``cross_encoder``: scores ``(question, chunk)`` pairs with a local
+  cross-encoder on CPU, batched across all questions, with an LRU cache of
+  scores. Candidates are reordered by score, and a following ``mmr`` stage
+  uses these scores as its relevance term.
+
+Every stage is timed (``RerankResult.timings`` and a ``rerank.<stage>`` span),
+so the latency each one adds can be weighed against answer quality.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from embeddings import get_embeddings
+from resources import registry
+from settings import settings
+from tracing import span
+from vectorstore import fetch_vectors
+
+STAGES = ("mmr", "cross_encoder")
+
+
+def stage_names(spec: Optional[str] = None) -> List[str]:
+    """Parse a ``RERANK_STAGES`` value (default: the setting)."""
+    spec = settings.rerank_stages if spec is None else spec
+    names = [s.strip() for s in spec.split(",") if s.strip()]
+    for name in names:
+        if name not in STAGES:
+            raise ValueError(f"Unknown rerank stage {name!r}; expected one of {STAGES}")
+    return names
+
+
+def mmr_select(query: np.ndarray, vectors: np.ndarray, k: int, lambda_mult: float = 0.5,
+               relevance: Optional[np.ndarray] = None) -> List[int]:
+    """Indices of ``k`` rows of ``vectors`` picked by maximal marginal relevance.
+
+    Each step takes the row maximizing ``lambda * relevance - (1 - lambda) *
+    (max similarity to the rows already taken)``. Similarities come from one
+    ``n x n`` cosine matrix; ``relevance`` defaults to cosine similarity to
+    ``query`` and is scaled to [0, 1] when given.
+    """
+    n = len(vectors)
+    k = min(k, n)
+    if k <= 0:
+        return []
+    unit = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    if relevance is None:
+        relevance = unit @ (query / max(float(np.linalg.norm(query)), 1e-12))
+    else:
+        spread = float(relevance.max() - relevance.min())
+        relevance = (relevance - relevance.min()) / spread if spread else np.ones(n)
+    similarity = unit @ unit.T
+
+    selected = [int(np.argmax(relevance))]
+    closest = similarity[selected[0]].copy()
+    taken = np.zeros(n, dtype=bool)
+    taken[selected[0]] = True
+    for _ in range(1, k):
+        scores = lambda_mult * relevance - (1.0 - lambda_mult) * closest
+        scores[taken] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        taken[best] = True
+        np.maximum(closest, similarity[best], out=closest)
+    return selected
+
+
+@dataclass
+class Slate:
+    """One question's candidates on their way through the stages."""
+    question: str
+    docs: List[Document]
+    query_vector: Optional[List[float]] = None
+    # Scores of a previous stage, aligned with ``docs``
+    relevance: Optional[np.ndarray] = None
+
+    def take(self, order: Sequence[int]) -> None:
+        self.docs = [self.docs[i] for i in order]
+        if self.relevance is not None:
+            self.relevance = self.relevance[list(order)]
+
+
+class MMRStage:
+    name = "mmr"
+
+    def __init__(self, lambda_mult: float):
+        self.lambda_mult = lambda_mult
+
+    def run(self, slates: List[Slate], k: int) -> None:
+        vectors: Dict[str, List[float]] = {}
+        for d in (d for s in slates for d in s.docs):
+            vector = d.metadata.pop("_vector", None)
+            if vector is not None and d.metadata.get("_id"):
+                vectors[str(d.metadata["_id"])] = vector
+        ids = list(dict.fromkeys(
+            str(d.metadata["_id"]) for s in slates for d in s.docs
+            if d.metadata.get("_id") and str(d.metadata["_id"]) not in vectors))
+        if ids:
+            vectors.update(fetch_vectors(ids))
+        missing = [s for s in slates if s.query_vector is None]
+        if missing:
+            # Cached: retrieval embedded the same questions moments ago
+            for s, v in zip(missing, get_embeddings().embed_documents([s.question for s in missing])):
+                s.query_vector = v
+
+        for s in slates:
+            rows = [i for i, d in enumerate(s.docs) if str(d.metadata.get("_id")) in vectors]
+            if len(rows) < 2:
+                continue
+            relevance = None if s.relevance is None else s.relevance[rows]
+            picked = mmr_select(
+                np.asarray(s.query_vector, dtype=np.float32),
+                np.asarray([vectors[str(s.docs[i].metadata["_id"])] for i in rows], dtype=np.float32),
+                k, self.lambda_mult, relevance)
+            # Chunks without a stored vector keep their place after the selection
+            with_vector = set(rows)
+            s.take([rows[i] for i in picked]
+                   + [i for i in range(len(s.docs)) if i not in with_vector])
+
+
+def _pair_key(model_name: str, question: str, text: str) -> str:
+    h = hashlib.sha1()
+    for part in (model_name, question, text):
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+class CrossEncoderScorer:
+    """Scores ``(question, chunk)`` pairs with a cross-encoder.
+
+    Scores are kept in an LRU cache keyed by model, question and chunk text;
+    only uncached pairs reach the model, together in one batched call.
+    """
+
+    def __init__(self, model, model_name: str, batch_size: int = 32, max_entries: int = 8192):
+        self.model = model
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def score(self, pairs: Sequence[Tuple[str, str]]) -> np.ndarray:
+        keys = [_pair_key(self.model_name, q, t) for q, t in pairs]
+        out = np.empty(len(pairs), dtype=np.float32)
+        pending: Dict[str, List[int]] = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                if key in pending:
+                    pending[key].append(i)
+                    continue
+                value = self._cache.get(key)
+                if value is None:
+                    pending[key] = [i]
+                else:
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                    out[i] = value
+
+        if pending:
+            miss_keys = list(pending)
+            with span("cross_encoder.model", pairs=len(miss_keys)):
+                scores = self.model.predict([pairs[pending[k][0]] for k in miss_keys],
+                                            batch_size=self.batch_size, show_progress_bar=False)
+            with self._lock:
+                self.misses += len(miss_keys)
+                for key, value in zip(miss_keys, np.asarray(scores, dtype=np.float32).reshape(-1)):
+                    self._cache[key] = float(value)
+                    self._cache.move_to_end(key)
+                    for i in pending[key]:
+                        out[i] = value
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+        return out
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._cache),
+                "hit_rate": self.hits / total if total else 0.0}
+
+
+def get_cross_encoder() -> CrossEncoderScorer:
+    """Shared cross-encoder scorer for ``CROSS_ENCODER_MODEL`` (CPU)."""
+    model_name = settings.cross_encoder_model
+
+    def _build() -> CrossEncoderScorer:
+        # Pulls in sentence-transformers/torch, so only on first use
+        from sentence_transformers import CrossEncoder
+        return CrossEncoderScorer(CrossEncoder(model_name, device="cpu"), model_name,
+                                  batch_size=settings.cross_encoder_batch_size,
+                                  max_entries=settings.rerank_cache_size)
+
+    return registry.get("cross_encoder", model_name, _build)
+
+
+class CrossEncoderStage:
+    name = "cross_encoder"
+
+    def __init__(self, scorer: CrossEncoderScorer):
+        self.scorer = scorer
+
+    def run(self, slates: List[Slate], k: int) -> None:
+        pairs = [(s.question, d.page_content) for s in slates for d in s.docs]
+        scores = self.scorer.score(pairs)
+        start = 0
+        for s in slates:
+            s.relevance = scores[start:start + len(s.docs)]
+            start += len(s.docs)
+            s.take(np.argsort(-s.relevance, kind="stable"))
+
+
+@dataclass
+class RerankResult:
+    docs: List[List[Document]]
+    timings: Dict[str, float] = field(default_factory=dict)  # seconds per stage
+
+
+class RerankPipeline:
+    """Runs reranking stages in order and keeps the top ``k`` per question."""
+
+    def __init__(self, stages: Sequence):
+        self.stages = list(stages)
+
+    @property
+    def names(self) -> List[str]:
+        return [stage.name for stage in self.stages]
+
+    def run(self, questions: Sequence[str], doc_lists: Sequence[List[Document]], k: int,
+            query_vectors: Optional[Sequence[List[float]]] = None) -> RerankResult:
+        vectors = list(query_vectors) if query_vectors is not None else [None] * len(questions)
+        slates = [Slate(q, list(docs), v) for q, docs, v in zip(questions, doc_lists, vectors)]
+        timings: Dict[str, float] = {}
+        for stage in self.stages:
+            started = time.perf_counter()
+            with span(f"rerank.{stage.name}", questions=len(slates),
+                      candidates=sum(len(s.docs) for s in slates)):
+                stage.run(slates, k)
+            timings[stage.name] = timings.get(stage.name, 0.0) + time.perf_counter() - started
+        return RerankResult([s.docs[:k] for s in slates], timings)
+
+    def rerank(self, question: str, docs: List[Document], k: int,
+               query_vector: Optional[List[float]] = None) -> List[Document]:
+        vectors = None if query_vector is None else [query_vector]
+        return self.run([question], [docs], k, vectors).docs[0]
+
+
+def build_pipeline(spec: Optional[str] = None) -> Optional[RerankPipeline]:
+    """Pipeline for ``spec`` (default ``RERANK_STAGES``); None without stages."""
+    names = stage_names(spec)
+    if not names:
+        return None
+    stages = []
+    for name in names:
+        if name == "mmr":
+            stages.append(MMRStage(settings.mmr_lambda))
+        else:
+            stages.append(CrossEncoderStage(get_cross_encoder()))
+    return RerankPipeline(stages)
+
+
+def _warm_cross_encoder() -> Optional[CrossEncoderScorer]:
+    # Only load the model when the configured pipeline uses it
+    return get_cross_encoder() if "cross_encoder" in stage_names() else None
+
+
+registry.register_warmer("cross_encoder", _warm_cross_encoder)
@@ -0,0 +1,168 @@
+"""Process-wide registry for expensive, reusable resources.
+
+Embedding models, Qdrant clients and chat models are costly to build, so they
+are created once per distinct configuration (model name, URL, temperature...)
+and shared by every caller in the process.
+"""
+import asyncio
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+
+
+@dataclass
+class ResourceStats:
+    builds: int = 0
+    hits: int = 0
+
+
+class ResourceRegistry:
+    """Thread-safe cache of shared objects keyed by ``(kind, key)``.
+
+    Building happens under a per-entry lock, so a slow model load never
+    blocks lookups of other resources, and concurrent callers asking for the
+    same entry wait for the single build instead of starting their own.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._items: Dict[Tuple[str, Hashable], Any] = {}
+        self._build_locks: Dict[Tuple[str, Hashable], threading.Lock] = {}
+        self._overrides: Dict[str, Any] = {}
+        self._stats: Dict[str, ResourceStats] = {}
+        self._warmers: Dict[str, Callable[[], Any]] = {}
+        # Async clients hold connections bound to one event loop, so they
+        # are cached per loop and dropped together with it.
+        self._per_loop: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[str, Hashable], Any]]" = weakref.WeakKeyDictionary()
+
+    def get(self, kind: str, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """Return the cached object for ``(kind, key)``, building it on first use."""
+        slot = (kind, key)
+        with self._lock:
+            stats = self._stats.setdefault(kind, ResourceStats())
+            if kind in self._overrides:
+                stats.hits += 1
+                return self._overrides[kind]
+            if slot in self._items:
+                stats.hits += 1
+                return self._items[slot]
+            build_lock = self._build_locks.setdefault(slot, threading.Lock())
+
+        with build_lock:
+            with self._lock:
+                if slot in self._items:
+                    stats.hits += 1
+                    return self._items[slot]
+            obj = factory()
+            with self._lock:
+                self._items[slot] = obj
+                self._build_locks.pop(slot, None)
+                stats.builds += 1
+            return obj
+
+    def peek(self, kind: str, key: Hashable) -> Any:
+        """The cached object for ``(kind, key)`` (or the override), else None;
+        never builds. For values produced by async code, stored with :meth:`get`."""
+        with self._lock:
+            if kind in self._overrides:
+                return self._overrides[kind]
+            return self._items.get((kind, key))
+
+    def get_for_loop(self, kind: str, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """Like :meth:`get`, but one object per running event loop."""
+        loop = asyncio.get_running_loop()
+        slot = (kind, key)
+        with self._lock:
+            stats = self._stats.setdefault(kind, ResourceStats())
+            if kind in self._overrides:
+                stats.hits += 1
+                return self._overrides[kind]
+            items = self._per_loop.setdefault(loop, {})
+            if slot in items:
+                stats.hits += 1
+                return items[slot]
+            # Factories for async clients are cheap and don't block, so
+            # building under the registry lock is fine here.
+            obj = items[slot] = factory()
+            stats.builds += 1
+            return obj
+
+    def register_warmer(self, kind: str, warmer: Callable[[], Any]) -> None:
+        """Register a zero-argument getter used by :meth:`warm_up`."""
+        self._warmers[kind] = warmer
+
+    def warm_up(self, kinds: Optional[List[str]] = None, background: bool = False) -> Optional[threading.Thread]:
+        """Build registered resources ahead of the first query.
+
+        With ``background=True`` the work runs in a daemon thread, which is
+        returned so callers can ``join()`` it if they need to.
+        """
+        warmers = [w for k, w in self._warmers.items() if kinds is None or k in kinds]
+
+        def _run() -> None:
+            for warmer in warmers:
+                try:
+                    warmer()
+                except Exception:
+                    # Warm-up is best effort; the real call will surface the error.
+                    pass
+
+        if background:
+            t = threading.Thread(target=_run, name="resource-warmup", daemon=True)
+            t.start()
+            return t
+        _run()
+        return None
+
+    @contextmanager
+    def override(self, kind: str, obj: Any) -> Iterator[Any]:
+        """Temporarily serve ``obj`` for every lookup of ``kind`` (for tests)."""
+        with self._lock:
+            previous = self._overrides.get(kind, _MISSING)
+            self._overrides[kind] = obj
+        try:
+            yield obj
+        finally:
+            with self._lock:
+                if previous is _MISSING:
+                    self._overrides.pop(kind, None)
+                else:
+                    self._overrides[kind] = previous
+
+    def overridden(self, kind: str) -> bool:
+        """Whether lookups of ``kind`` are currently served by :meth:`override`."""
+        with self._lock:
+            return kind in self._overrides
+
+    def clear(self, kind: Optional[str] = None) -> None:
+        """Drop cached objects (all, or only those of ``kind``) and their stats."""
+        with self._lock:
+            for slot in [s for s in self._items if kind is None or s[0] == kind]:
+                del self._items[slot]
+            if kind is None:
+                self._stats.clear()
+            else:
+                self._stats.pop(kind, None)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Per-kind build/hit counters and the number of live objects."""
+        with self._lock:
+            out: Dict[str, Dict[str, int]] = {}
+            for kind, s in self._stats.items():
+                live = sum(1 for slot in self._items if slot[0] == kind)
+                out[kind] = {"builds": s.builds, "hits": s.hits, "live": live}
+            return out
+
+
+_MISSING = object()
+
+registry = ResourceRegistry()
+
+
+def get_io_executor() -> ThreadPoolExecutor:
+    """Shared thread pool for overlapping blocking I/O (searches, HTTP...)."""
+    return registry.get("executor", "io", lambda: ThreadPoolExecutor(
+        max_workers=8, thread_name_prefix="io"))
@@ -0,0 +1,117 @@
+"""Local embedding-based route classifier.
+
+Labeled example queries are embedded once and averaged into one unit-length
+centroid per route. A query is routed to the nearest centroid (cosine
+similarity); the decision counts as confident when the best centroid beats
+the runner-up by at least ``local_router_margin``. ``router.route_query``
+asks the LLM only for queries below that margin.
+
+The query embedding is usually already in the embedding cache (the semantic
+cache embeds every query before routing), so a decision is a cache lookup
+plus one small matrix-vector product.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from settings import settings
+from embeddings import get_embeddings
+from resources import registry
+
+
+ROUTE_EXAMPLES: Dict[str, List[str]] = {
+    "weather": [
+        "What's the weather in Mumbai?",
+        "Is it going to rain in London today?",
+        "How hot is it in Delhi right now?",
+        "Do I need an umbrella in Pune this afternoon?",
+        "Temperature in New York",
+        "Is it sunny in Barcelona?",
+        "How cold is it in Moscow?",
+        "Will it snow in Denver tonight?",
+        "Current humidity in Singapore",
+        "How windy is it in Chicago?",
+        "Forecast for Tokyo tomorrow",
+        "Should I wear a jacket in Paris today?",
+        "Is it cloudy in Seattle?",
+        "What is the climate like in Bangalore right now?",
+        "Any storms expected in Miami?",
+        "Is it foggy in San Francisco this morning?",
+        "Weather conditions in Sydney",
+        "How many degrees is it in Berlin?",
+    ],
+    "rag": [
+        "Summarize section 2 of the document",
+        "What does the PDF say about installation?",
+        "Explain the main findings of the report",
+        "List the safety precautions mentioned in the manual",
+        "What are the steps to reset the device?",
+        "Who is the author of this paper?",
+        "Give me an overview of chapter 3",
+        "What is the warranty policy described in the document?",
+        "How do I configure the network settings according to the guide?",
+        "What does the appendix contain?",
+        "Define the term used in the introduction",
+        "What are the key takeaways from the uploaded file?",
+        "Which part number is used for the pump?",
+        "Explain the troubleshooting table",
+        "What methodology does the study use?",
+        "Compare the two approaches described in the text",
+        "What are the system requirements listed?",
+        "Quote the paragraph about data retention",
+    ],
+}
+
+
+def _unit_rows(vectors: Sequence[Sequence[float]]) -> np.ndarray:
+    arr = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(arr, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return arr / norms
+
+
+class CentroidRouter:
+    """Nearest-centroid classifier over query embeddings."""
+
+    def __init__(self, embeddings: Embeddings,
+                 examples: Optional[Dict[str, List[str]]] = None):
+        self.embeddings = embeddings
+        examples = examples or ROUTE_EXAMPLES
+        self.labels: List[str] = list(examples)
+        # One embedding batch for every example
+        texts = [t for label in self.labels for t in examples[label]]
+        vectors = _unit_rows(embeddings.embed_documents(texts))
+        centroids, start = [], 0
+        for label in self.labels:
+            n = len(examples[label])
+            centroids.append(vectors[start:start + n].mean(axis=0))
+            start += n
+        self.centroids = _unit_rows(centroids)
+
+    def scores(self, query: str) -> Dict[str, float]:
+        q = _unit_rows([self.embeddings.embed_query(query)])[0]
+        sims = self.centroids @ q
+        return {label: float(s) for label, s in zip(self.labels, sims)}
+
+    def classify(self, query: str) -> Tuple[str, float]:
+        """Return ``(label, margin)``: the best route and its lead over the runner-up."""
+        ranked = sorted(self.scores(query).items(), key=lambda kv: kv[1], reverse=True)
+        label, best = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else -1.0
+        return label, best - runner_up
+
+    def predict(self, query: str, margin: Optional[float] = None) -> Optional[str]:
+        """The route if the decision is confident, else None."""
+        margin = settings.local_router_margin if margin is None else margin
+        label, lead = self.classify(query)
+        return label if lead >= margin else None
+
+
+def get_route_classifier() -> CentroidRouter:
+    """Classifier built from ``ROUTE_EXAMPLES`` for the configured embedding model."""
+    return registry.get("route_classifier", settings.embedding_model,
+                        lambda: CentroidRouter(get_embeddings()))
+
+
+registry.register_warmer("route_classifier", get_route_classifier)
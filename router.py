@@ -1,6 +1,11 @@
-from typing import Literal, Tuple
+from typing import Dict, List, Literal, Optional, Tuple
+import asyncio
 import re
+import threading
 from llm import get_llm
+from settings import settings
+from route_classifier import get_route_classifier
+from gazetteer import extract_places
 from langchain_core.prompts import ChatPromptTemplate
 
 Route = Literal["weather","rag","unknown"]
@@ -16,6 +21,11 @@ ROUTE_PROMPT = ChatPromptTemplate.from_template(
 CITY_PATTERN = re.compile(r"(?:weather|temperature|climate|forecast)\s*(?:in|at|for)?\s*([A-Za-z\s]+)", re.I)
 
 def heuristic_city(query: str) -> str | None:
+    # Known cities first: canonical names, several joined with "and"
+    places = extract_places(query)
+    if places:
+        return " and ".join(p.name for p in places)
+
     m = CITY_PATTERN.search(query)
     if m:
         city = m.group(1).strip()
@@ -26,21 +36,90 @@ def heuristic_city(query: str) -> str | None:
             return city
     return None
 
+CITY_SPLIT = re.compile(r"\s+(?:and|vs\.?|versus)\s+", re.I)
+WEATHER_KEYWORDS = re.compile(r"\b(weather|temperature|forecast|humidity|rain|wind)\b", re.I)
+
+def split_cities(city: str | None) -> List[str]:
+    """'Pune and Mumbai' -> ['Pune', 'Mumbai']"""
+    if not city:
+        return []
+    return [c.strip() for c in CITY_SPLIT.split(city) if len(c.strip()) >= 2]
+
+def is_weather_query(query: str) -> bool:
+    return bool(WEATHER_KEYWORDS.search(query))
+
+# How each route decision was made: keyword, local (embedding classifier) or llm
+_sources_lock = threading.Lock()
+_route_sources: Dict[str, int] = {"keyword": 0, "local": 0, "llm": 0}
+
+def _record(source: str) -> None:
+    with _sources_lock:
+        _route_sources[source] += 1
+
+def route_stats() -> Dict[str, int]:
+    with _sources_lock:
+        return dict(_route_sources)
+
+def reset_route_stats() -> None:
+    with _sources_lock:
+        for source in _route_sources:
+            _route_sources[source] = 0
+
+def _local_route(query: str) -> Optional[Tuple[Route, str | None]]:
+    """Confident decision from the embedding classifier, or None to ask the LLM."""
+    if not settings.local_router_enabled:
+        return None
+    try:
+        label = get_route_classifier().predict(query)
+    except Exception:
+        # Embedding model unavailable: the LLM still routes
+        return None
+    if label is None:
+        return None
+    _record("local")
+    return ("weather", heuristic_city(query)) if label == "weather" else ("rag", None)
+
+def _parse_label(out, query: str) -> Tuple[Route, str | None]:
+    label = out.content.strip().lower()
+    if label not in {"weather","rag"}:
+        raise ValueError("invalid label")
+    if label == "weather":
+        return "weather", heuristic_city(query)
+    return "rag", None
+
 def route_query(query: str) -> Tuple[Route, str | None]:
     # First, cheap heuristic: any overt weather keywords?
-    if re.search(r"\b(weather|temperature|forecast|humidity|rain|wind)\b", query, re.I):
+    if is_weather_query(query):
+        _record("keyword")
         return "weather", heuristic_city(query)
 
+    # Then the local classifier, for anything it is confident about
+    local = _local_route(query)
+    if local is not None:
+        return local
+
     # Otherwise ask the LLM (Groq) to route
+    _record("llm")
     llm = get_llm(temperature=0)
     try:
         out = (ROUTE_PROMPT | llm).invoke({"query": query})
-        label = out.content.strip().lower()
-        if label not in {"weather","rag"}:
-            raise ValueError("invalid label")
-        if label == "weather":
-            return "weather", heuristic_city(query)
-        return "rag", None
+        return _parse_label(out, query)
     except Exception:
         # Fallback heuristic
         return ("rag", None)
+
+async def aroute_query(query: str) -> Tuple[Route, str | None]:
+    """Async variant of :func:`route_query`."""
+    if is_weather_query(query):
+        _record("keyword")
+        return "weather", heuristic_city(query)
+    local = await asyncio.to_thread(_local_route, query)
+    if local is not None:
+        return local
+    _record("llm")
+    llm = get_llm(temperature=0)
+    try:
+        out = await (ROUTE_PROMPT | llm).ainvoke({"query": query})
+        return _parse_label(out, query)
+    except Exception:
+        return ("rag", None)
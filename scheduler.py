@@ -0,0 +1,515 @@
+"""Central dispatch for LLM calls: rate limits, priorities, retries, deadlines.
+
+Every chat model returned by ``llm.get_llm`` is a :class:`ScheduledChatModel`,
+so all Groq calls pass through one :class:`LLMScheduler` that
+
+- admits calls against token buckets for requests/minute and tokens/minute
+  (prompt tokens plus ``llm_expected_output_tokens``, settled against the
+  reported usage afterwards) and a concurrency cap;
+- serves waiting calls by lane priority: ``interactive`` (routing, answers)
+  before ``batch`` before ``background`` (interaction summaries);
+- retries rate-limit, overload and connection errors with jittered
+  exponential backoff, honouring ``Retry-After`` and pausing all admissions
+  for that long;
+- gives up with :class:`LLMDeadlineExceeded` once a call's deadline passes.
+
+The call itself runs in the caller's thread (admission only blocks; async
+callers wait on their event loop), so callbacks and streaming behave as
+without the scheduler. Lane and deadline
+come from context: wrap calls in ``llm_lane("background")`` or
+``llm_deadline(5.0)``.
+"""
+import asyncio
+import contextvars
+import heapq
+import itertools
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from pydantic import ConfigDict
+
+from settings import settings
+from resources import registry
+from tracing import span, tracer
+
+LANES = {"interactive": 0, "batch": 1, "background": 2}
+
+_lane: contextvars.ContextVar[str] = contextvars.ContextVar("llm_lane", default="interactive")
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("llm_deadline", default=None)
+
+
+class LLMDeadlineExceeded(TimeoutError):
+    """The LLM call could not be completed before its deadline."""
+
+
+@contextmanager
+def llm_lane(lane: str) -> Iterator[None]:
+    """Run LLM calls in this block on ``lane``."""
+    if lane not in LANES:
+        raise ValueError(f"unknown LLM lane {lane!r}")
+    token = _lane.set(lane)
+    try:
+        yield
+    finally:
+        _lane.reset(token)
+
+
+def enter_lane(lane: str) -> None:
+    """Put the current thread/context on ``lane`` for good (pool initializers)."""
+    if lane not in LANES:
+        raise ValueError(f"unknown LLM lane {lane!r}")
+    _lane.set(lane)
+
+
+@contextmanager
+def llm_deadline(seconds: float) -> Iterator[None]:
+    """LLM calls in this block must finish within ``seconds`` (nested deadlines only shrink)."""
+    deadline = time.monotonic() + seconds
+    outer = _deadline.get()
+    token = _deadline.set(deadline if outer is None else min(outer, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def _default_deadline(lane: str) -> float:
+    seconds = (settings.llm_deadline_background if lane == "background"
+               else settings.llm_deadline_interactive)
+    return time.monotonic() + seconds
+
+
+class TokenBucket:
+    """Refills ``rate`` units per second up to ``capacity``; a rate of 0 means unlimited."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        if self.rate <= 0:
+            return 0.0
+        self._refill(now)
+        # Requests larger than the bucket wait for a full bucket
+        missing = min(amount, self.capacity) - self.level
+        return max(missing / self.rate, 0.0)
+
+    def take(self, amount: float) -> None:
+        if self.rate > 0:
+            self.level -= amount
+
+    def give(self, amount: float) -> None:
+        if self.rate > 0:
+            self.level = min(self.capacity, self.level + amount)
+
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    code = getattr(exc, "status_code", None)
+    if code is None:
+        code = getattr(getattr(exc, "response", None), "status_code", None)
+    return code if isinstance(code, int) else None
+
+
+def _retry_after(exc: BaseException) -> Optional[float]:
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_retryable(exc: BaseException) -> bool:
+    code = _status_code(exc)
+    if code is not None:
+        return code in (408, 409, 429) or code >= 500
+    name = type(exc).__name__
+    return "Timeout" in name or "Connection" in name
+
+
+def describe_llm_error(exc: BaseException) -> Optional[str]:
+    """A user-facing message for scheduler/LLM capacity errors, else None."""
+    if isinstance(exc, LLMDeadlineExceeded):
+        return "The language model is busy right now and didn't answer in time. Please try again shortly."
+    if _status_code(exc) == 429:
+        return "We're over the language model's rate limit. Please try again in a few seconds."
+    return None
+
+
+def describe_error(exc: BaseException) -> str:
+    """User-facing text for a failed turn: capacity errors and invalid input
+    (``ValueError``, e.g. no city in a weather question) are explained;
+    anything else gets a generic message instead of its internals."""
+    message = describe_llm_error(exc)
+    if message is not None:
+        return message
+    if isinstance(exc, ValueError) and str(exc):
+        return f"❌ Error: {exc}"
+    return "❌ Something went wrong while answering. Please try again."
+
+
+class LLMScheduler:
+    def __init__(self, max_concurrency: int, requests_per_minute: float = 0,
+                 tokens_per_minute: float = 0, max_retries: int = 4,
+                 backoff_base: float = 0.5, backoff_max: float = 20.0):
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # A minute's allowance may be used in a burst
+        self.requests = TokenBucket(requests_per_minute / 60, requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute / 60, tokens_per_minute)
+        self._cond = threading.Condition()
+        self._heap: List[Tuple[int, int]] = []
+        self._seq = itertools.count()
+        self._active = 0
+        self._paused_until = 0.0
+        self._waits: Deque[float] = deque(maxlen=1000)
+        self._depth = {lane: 0 for lane in LANES}
+        # (loop, event) of async callers waiting in :meth:`aacquire`
+        self._async_waiters: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+        self.counters = {"requests": 0, "completed": 0, "retries": 0, "rate_limited": 0,
+                         "deadline_exceeded": 0, "failed": 0, "max_queue_depth": 0}
+
+    @classmethod
+    def from_settings(cls) -> "LLMScheduler":
+        return cls(
+            max_concurrency=settings.llm_max_concurrency,
+            requests_per_minute=settings.llm_requests_per_minute,
+            tokens_per_minute=settings.llm_tokens_per_minute,
+            max_retries=settings.llm_max_retries,
+            backoff_base=settings.llm_backoff_base,
+            backoff_max=settings.llm_backoff_max,
+        )
+
+    # ---- admission ----
+
+    def _enqueue(self, lane: str) -> Tuple[Tuple[int, int], float]:
+        entry = (LANES[lane], next(self._seq))
+        heapq.heappush(self._heap, entry)
+        self._depth[lane] += 1
+        self.counters["max_queue_depth"] = max(self.counters["max_queue_depth"], len(self._heap))
+        return entry, time.monotonic()
+
+    def _try_admit(self, entry: Tuple[int, int], tokens: int, deadline: Optional[float],
+                   enqueued: float) -> Tuple[bool, Optional[float]]:
+        """With the lock held: admit ``entry``, or return how long to wait (None: until notified)."""
+        now = time.monotonic()
+        if deadline is not None and now >= deadline:
+            self.counters["deadline_exceeded"] += 1
+            raise LLMDeadlineExceeded("LLM call deadline passed while queued")
+        timeout: Optional[float] = None
+        if self._heap[0] == entry and self._active < self.max_concurrency:
+            timeout = max(self._paused_until - now,
+                          self.requests.wait_time(1, now),
+                          self.tokens.wait_time(tokens, now))
+            if timeout <= 0:
+                heapq.heappop(self._heap)
+                self.requests.take(1)
+                self.tokens.take(tokens)
+                self._active += 1
+                self._waits.append(now - enqueued)
+                tracer.record("llm.queue", now - enqueued)
+                self._notify()
+                return True, None
+        if deadline is not None:
+            timeout = min(timeout if timeout is not None else deadline - now, deadline - now)
+        return False, timeout
+
+    def _dequeue(self, entry: Tuple[int, int]) -> None:
+        if entry in self._heap:
+            self._heap.remove(entry)
+            heapq.heapify(self._heap)
+            self._notify()
+
+    def _notify(self) -> None:
+        """Wake sync waiters and the event loops of async ones (lock held)."""
+        self._cond.notify_all()
+        for loop, wake in list(self._async_waiters):
+            try:
+                loop.call_soon_threadsafe(wake.set)
+            except RuntimeError:
+                # Loop already closed; its waiter is gone with it
+                self._async_waiters.discard((loop, wake))
+
+    def acquire(self, tokens: int, lane: str, deadline: Optional[float]) -> None:
+        """Block until this call may start (priority order, limits, concurrency)."""
+        with self._cond:
+            entry, enqueued = self._enqueue(lane)
+            try:
+                while True:
+                    admitted, timeout = self._try_admit(entry, tokens, deadline, enqueued)
+                    if admitted:
+                        return
+                    self._cond.wait(timeout)
+            except BaseException:
+                self._dequeue(entry)
+                raise
+            finally:
+                self._depth[lane] -= 1
+
+    async def aacquire(self, tokens: int, lane: str, deadline: Optional[float]) -> None:
+        """:meth:`acquire` that waits on the event loop instead of a thread.
+
+        A cancelled waiter leaves the queue; admission and return happen
+        without an ``await`` in between, so a granted slot always reaches
+        the caller's ``release``.
+        """
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._cond:
+            entry, enqueued = self._enqueue(lane)
+            self._async_waiters.add(waiter)
+        try:
+            while True:
+                with self._cond:
+                    waiter[1].clear()
+                    admitted, timeout = self._try_admit(entry, tokens, deadline, enqueued)
+                if admitted:
+                    return
+                try:
+                    await asyncio.wait_for(waiter[1].wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            with self._cond:
+                self._dequeue(entry)
+            raise
+        finally:
+            with self._cond:
+                self._async_waiters.discard(waiter)
+                self._depth[lane] -= 1
+
+    def release(self, estimated: int = 0, actual: Optional[int] = None) -> None:
+        with self._cond:
+            self._active -= 1
+            if actual is not None:
+                # Settle the token estimate against reported usage
+                if actual < estimated:
+                    self.tokens.give(estimated - actual)
+                else:
+                    self.tokens.take(actual - estimated)
+            self._notify()
+
+    # ---- retries ----
+
+    def _backoff(self, exc: BaseException, attempt: int, deadline: Optional[float]) -> float:
+        """Delay before the next attempt; raises if the error is final."""
+        retry_after = _retry_after(exc)
+        with self._cond:
+            if _status_code(exc) == 429:
+                self.counters["rate_limited"] += 1
+                if retry_after is not None:
+                    # Everyone waits, not just this caller
+                    self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            if not _is_retryable(exc) or attempt >= self.max_retries:
+                self.counters["failed"] += 1
+                raise exc
+            delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+            if retry_after is not None:
+                delay += retry_after
+            if deadline is not None and time.monotonic() + delay >= deadline:
+                self.counters["deadline_exceeded"] += 1
+                raise LLMDeadlineExceeded("LLM call deadline passed while retrying") from exc
+            self.counters["retries"] += 1
+        return delay
+
+    def _start(self) -> Tuple[str, Optional[float]]:
+        lane = _lane.get()
+        deadline = _deadline.get()
+        with self._cond:
+            self.counters["requests"] += 1
+        return lane, deadline if deadline is not None else _default_deadline(lane)
+
+    def _done(self) -> None:
+        with self._cond:
+            self.counters["completed"] += 1
+
+    def run(self, fn: Callable[[], Any], tokens: int,
+            usage: Callable[[Any], Optional[int]] = lambda _: None) -> Any:
+        lane, deadline = self._start()
+        for attempt in itertools.count():
+            self.acquire(tokens, lane, deadline)
+            result, actual = None, None
+            try:
+                result = fn()
+                actual = usage(result)
+            except Exception as exc:
+                error = exc
+            else:
+                error = None
+            finally:
+                self.release(tokens, actual)
+            if error is None:
+                self._done()
+                return result
+            time.sleep(self._backoff(error, attempt, deadline))
+
+    def stream(self, fn: Callable[[], Iterator[Any]], tokens: int) -> Iterator[Any]:
+        """Like :meth:`run` for a generator; retried only until the first item."""
+        lane, deadline = self._start()
+        for attempt in itertools.count():
+            self.acquire(tokens, lane, deadline)
+            started = False
+            error: Optional[Exception] = None
+            try:
+                for item in fn():
+                    started = True
+                    yield item
+            except Exception as exc:
+                if started:
+                    with self._cond:
+                        self.counters["failed"] += 1
+                    raise
+                error = exc
+            finally:
+                self.release()
+            if error is None:
+                self._done()
+                return
+            time.sleep(self._backoff(error, attempt, deadline))
+
+    async def arun(self, fn: Callable[[], Any], tokens: int,
+                   usage: Callable[[Any], Optional[int]] = lambda _: None) -> Any:
+        lane, deadline = self._start()
+        for attempt in itertools.count():
+            await self.aacquire(tokens, lane, deadline)
+            result, actual, error = None, None, None
+            try:
+                result = await fn()
+                actual = usage(result)
+            except Exception as exc:
+                error = exc
+            finally:
+                self.release(tokens, actual)
+            if error is None:
+                self._done()
+                return result
+            await asyncio.sleep(self._backoff(error, attempt, deadline))
+
+    async def astream(self, fn: Callable[[], AsyncIterator[Any]], tokens: int) -> AsyncIterator[Any]:
+        lane, deadline = self._start()
+        for attempt in itertools.count():
+            await self.aacquire(tokens, lane, deadline)
+            started = False
+            error: Optional[Exception] = None
+            try:
+                async for item in fn():
+                    started = True
+                    yield item
+            except Exception as exc:
+                if started:
+                    with self._cond:
+                        self.counters["failed"] += 1
+                    raise
+                error = exc
+            finally:
+                self.release()
+            if error is None:
+                self._done()
+                return
+            await asyncio.sleep(self._backoff(error, attempt, deadline))
+
+    # ---- metrics ----
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            waits = np.asarray(self._waits) * 1000 if self._waits else np.zeros(1)
+            return {
+                **self.counters,
+                "active": self._active,
+                "queued": dict(self._depth),
+                "wait_ms_p50": round(float(np.percentile(waits, 50)), 1),
+                "wait_ms_p95": round(float(np.percentile(waits, 95)), 1),
+                "wait_ms_max": round(float(waits.max()), 1),
+            }
+
+
+def get_scheduler() -> LLMScheduler:
+    """The process-wide scheduler all chat models share."""
+    return registry.get("llm_scheduler", "groq", LLMScheduler.from_settings)
+
+
+def _estimate_tokens(messages: List[BaseMessage]) -> int:
+    from context import get_token_counter
+    count = get_token_counter()
+    prompt = sum(count(m.content if isinstance(m.content, str) else str(m.content))
+                 for m in messages)
+    return prompt + settings.llm_expected_output_tokens
+
+
+def _reported_tokens(result: ChatResult) -> Optional[int]:
+    usage = (result.llm_output or {}).get("token_usage") or {}
+    total = usage.get("total_tokens")
+    return int(total) if total is not None else None
+
+
+class ScheduledChatModel(BaseChatModel):
+    """Chat model wrapper that sends every call through an :class:`LLMScheduler`."""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    inner: BaseChatModel
+    scheduler: Any = None
+
+    @property
+    def _llm_type(self) -> str:
+        return f"scheduled-{self.inner._llm_type}"
+
+    def _sched(self) -> LLMScheduler:
+        return self.scheduler or get_scheduler()
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        tokens = _estimate_tokens(messages)
+        with span("llm.generate", tokens_est=tokens, lane=_lane.get()) as sp:
+            result = self._sched().run(
+                lambda: self.inner._generate(messages, stop=stop, **kwargs),
+                tokens, usage=_reported_tokens)
+            sp.set(tokens=_reported_tokens(result) or 0)
+            return result
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        tokens = _estimate_tokens(messages)
+        with span("llm.stream", tokens_est=tokens, lane=_lane.get()) as sp:
+            chunks = 0
+            for chunk in self._sched().stream(
+                    lambda: self.inner._stream(messages, stop=stop, **kwargs), tokens):
+                chunks += 1
+                yield chunk
+            sp.set(chunks=chunks)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager=None, **kwargs: Any) -> ChatResult:
+        tokens = _estimate_tokens(messages)
+        with span("llm.generate", tokens_est=tokens, lane=_lane.get()) as sp:
+            result = await self._sched().arun(
+                lambda: self.inner._agenerate(messages, stop=stop, **kwargs),
+                tokens, usage=_reported_tokens)
+            sp.set(tokens=_reported_tokens(result) or 0)
+            return result
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        tokens = _estimate_tokens(messages)
+        with span("llm.stream", tokens_est=tokens, lane=_lane.get()) as sp:
+            chunks = 0
+            async for chunk in self._sched().astream(
+                    lambda: self.inner._astream(messages, stop=stop, **kwargs), tokens):
+                chunks += 1
+                yield chunk
+            sp.set(chunks=chunks)
@@ -0,0 +1,124 @@
+"""Semantic answer cache over the interactions collection.
+
+Every answered query is written to ``settings.interactions_collection``
+indexed by the query embedding (see ``graph.finalize_node``). Before routing,
+the graph looks for a near-duplicate earlier query and, if its entry is
+still valid, returns the stored answer without any LLM call.
+
+Validity is route-aware:
+
+- weather answers expire after ``semantic_cache_weather_ttl`` seconds and
+  must be for the same city;
+- document answers stay valid until the docs collection changes (and,
+  optionally, ``semantic_cache_rag_ttl``).
+"""
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from settings import settings
+from embeddings import get_embeddings
+from router import heuristic_city, split_cities
+from vectorstore import get_qdrant_client, collection_version
+from weather import city_key
+from tracing import tracer
+
+
+def _city_key(city: Optional[str]) -> str:
+    # Canonical, order-independent key: "Bombay and Pune" == "pune and mumbai"
+    return "+".join(sorted(city_key(c) for c in split_cities(city))) if city else ""
+
+
+class SemanticCache:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        # Moving average of full-pipeline latency per route, to value hits
+        self._route_latency: Dict[str, float] = {}
+
+    def entry_metadata(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Metadata stored alongside an interaction so it can serve as a cache entry."""
+        meta: Dict[str, Any] = {
+            "route": state.get("route"),
+            "query": state.get("query"),
+            "answer": state.get("answer"),
+            "created_at": time.time(),
+        }
+        if state.get("route") == "weather":
+            meta["city"] = _city_key(state.get("city"))
+        elif state.get("route") == "rag":
+            meta["docs_version"] = collection_version(settings.docs_collection)
+        return meta
+
+    def _is_valid(self, meta: Dict[str, Any], query: str, now: float) -> bool:
+        if not meta.get("answer"):
+            return False
+        age = now - float(meta.get("created_at") or 0)
+        route = meta.get("route")
+        if route == "weather":
+            if age > settings.semantic_cache_weather_ttl:
+                return False
+            return meta.get("city", "") == _city_key(heuristic_city(query))
+        if route == "rag":
+            if settings.semantic_cache_rag_ttl is not None and age > settings.semantic_cache_rag_ttl:
+                return False
+            return meta.get("docs_version") == collection_version(settings.docs_collection)
+        return False
+
+    def lookup(self, query: str) -> Optional[Dict[str, Any]]:
+        """Return ``{"answer", "route", "score", ...}`` for a valid near-duplicate, else None."""
+        started = time.perf_counter()
+        hit = None
+        try:
+            vector = get_embeddings().embed_query(query)
+            res = get_qdrant_client().query_points(
+                collection_name=settings.interactions_collection,
+                query=vector,
+                limit=5,
+                with_payload=True,
+                score_threshold=settings.semantic_cache_threshold,
+            )
+            now = time.time()
+            for point in res.points:
+                meta = (point.payload or {}).get("metadata") or {}
+                if self._is_valid(meta, query, now):
+                    hit = {**meta, "score": point.score}
+                    break
+        except Exception:
+            # No collection yet, backend down... the cache must never fail a query.
+            hit = None
+
+        lookup_seconds = time.perf_counter() - started
+        tracer.record("semantic_cache.lookup", lookup_seconds,
+                      cache="miss" if hit is None else "hit")
+        with self._lock:
+            if hit is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            saved = self._route_latency.get(hit.get("route", ""), 0.0) - lookup_seconds
+            self.saved_seconds += max(saved, 0.0)
+        return hit
+
+    def observe(self, route: Optional[str], seconds: float) -> None:
+        """Record the latency of a full (uncached) pipeline run."""
+        if not route:
+            return
+        with self._lock:
+            prev = self._route_latency.get(route)
+            self._route_latency[route] = seconds if prev is None else 0.8 * prev + 0.2 * seconds
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "saved_seconds": round(self.saved_seconds, 3),
+            }
+
+
+semantic_cache = SemanticCache()
@@ -1,6 +1,7 @@
+import threading
 from pydantic_settings import BaseSettings
 from pydantic import Field
-from typing import Optional
+from typing import Any, Optional
 
 # qdrant_url: str
 # qdrant_api_key: str
@@ -16,10 +17,18 @@ class Settings(BaseSettings):
     groq_model: str = Field("llama3-70b-8192", alias="GROQ_MODEL")
 
     openweather_api_key: str = Field(..., alias="OPENWEATHER_API_KEY")
+    openweather_url: str = Field(
+        "https://api.openweathermap.org/data/2.5/weather", alias="OPENWEATHER_URL")
 
     qdrant_url: str = Field("http://localhost:6333", alias="QDRANT_URL")
     qdrant_api_key: Optional[str] = Field(default=None, alias="QDRANT_API_KEY")
 
+    # "qdrant" (server / :memory:) or "local" (embedded memmap index)
+    vector_backend: str = Field("qdrant", alias="VECTOR_BACKEND")
+    local_index_dir: str = Field(".cache/local_index", alias="LOCAL_INDEX_DIR")
+    # Rewrite a local index once this share of its rows is deleted/overwritten
+    local_index_compact_ratio: float = Field(0.3, alias="LOCAL_INDEX_COMPACT_RATIO")
+
     # LangSmith / LangChain tracing
     langsmith_api_key: Optional[str] = Field(
         default=None, alias="LANGSMITH_API_KEY")
@@ -35,13 +44,173 @@ class Settings(BaseSettings):
     interactions_collection: str = Field(
         "interactions", alias="INTERACTIONS_COLLECTION")
 
+    # Embedding cache (memory LRU + on-disk memmap; empty dir = memory only)
+    embedding_cache_enabled: bool = Field(True, alias="EMBEDDING_CACHE_ENABLED")
+    embedding_cache_size: int = Field(4096, alias="EMBEDDING_CACHE_SIZE")
+    embedding_cache_dir: Optional[str] = Field(
+        ".cache/embeddings", alias="EMBEDDING_CACHE_DIR")
+
     chunk_size: int = Field(1200, alias="CHUNK_SIZE")
     chunk_overlap: int = Field(120, alias="CHUNK_OVERLAP")
 
+    # Streaming ingestion
+    ingest_batch_size: int = Field(64, alias="INGEST_BATCH_SIZE")
+    ingest_queue_depth: int = Field(4, alias="INGEST_QUEUE_DEPTH")
+    ingest_manifest_dir: str = Field(
+        ".cache/manifests", alias="INGEST_MANIFEST_DIR")
+    # Bulk ingestion (vectorstore.ingest_pdfs): parser processes (unset = one per CPU)
+    # and chunks per shared embedding call
+    ingest_workers: Optional[int] = Field(None, alias="INGEST_WORKERS")
+    ingest_embed_batch_size: int = Field(256, alias="INGEST_EMBED_BATCH_SIZE")
+
+    # Docs collection storage profile, applied when a collection is created:
+    # float | int8 (scalar quantization) | binary (binary quantization)
+    vector_profile: str = Field("float", alias="VECTOR_PROFILE")
+    # Full-precision vectors on disk (unset = on for the quantized profiles)
+    vectors_on_disk: Optional[bool] = Field(None, alias="VECTORS_ON_DISK")
+    hnsw_m: int = Field(16, alias="HNSW_M")
+    hnsw_ef_construct: int = Field(128, alias="HNSW_EF_CONSTRUCT")
+    # Search-time HNSW beam width (unset = Qdrant's default)
+    hnsw_ef: Optional[int] = Field(None, alias="HNSW_EF")
+    # Quantized search fetches k * oversampling candidates and rescores them
+    # with the full vectors (unset = 2.0 for int8, 3.0 for binary)
+    quantization_oversampling: Optional[float] = Field(None, alias="QUANTIZATION_OVERSAMPLING")
+
+    # Weather cache / HTTP
+    weather_cache_ttl: float = Field(600.0, alias="WEATHER_CACHE_TTL")
+    weather_stale_ttl: float = Field(1800.0, alias="WEATHER_STALE_TTL")
+    weather_timeout: float = Field(10.0, alias="WEATHER_TIMEOUT")
+    weather_pool_size: int = Field(16, alias="WEATHER_POOL_SIZE")
+    # llm | auto (templates answer simple fact questions) | template
+    weather_summary_mode: str = Field("auto", alias="WEATHER_SUMMARY_MODE")
+    # City gazetteer (TSV, optionally .gz); see gazetteer.py
+    gazetteer_path: str = Field("data/cities.tsv", alias="GAZETTEER_PATH")
+
+    # Retrieval: dense top-k, optionally fused with BM25 via reciprocal rank
+    retrieval_k: int = Field(4, alias="RETRIEVAL_K")
+    hybrid_search: bool = Field(True, alias="HYBRID_SEARCH")
+    hybrid_candidates: int = Field(20, alias="HYBRID_CANDIDATES")
+    rrf_k: int = Field(60, alias="RRF_K")
+    dense_weight: float = Field(1.0, alias="DENSE_WEIGHT")
+    lexical_weight: float = Field(1.0, alias="LEXICAL_WEIGHT")
+    # Reranking (rerank.py): comma-separated stages run in order over
+    # RERANK_CANDIDATES retrieved chunks, e.g. "mmr" or "cross_encoder,mmr";
+    # empty = plain top-k
+    rerank_stages: str = Field("", alias="RERANK_STAGES")
+    rerank_candidates: int = Field(40, alias="RERANK_CANDIDATES")
+    # 1.0 = relevance only, lower values penalize chunks similar to ones picked
+    mmr_lambda: float = Field(0.5, alias="MMR_LAMBDA")
+    cross_encoder_model: str = Field("cross-encoder/ms-marco-MiniLM-L-6-v2", alias="CROSS_ENCODER_MODEL")
+    cross_encoder_batch_size: int = Field(32, alias="CROSS_ENCODER_BATCH_SIZE")
+    rerank_cache_size: int = Field(8192, alias="RERANK_CACHE_SIZE")
+    # RAG prompt context: token budget and tiktoken encoding used to count
+    context_token_budget: int = Field(3000, alias="CONTEXT_TOKEN_BUDGET")
+    context_encoding: str = Field("cl100k_base", alias="CONTEXT_ENCODING")
+    # Async graph: start retrieval while the LLM is still routing
+    speculative_retrieval: bool = Field(True, alias="SPECULATIVE_RETRIEVAL")
+    lexical_index_dir: str = Field(".cache/lexical", alias="LEXICAL_INDEX_DIR")
+
+    # Local embedding router; the LLM only routes queries whose best route
+    # leads the runner-up by less than this cosine margin
+    local_router_enabled: bool = Field(True, alias="LOCAL_ROUTER_ENABLED")
+    local_router_margin: float = Field(0.05, alias="LOCAL_ROUTER_MARGIN")
+
+    # Semantic answer cache (interactions collection, looked up before routing)
+    semantic_cache_enabled: bool = Field(True, alias="SEMANTIC_CACHE_ENABLED")
+    semantic_cache_threshold: float = Field(0.92, alias="SEMANTIC_CACHE_THRESHOLD")
+    semantic_cache_weather_ttl: float = Field(600.0, alias="SEMANTIC_CACHE_WEATHER_TTL")
+    semantic_cache_rag_ttl: Optional[float] = Field(None, alias="SEMANTIC_CACHE_RAG_TTL")
+
+    # Interaction write-behind (summaries stored off the response path)
+    interaction_write_behind: bool = Field(True, alias="INTERACTION_WRITE_BEHIND")
+    interaction_queue_size: int = Field(256, alias="INTERACTION_QUEUE_SIZE")
+    interaction_batch_size: int = Field(16, alias="INTERACTION_BATCH_SIZE")
+    interaction_batch_wait: float = Field(0.5, alias="INTERACTION_BATCH_WAIT")
+    # drop_oldest | drop_new | block
+    interaction_backpressure: str = Field("drop_oldest", alias="INTERACTION_BACKPRESSURE")
+    interaction_block_timeout: float = Field(1.0, alias="INTERACTION_BLOCK_TIMEOUT")
+    interaction_flush_timeout: float = Field(10.0, alias="INTERACTION_FLUSH_TIMEOUT")
+
+    # Interactions lifecycle (lifecycle.py). Age limits per route in seconds
+    # (unset = keep); "other" covers entries without a known route
+    interaction_ttl_weather: Optional[float] = Field(86400.0, alias="INTERACTION_TTL_WEATHER")
+    interaction_ttl_rag: Optional[float] = Field(30 * 86400.0, alias="INTERACTION_TTL_RAG")
+    interaction_ttl_other: Optional[float] = Field(7 * 86400.0, alias="INTERACTION_TTL_OTHER")
+    # Entries of the same route (and city / docs version) at least this
+    # similar are merged into the newest one
+    interaction_merge_threshold: float = Field(0.97, alias="INTERACTION_MERGE_THRESHOLD")
+    # Oldest entries are evicted beyond this many points (unset = no cap)
+    interaction_max_points: Optional[int] = Field(50000, alias="INTERACTION_MAX_POINTS")
+    # Seconds between background runs (unset = only `python lifecycle.py`)
+    interaction_maintenance_interval: Optional[float] = Field(None, alias="INTERACTION_MAINTENANCE_INTERVAL")
+    # Points per scroll page and rows per similarity block
+    interaction_maintenance_block: int = Field(1024, alias="INTERACTION_MAINTENANCE_BLOCK")
+
+    # graph.run_batch: concurrent LLM calls (routing fallbacks, summaries, answers)
+    batch_concurrency: int = Field(4, alias="BATCH_CONCURRENCY")
+
+    # LLM scheduler (see scheduler.py); 0 disables a rate limit. Defaults
+    # match Groq's free tier for llama3-70b.
+    llm_max_concurrency: int = Field(8, alias="LLM_MAX_CONCURRENCY")
+    llm_requests_per_minute: float = Field(30, alias="LLM_REQUESTS_PER_MINUTE")
+    llm_tokens_per_minute: float = Field(6000, alias="LLM_TOKENS_PER_MINUTE")
+    llm_expected_output_tokens: int = Field(300, alias="LLM_EXPECTED_OUTPUT_TOKENS")
+    llm_max_retries: int = Field(4, alias="LLM_MAX_RETRIES")
+    llm_backoff_base: float = Field(0.5, alias="LLM_BACKOFF_BASE")
+    llm_backoff_max: float = Field(20.0, alias="LLM_BACKOFF_MAX")
+    # Seconds a call may take, queueing and retries included
+    llm_deadline_interactive: float = Field(30.0, alias="LLM_DEADLINE_INTERACTIVE")
+    llm_deadline_background: float = Field(300.0, alias="LLM_DEADLINE_BACKGROUND")
+
+    # Local tracing (see tracing.py): per-span histograms, recent requests,
+    # Prometheus text on METRICS_HOST:METRICS_PORT (loopback only unless
+    # METRICS_HOST is set, e.g. 0.0.0.0), sampled stacks of slow requests
+    tracing_enabled: bool = Field(True, alias="TRACING_ENABLED")
+    trace_history: int = Field(50, alias="TRACE_HISTORY")
+    metrics_port: Optional[int] = Field(None, alias="METRICS_PORT")
+    metrics_host: str = Field("127.0.0.1", alias="METRICS_HOST")
+    profile_slow_requests: bool = Field(False, alias="PROFILE_SLOW_REQUESTS")
+    profile_slow_ms: float = Field(2000.0, alias="PROFILE_SLOW_MS")
+    profile_interval_ms: float = Field(5.0, alias="PROFILE_INTERVAL_MS")
+
+    # Shared resources (see resources.py)
+    warm_up_on_start: bool = Field(False, alias="WARM_UP_ON_START")
+    # Load just the embedding model in a background thread when the app starts
+    warm_up_embeddings: bool = Field(True, alias="WARM_UP_EMBEDDINGS")
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
         case_sensitive = False
 
 
-settings = Settings()
+class LazySettings:
+    """Builds :class:`Settings` on first attribute access.
+
+    Importing a module that reads configuration therefore doesn't need the
+    environment (API keys, ``.env``) until a value is actually used.
+    Attribute writes go to the real settings, so ``monkeypatch`` works.
+    """
+
+    def __init__(self) -> None:
+        object.__setattr__(self, "_settings", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def _resolve(self) -> Settings:
+        if self._settings is None:
+            with self._lock:
+                if self._settings is None:
+                    object.__setattr__(self, "_settings", Settings())
+        return self._settings
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._resolve(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._resolve(), name, value)
+
+    def __delattr__(self, name: str) -> None:
+        delattr(self._resolve(), name)
+
+
+settings = LazySettings()
@@ -0,0 +1,23 @@
+import os
+
+import pytest
+
+# Settings require API keys (read on first use); tests never call the real APIs.
+os.environ.setdefault("GROQ_API_KEY", "test")
+os.environ.setdefault("OPENWEATHER_API_KEY", "test")
+
+from settings import settings  # noqa: E402
+from resources import registry  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def isolated_caches(monkeypatch, tmp_path):
+    """Keep on-disk caches and indexes out of the working tree."""
+    cache = tmp_path / "cache"
+    monkeypatch.setattr(settings, "embedding_cache_dir", str(cache / "embeddings"))
+    monkeypatch.setattr(settings, "ingest_manifest_dir", str(cache / "manifests"))
+    monkeypatch.setattr(settings, "local_index_dir", str(cache / "local_index"))
+    monkeypatch.setattr(settings, "lexical_index_dir", str(cache / "lexical"))
+    yield
+    registry.clear("bm25")
+    registry.clear("vector_profile")
@@ -0,0 +1,198 @@
+import asyncio
+import types
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.http.models import Distance, PointStruct, VectorParams
+
+import graph
+import vectorstore
+import weather
+from interactions import InteractionWriter
+from rag import aretrieve_docs
+from resources import registry
+from settings import settings
+
+
+def test_async_weather_fetches_cities_concurrently(monkeypatch):
+    active = {"now": 0, "peak": 0}
+    seen = []
+
+    class FakeAsyncClient:
+        async def get(self, url, params=None):
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+            seen.append(params["id"])
+            await asyncio.sleep(0.05)
+            active["now"] -= 1
+            return types.SimpleNamespace(
+                raise_for_status=lambda: None,
+                json=lambda: {"id": params["id"], "main": {"temp": 25}})
+
+    monkeypatch.setattr("weather.get_async_http_client", lambda: FakeAsyncClient())
+    monkeypatch.setattr("weather.get_llm", lambda: (
+        lambda prompt: types.SimpleNamespace(content="Warm in both cities.")))
+    weather.weather_cache.clear()
+
+    state = {"query": "weather in Pune and Mumbai", "route": "weather",
+             "city": "Pune and Mumbai"}
+    out = asyncio.run(graph.aweather_node(state))
+    assert sorted(seen) == [1259229, 1275339]  # Pune, Mumbai
+    assert active["peak"] == 2
+    assert set(out["weather_json"]) == {"Pune", "Mumbai"}
+    assert out["answer"] == "Warm in both cities."
+
+
+def test_async_graph_overlaps_routing_and_retrieval(monkeypatch):
+    events = []
+
+    async def slow_route(q):
+        events.append("route-start")
+        await asyncio.sleep(0.05)
+        events.append("route-end")
+        return "rag", None
+
+    async def retrieve(q):
+        events.append("retrieve-start")
+        return [Document(page_content="doc")]
+
+    async def synth(q, docs, packed=None):
+        return f"answer from {len(docs)} doc(s)"
+
+    monkeypatch.setattr(settings, "semantic_cache_enabled", False)
+    monkeypatch.setattr("graph.aroute_query", slow_route)
+    monkeypatch.setattr("graph.aretrieve_docs", retrieve)
+    monkeypatch.setattr("graph.asynthesize_answer", synth)
+    monkeypatch.setattr("graph.interaction_writer", InteractionWriter(sink=lambda b: None))
+
+    g = graph.build_async_graph()
+    out = asyncio.run(g.ainvoke({"query": "Summarize section 2", "meta": {}}))
+    assert out["answer"] == "answer from 1 doc(s)"
+    assert events.index("retrieve-start") < events.index("route-end")
+    assert events.count("retrieve-start") == 1
+
+
+def test_async_graph_writes_interactions_off_the_event_loop(monkeypatch):
+    import time
+
+    async def route(q):
+        return "rag", None
+
+    async def retrieve(q):
+        return [Document(page_content="doc")]
+
+    async def synth(q, docs, packed=None):
+        return "answer"
+
+    def slow_write(batch):
+        time.sleep(0.3)  # summary + embedding + upsert
+
+    monkeypatch.setattr(settings, "semantic_cache_enabled", False)
+    monkeypatch.setattr(settings, "speculative_retrieval", False)
+    monkeypatch.setattr(settings, "interaction_write_behind", False)
+    monkeypatch.setattr("graph.aroute_query", route)
+    monkeypatch.setattr("graph.aretrieve_docs", retrieve)
+    monkeypatch.setattr("graph.asynthesize_answer", synth)
+    monkeypatch.setattr("graph.write_interactions", slow_write)
+
+    g = graph.build_async_graph()
+
+    async def run():
+        started = time.perf_counter()
+        await asyncio.gather(*(g.ainvoke({"query": f"Summarize section {i}", "meta": {}})
+                               for i in range(2)))
+        return time.perf_counter() - started
+
+    assert asyncio.run(run()) < 0.5
+
+
+def test_aretrieve_docs_uses_async_qdrant_client(monkeypatch):
+    class Emb(Embeddings):
+        def embed_documents(self, texts):
+            return [self.embed_query(t) for t in texts]
+
+        def embed_query(self, text):
+            return [1.0, 0.0] if "pump" in text else [0.0, 1.0]
+
+    monkeypatch.setattr(settings, "hybrid_search", False)
+
+    async def run():
+        client = AsyncQdrantClient(location=":memory:")
+        await client.create_collection(settings.docs_collection, vectors_config=VectorParams(
+            size=2, distance=Distance.COSINE))
+        await client.upsert(settings.docs_collection, points=[
+            PointStruct(id=1, vector=[1.0, 0.0], payload={
+                "page_content": "Prime the pump.", "metadata": {"page": 3}}),
+            PointStruct(id=2, vector=[0.0, 1.0], payload={
+                "page_content": "Open the valve.", "metadata": {"page": 4}}),
+        ])
+        with registry.override("async_qdrant", client), \
+                registry.override("embeddings", Emb()):
+            return await aretrieve_docs("pump priming?", k=1)
+
+    docs = asyncio.run(run())
+    assert docs[0].page_content == "Prime the pump."
+    assert docs[0].metadata["page"] == 3
+
+
+def test_aretrieve_docs_uses_overridden_sync_client_over_configured_url(monkeypatch):
+    class Emb(Embeddings):
+        def embed_documents(self, texts):
+            return [self.embed_query(t) for t in texts]
+
+        def embed_query(self, text):
+            return [1.0, 0.0] if "pump" in text else [0.0, 1.0]
+
+    monkeypatch.setattr(settings, "hybrid_search", False)
+    monkeypatch.setattr(settings, "qdrant_url", "http://qdrant.invalid:6333")
+    client = QdrantClient(location=":memory:")
+    client.create_collection(settings.docs_collection, vectors_config=VectorParams(
+        size=2, distance=Distance.COSINE))
+    client.upsert(settings.docs_collection, points=[
+        PointStruct(id=1, vector=[1.0, 0.0], payload={
+            "page_content": "Prime the pump.", "metadata": {"page": 3}}),
+        PointStruct(id=2, vector=[0.0, 1.0], payload={
+            "page_content": "Open the valve.", "metadata": {"page": 4}}),
+    ])
+    with registry.override("qdrant", client), registry.override("embeddings", Emb()):
+        docs = asyncio.run(aretrieve_docs("pump priming?", k=1))
+    assert docs[0].page_content == "Prime the pump."
+
+
+def test_async_search_reads_the_collection_profile_through_the_async_client(monkeypatch):
+    class Emb(Embeddings):
+        def embed_documents(self, texts):
+            return [self.embed_query(t) for t in texts]
+
+        def embed_query(self, text):
+            return [1.0, 0.0]
+
+    class NoSyncCalls:
+        def __getattr__(self, name):
+            raise AssertionError(f"blocking client call {name} on the event loop")
+
+    monkeypatch.setattr(settings, "hybrid_search", False)
+    monkeypatch.setattr(settings, "qdrant_url", "http://qdrant.invalid:6333")
+    int8 = vectorstore.collection_config(2, "int8")["quantization_config"]
+    calls = []
+
+    class AsyncClient:
+        async def get_collection(self, name):
+            calls.append("get_collection")
+            return types.SimpleNamespace(config=types.SimpleNamespace(quantization_config=int8))
+
+        async def query_points(self, collection_name, query, limit, with_payload, with_vectors,
+                               search_params):
+            calls.append(search_params.quantization.oversampling)
+            return types.SimpleNamespace(points=[])
+
+    async def run():
+        for _ in range(3):
+            await aretrieve_docs("pump priming?", k=1)
+
+    with registry.override("qdrant", NoSyncCalls()), \
+            registry.override("async_qdrant", AsyncClient()), \
+            registry.override("embeddings", Emb()):
+        asyncio.run(run())
+    assert calls == ["get_collection", 2.0, 2.0, 2.0]
@@ -0,0 +1,90 @@
+import threading
+import time
+import types
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import AIMessage
+from qdrant_client import QdrantClient
+
+import graph
+import weather
+from router import heuristic_city
+from interactions import InteractionWriter
+from resources import registry
+from settings import settings
+
+
+class CountingEmbeddings(Embeddings):
+    def __init__(self):
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(t)), 1.0] for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+class BoundedLLM:
+    """Callable chat stand-in that records peak concurrency."""
+
+    def __init__(self):
+        self.active = self.peak = self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, prompt):
+        with self.lock:
+            self.active += 1
+            self.calls += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.03)
+        with self.lock:
+            self.active -= 1
+        return AIMessage(content="ok")
+
+
+def test_run_batch_groups_by_route(monkeypatch):
+    fetched, searches = [], []
+
+    def fake_get(url, params=None, timeout=None):
+        fetched.append(params["id"])
+        return types.SimpleNamespace(raise_for_status=lambda: None,
+                                     json=lambda: {"name": str(params["id"]), "main": {"temp": 20}})
+
+    def fake_search(vectors, k, collection=None, with_vectors=False):
+        searches.append(len(vectors))
+        return [[Document(page_content=f"doc {i}.", metadata={"_id": str(i)})]
+                for i in range(len(vectors))]
+
+    monkeypatch.setattr(settings, "semantic_cache_enabled", False)
+    monkeypatch.setattr(settings, "local_router_enabled", False)
+    monkeypatch.setattr(settings, "hybrid_search", False)
+    monkeypatch.setattr("graph.route_query", lambda q: (
+        ("weather", heuristic_city(q)) if "weather" in q else ("rag", None)))
+    monkeypatch.setattr("rag.search_documents_batch", fake_search)
+    monkeypatch.setattr("graph.interaction_writer", InteractionWriter(sink=lambda b: None))
+    weather.weather_cache.clear()
+
+    queries = [
+        "weather in Pune", "weather in poona", "weather in Mumbai and Pune",
+        "weather somewhere", "What does section 2 cover?", "Which part fits the pump?",
+        "Summarize the manual",
+    ]
+    emb, llm = CountingEmbeddings(), BoundedLLM()
+    # An in-memory client keeps the collection-profile lookup offline
+    with registry.override("embeddings", emb), registry.override("llm", llm), \
+            registry.override("http", types.SimpleNamespace(get=fake_get)), \
+            registry.override("qdrant", QdrantClient(location=":memory:")):
+        states = graph.run_batch(queries, concurrency=2)
+
+    assert [s["query"] for s in states] == queries
+    assert sorted(fetched) == [1259229, 1275339]  # Pune once, Mumbai once
+    assert searches == [3]
+    assert emb.calls == [queries[4:]]
+    assert llm.calls == 6 and llm.peak <= 2
+    assert "error" in states[3] and not states[3].get("answer")
+    assert all(s["answer"] == "ok" for i, s in enumerate(states) if i != 3)
+    assert set(states[2]["weather_json"]) == {"Mumbai", "Pune"}
+    assert states[4]["docs"][0].page_content == "doc 0."
@@ -0,0 +1,37 @@
+from benchmarks.bench_suite import compare
+
+
+def _run(**values):
+    better = {"p50_ms": "lower", "qps": "higher", "misrouted": "lower"}
+    units = {"p50_ms": "ms", "qps": "queries/s", "misrouted": ""}
+    return {"metrics": {k: {"value": v, "better": better[k], "unit": units[k]}
+                        for k, v in values.items()}}
+
+
+def test_compare_flags_regressions_in_either_direction():
+    baseline = _run(p50_ms=100.0, qps=50.0, misrouted=0.0)
+    rows = {r["metric"]: r for r in compare(_run(p50_ms=130.0, qps=35.0, misrouted=0.1),
+                                            baseline, threshold=0.2)}
+    assert rows["p50_ms"]["regressed"] and rows["p50_ms"]["worse_by"] == 0.3
+    assert rows["qps"]["regressed"] and rows["qps"]["worse_by"] == 0.3
+    # Any real change from a zero baseline is a regression
+    assert rows["misrouted"]["regressed"] and rows["misrouted"]["worse_by"] == float("inf")
+
+
+def test_compare_ignores_improvements_and_small_jitter():
+    baseline = _run(p50_ms=2.0, qps=50.0)
+    rows = {r["metric"]: r for r in compare(_run(p50_ms=2.8, qps=80.0), baseline, threshold=0.2)}
+    # +40%, but under the 1 ms noise floor
+    assert not rows["p50_ms"]["regressed"]
+    assert not rows["qps"]["regressed"] and rows["qps"]["worse_by"] < 0
+
+
+def test_compare_zero_baseline_tolerates_rounding():
+    rows = {r["metric"]: r for r in compare(_run(misrouted=1e-9), _run(misrouted=0.0),
+                                            threshold=0.2)}
+    assert not rows["misrouted"]["regressed"]
+
+
+def test_compare_skips_metrics_missing_from_baseline():
+    rows = compare(_run(p50_ms=10.0, qps=5.0), _run(p50_ms=10.0), threshold=0.2)
+    assert [r["metric"] for r in rows] == ["p50_ms"]
@@ -0,0 +1,52 @@
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from context import build_context
+from resources import registry
+from settings import settings
+
+TEXT = " ".join(f"Step {i} primes pump {i % 7} before the valve opens." for i in range(60))
+
+
+def _chunks(monkeypatch):
+    monkeypatch.setattr(settings, "chunk_overlap", 120)
+    splitter = RecursiveCharacterTextSplitter(chunk_size=400, chunk_overlap=120)
+    return splitter.split_documents([Document(page_content=TEXT,
+                                              metadata={"source": "m.pdf", "page": 0})])
+
+
+def _words(text):
+    return len(text.split())
+
+
+def test_adjacent_chunks_are_merged_without_overlap(monkeypatch):
+    chunks = _chunks(monkeypatch)
+    with registry.override("tokenizer", _words):
+        packed = build_context([chunks[2], chunks[3], chunks[1], chunks[2]], budget=10_000)
+
+    start = TEXT.index(chunks[1].page_content)
+    end = TEXT.index(chunks[3].page_content) + len(chunks[3].page_content)
+    assert packed.text == TEXT[start:end]
+    assert packed.docs_used == 3
+    assert packed.overlap_tokens > 0
+    assert packed.saved_tokens >= packed.overlap_tokens
+    assert packed.tokens == _words(packed.text)
+
+
+def test_budget_is_respected_and_cut_at_sentence_end(monkeypatch):
+    chunks = _chunks(monkeypatch)
+    other = Document(page_content="Tiny note.", metadata={"source": "x.pdf", "page": 9})
+    with registry.override("tokenizer", _words):
+        packed = build_context([chunks[0], chunks[5], other], budget=110)
+
+    assert packed.tokens <= 110
+    first, second = packed.text.split("\n\n")[:2]
+    assert first == chunks[0].page_content
+    assert second.endswith(".")
+    assert packed.dropped_tokens > 0
+    assert packed.stats()["context_tokens"] == packed.tokens
+
+
+def test_empty_docs():
+    packed = build_context([])
+    assert packed.text == "" and packed.tokens == 0
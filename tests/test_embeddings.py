@@ -0,0 +1,50 @@
+from embeddings import CachedEmbeddings
+
+
+class CountingEmbeddings:
+    def __init__(self):
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(t)), 1.0, 0.5] for t in texts]
+
+    def embed_query(self, text):
+        self.calls.append([text])
+        return [float(len(text)), 1.0, 0.5]
+
+
+def test_cached_embeddings_only_embeds_misses():
+    base = CountingEmbeddings()
+    emb = CachedEmbeddings(base, "tiny-model", max_entries=10)
+
+    emb.embed_documents(["alpha", "beta", "alpha"])
+    assert base.calls == [["alpha", "beta"]]
+
+    vecs = emb.embed_documents(["beta", "gamma"])
+    assert base.calls[-1] == ["gamma"]
+    assert vecs[0] == [4.0, 1.0, 0.5]
+
+    assert emb.embed_query("  alpha ") == [5.0, 1.0, 0.5]
+    assert len(base.calls) == 2
+    assert emb.stats()["misses"] == 3
+
+
+def test_cached_embeddings_lru_evicts_and_disk_persists(tmp_path):
+    base = CountingEmbeddings()
+    emb = CachedEmbeddings(base, "tiny/model", max_entries=1, cache_dir=str(tmp_path))
+    emb.embed_documents(["one", "three"])
+    assert emb.stats()["memory_entries"] == 1
+
+    # A fresh wrapper (new process) reads vectors back from the memmap.
+    base2 = CountingEmbeddings()
+    emb2 = CachedEmbeddings(base2, "tiny/model", max_entries=1, cache_dir=str(tmp_path))
+    assert emb2.embed_query("three") == [5.0, 1.0, 0.5]
+    assert emb2.embed_query("one") == [3.0, 1.0, 0.5]
+    assert base2.calls == []
+    assert emb2.stats()["disk_hits"] == 2
+
+    # Keys include the model name, so another model never reuses them.
+    emb3 = CachedEmbeddings(base2, "other", cache_dir=str(tmp_path))
+    emb3.embed_query("one")
+    assert base2.calls == [["one"]]
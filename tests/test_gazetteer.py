@@ -0,0 +1,46 @@
+from gazetteer import Gazetteer, Place, extract_places, normalize, resolve_place
+
+PUNE = Place(1259229, "Pune", "IN", 18.52, 73.86, 2935744)
+MUMBAI = Place(1275339, "Mumbai", "IN", 19.07, 72.88, 12691836)
+NEW_YORK = Place(5128581, "New York", "US", 40.71, -74.01, 8175133)
+YORK = Place(2633352, "York", "GB", 53.96, -1.08, 144202)
+SAO_PAULO = Place(3448439, "São Paulo", "BR", -23.55, -46.64, 10021295)
+PARIS = Place(2988507, "Paris", "FR", 48.85, 2.35, 2138551)
+PARIS_TX = Place(4717560, "Paris", "US", 33.66, -95.56, 25171)
+NICE = Place(2990440, "Nice", "FR", 43.70, 7.27, 338620)
+
+
+def _gazetteer():
+    return Gazetteer([
+        (PUNE, ["poona"]), (MUMBAI, ["bombay"]), (NEW_YORK, ["nyc"]), (YORK, []),
+        (SAO_PAULO, []), (PARIS_TX, []), (PARIS, []), (NICE, []),
+    ])
+
+
+def test_normalize_strips_case_accents_and_punctuation():
+    assert normalize("  São-Paulo!! ") == "sao paulo"
+    assert normalize("Zürich") == "zurich"
+
+
+def test_find_all_ignores_trailing_words_and_resolves_aliases():
+    g = _gazetteer()
+    assert g.find_all("weather in Pune tomorrow please") == [PUNE]
+    assert g.find_all("compare bombay, poona and sao paulo") == [MUMBAI, PUNE, SAO_PAULO]
+
+
+def test_longest_match_and_population_tiebreak():
+    g = _gazetteer()
+    assert g.find_all("forecast for new york") == [NEW_YORK]
+    assert g.find_all("rain in York?") == [YORK]
+    assert g.find("weather in Paris") == PARIS
+
+
+def test_common_words_need_capitalization():
+    g = _gazetteer()
+    assert g.find_all("is it nice in Nice today") == [NICE]
+    assert g.find_all("is the weather nice") == []
+
+
+def test_bundled_gazetteer():
+    assert resolve_place("Bengaluru").id == resolve_place("bangalore").id
+    assert [p.name for p in extract_places("weather in Mumbai vs Delhi")] == ["Mumbai", "Delhi"]
@@ -0,0 +1,55 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from pydantic import ValidationError
+
+from benchmarks.bench_import import ROOT, check, measure
+from settings import LazySettings
+from tracing import Tracer
+from weather import WeatherCache
+
+
+@pytest.mark.parametrize("module", ["graph", "eval_langsmith"])
+def test_entry_module_imports_lazily(module):
+    # No API keys: settings must not be resolved while importing. The time
+    # budget is left to ``bench_import.py --check`` (best of several runs).
+    env = {k: v for k, v in os.environ.items()
+           if k not in ("GROQ_API_KEY", "OPENWEATHER_API_KEY")}
+    result = measure(module, env)
+    assert check(result, budgets=False) == []
+
+
+def test_keyless_import_exits_cleanly():
+    # Nothing (atexit hooks included) may resolve settings without API keys
+    env = {k: v for k, v in os.environ.items()
+           if k not in ("GROQ_API_KEY", "OPENWEATHER_API_KEY")}
+    proc = subprocess.run([sys.executable, "-c", "import graph"], cwd=ROOT, env=env,
+                          capture_output=True, text=True)
+    assert proc.returncode == 0 and proc.stderr == ""
+
+
+def test_lazy_settings_validate_on_first_use(monkeypatch):
+    monkeypatch.delenv("GROQ_API_KEY")
+    lazy = LazySettings()  # no error yet
+    with pytest.raises(ValidationError):
+        lazy.groq_model
+
+    monkeypatch.setenv("GROQ_API_KEY", "k")
+    lazy = LazySettings()
+    lazy.groq_model = "other"
+    assert lazy.groq_model == "other" and lazy.groq_api_key == "k"
+
+
+def test_defaults_follow_settings_until_set(monkeypatch):
+    from settings import settings
+    monkeypatch.setattr(settings, "weather_cache_ttl", 5.0)
+    monkeypatch.setattr(settings, "weather_stale_ttl", 1.0)
+    monkeypatch.setattr(settings, "tracing_enabled", False)
+    cache, tracer = WeatherCache(), Tracer()
+    assert cache.ttl == 5.0 and cache.stale_ttl == 5.0
+    assert WeatherCache(ttl=2.0, stale_ttl=9.0).stale_ttl == 9.0
+    assert tracer.enabled is False
+    tracer.enabled = True
+    assert tracer.enabled is True
@@ -0,0 +1,70 @@
+import threading
+import types
+
+from interactions import InteractionWriter, summarize_answers
+
+
+def test_writer_batches_and_drains():
+    batches = []
+    writer = InteractionWriter(sink=batches.append, batch_size=4, batch_wait=0.2)
+    for i in range(10):
+        assert writer.submit(f"answer {i}", {"i": i}, embed_text=f"q{i}")
+    assert writer.wait_idle(timeout=5)
+
+    written = [item.metadata["i"] for batch in batches for item in batch]
+    assert written == list(range(10))
+    assert max(len(b) for b in batches) <= 4
+    assert writer.stats()["written"] == 10
+    assert writer.close(timeout=5)
+
+
+def test_writer_backpressure_policies():
+    gate = threading.Event()
+
+    def slow_sink(batch):
+        gate.wait(5)
+
+    oldest = InteractionWriter(sink=slow_sink, max_queue=2, batch_size=1,
+                               batch_wait=0, policy="drop_oldest")
+    newest = InteractionWriter(sink=slow_sink, max_queue=2, batch_size=1,
+                               batch_wait=0, policy="drop_new")
+    for writer in (oldest, newest):
+        writer.submit("first", {})
+        writer.wait_idle(timeout=0.2)  # let the worker pick up the first item
+        results = [writer.submit(f"a{i}", {"i": i}) for i in range(4)]
+        assert writer.stats()["dropped"] == 2
+        if writer is newest:
+            assert results == [True, True, False, False]
+        else:
+            queued = [item.metadata["i"] for item in writer._items]
+            assert queued == [2, 3]
+    gate.set()
+    for writer in (oldest, newest):
+        assert writer.wait_idle(timeout=5)
+        writer.close(timeout=5)
+
+
+def test_failed_batches_are_counted_and_worker_survives():
+    calls = []
+
+    def flaky(batch):
+        calls.append(len(batch))
+        if len(calls) == 1:
+            raise RuntimeError("qdrant down")
+
+    writer = InteractionWriter(sink=flaky, batch_size=1, batch_wait=0)
+    writer.submit("a", {})
+    writer.submit("b", {})
+    assert writer.wait_idle(timeout=5)
+    assert writer.stats()["failed_batches"] == 1
+    assert writer.stats()["written"] == 1
+
+
+def test_summarize_answers_falls_back_on_errors(monkeypatch):
+    class LLM:
+        def batch(self, prompts, return_exceptions=False):
+            return [types.SimpleNamespace(content="short"), RuntimeError("429")]
+
+    monkeypatch.setattr("interactions.get_llm", lambda: LLM())
+    assert summarize_answers(["long answer one", "long answer two"]) == [
+        "short", "long answer two"]
@@ -0,0 +1,56 @@
+from lexical import BM25Index, reciprocal_rank_fusion, tokenize
+
+
+def test_tokenize_keeps_part_numbers_whole_and_split():
+    toks = tokenize("Replace filter AB-1234 per Section 4.2")
+    assert "ab-1234" in toks and "ab" in toks and "1234" in toks
+    assert "4.2" in toks
+
+
+def test_bm25_ranks_exact_matches_and_supports_delete(tmp_path):
+    idx = BM25Index()
+    idx.add(["a", "b", "c"], [
+        "The pump uses seal kit AB-1234.",
+        "General maintenance of the pump and the valve.",
+        "Valve torque specifications.",
+    ])
+    assert idx.search("AB-1234", k=2)[0][0] == "a"
+    assert [pid for pid, _ in idx.search("valve", k=5)] == ["c", "b"]
+
+    idx.delete(["c"])
+    assert [pid for pid, _ in idx.search("valve", k=5)] == ["b"]
+
+    path = str(tmp_path / "docs.bm25")
+    idx.save(path)
+    loaded = BM25Index.load(path)
+    assert len(loaded) == 2
+    loaded.add(["d"], ["valve valve valve"])
+    assert loaded.search("valve", k=1)[0][0] == "d"
+
+
+def test_bm25_deletes_score_like_a_fresh_index():
+    texts = {"a": "pump seal kit", "b": "pump valve torque", "c": "valve seal",
+             "d": "seal seal pump"}
+    idx = BM25Index()
+    idx.add(list(texts), list(texts.values()))
+    idx.delete(["b"])
+    idx.add(["c"], ["valve torque"])  # replacing deletes the old row first
+    idx.delete(["a"])
+    fresh = BM25Index()
+    fresh.add(["d", "c"], [texts["d"], "valve torque"])
+    for query in ("pump", "seal", "valve torque"):
+        assert idx.search(query, k=5) == fresh.search(query, k=5)
+
+    # Deleted rows leave the postings; terms nobody uses any more are dropped
+    assert idx._df == fresh._df
+    assert {tok: len(rows) for tok, (rows, _) in idx._postings.items()} == fresh._df
+    assert "kit" not in idx._postings
+    idx.delete(["c", "d"])
+    assert idx._postings == {} and idx.search("seal", k=5) == []
+
+
+def test_reciprocal_rank_fusion_weights():
+    fused = reciprocal_rank_fusion([["x", "y"], ["y", "z"]], k=60)
+    assert fused[0][0] == "y"
+    fused = reciprocal_rank_fusion([["x", "y"], ["y", "z"]], weights=[1.0, 0.0], k=60)
+    assert fused[0][0] == "x"
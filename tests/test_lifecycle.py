@@ -0,0 +1,137 @@
+import time
+import uuid
+
+import numpy as np
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import Distance, PointStruct, VectorParams
+
+from lifecycle import InteractionMaintainer, duplicate_parents
+from localindex import LocalIndexClient
+from resources import registry
+from settings import settings
+
+DAY = 86400.0
+
+
+def _client(kind, tmp_path):
+    client = QdrantClient(location=":memory:") if kind == "qdrant" else LocalIndexClient(str(tmp_path))
+    client.create_collection(settings.interactions_collection,
+                             vectors_config=VectorParams(size=3, distance=Distance.COSINE))
+    return client
+
+
+def _add(client, vector, **meta):
+    pid = str(uuid.uuid4())
+    client.upsert(settings.interactions_collection, points=[PointStruct(
+        id=pid, vector=vector, payload={"page_content": "nugget", "metadata": meta})])
+    return pid
+
+
+def _meta(client, pid):
+    return client.retrieve(settings.interactions_collection, [pid])[0].payload["metadata"]
+
+
+@pytest.mark.parametrize("kind", ["qdrant", "local"])
+def test_expires_by_route_and_backfills_timestamps(kind, tmp_path):
+    client = _client(kind, tmp_path)
+    now = time.time()
+    _add(client, [1, 0, 0], route="weather", city="pune", created_at=now - 2 * DAY)
+    fresh = _add(client, [0, 1, 0], route="weather", city="pune", created_at=now)
+    rag = _add(client, [0, 0, 1], route="rag", created_at=now - 2 * DAY)
+    _add(client, [1, 1, 0], created_at=now - 8 * DAY)  # no route: "other" TTL
+    legacy = _add(client, [1, 0, 1], route="rag")
+
+    with registry.override("qdrant", client):
+        dry = InteractionMaintainer().run_once(dry_run=True)
+        assert dry.expired == 2 and client.count(settings.interactions_collection).count == 5
+        report = InteractionMaintainer().run_once()
+
+    assert (report.expired, report.merged, report.evicted, report.backfilled) == (2, 0, 0, 1)
+    assert report.reclaimed == 2 and report.remaining == 3
+    assert client.count(settings.interactions_collection).count == 3
+    assert _meta(client, legacy)["created_at"] >= now
+    assert _meta(client, fresh)["city"] == "pune" and _meta(client, rag)["route"] == "rag"
+
+
+@pytest.mark.parametrize("kind", ["qdrant", "local"])
+def test_merges_near_duplicates_into_newest_incrementally(kind, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "interaction_max_points", None)
+    monkeypatch.setattr("lifecycle._SEARCH_SHARE", 1.0)
+    client = _client(kind, tmp_path)
+    now = time.time()
+    mumbai = [_add(client, [1, 0.01 * i, 0], route="weather", city="mumbai", created_at=now - 60 * i)
+              for i in range(3, 0, -1)]
+    pune = _add(client, [1, 0, 0], route="weather", city="pune", created_at=now - 300)
+    rag = _add(client, [0, 1, 0], route="rag", created_at=now - 400)
+    maintainer = InteractionMaintainer()
+
+    with registry.override("qdrant", client):
+        first = maintainer.run_once()
+        newest = _add(client, [1, 0, 0.001], route="weather", city="mumbai", created_at=now)
+        second = maintainer.run_once()
+
+    assert first.merged == 2 and second.merged == 1
+    # Only the new entry and its near-duplicates (any group) were read
+    assert not first.incremental and second.incremental and second.scanned == 3
+    assert _meta(client, newest)["merged"] == 3
+    remaining = {str(p.id) for p in client.scroll(settings.interactions_collection, limit=10)[0]}
+    assert remaining == {newest, pune, rag} and mumbai[-1] not in remaining
+
+
+def test_size_cap_evicts_oldest(monkeypatch):
+    monkeypatch.setattr(settings, "interaction_max_points", 2)
+    monkeypatch.setattr("lifecycle._SEARCH_SHARE", 1.0)
+    client = _client("qdrant", None)
+    now = time.time()
+    ids = [_add(client, v, route="rag", created_at=now - i)
+           for i, v in enumerate([[1, 0, 0], [0, 1, 0], [0, 0, 1]])]
+    maintainer = InteractionMaintainer()
+    with registry.override("qdrant", client):
+        report = maintainer.run_once()
+        newest = _add(client, [1, 1, 0], route="rag", created_at=now + 1)
+        incremental = maintainer.run_once()
+    assert report.evicted == 1 and report.remaining == 2
+    assert client.retrieve(settings.interactions_collection, [ids[2]]) == []
+    assert incremental.scanned == 1 and incremental.evicted == 1 and incremental.remaining == 2
+    remaining = {str(p.id) for p in client.scroll(settings.interactions_collection, limit=10)[0]}
+    assert remaining == {ids[0], newest}
+
+
+
+def test_many_new_points_fall_back_to_a_full_read(monkeypatch):
+    monkeypatch.setattr("lifecycle._SEARCH_SHARE", 0.1)
+    client = _client("qdrant", None)
+    now = time.time()
+    _add(client, [1, 0, 0], route="rag", created_at=now - 10)
+    maintainer = InteractionMaintainer()
+    with registry.override("qdrant", client):
+        maintainer.run_once()
+        _add(client, [0, 1, 0], route="rag", created_at=now)
+        report = maintainer.run_once()
+    assert not report.incremental and report.scanned == 2
+
+
+def test_background_failures_are_recorded():
+    class Down:
+        def collection_exists(self, name):
+            raise ConnectionError("qdrant unreachable")
+
+    maintainer = InteractionMaintainer()
+    with registry.override("qdrant", Down()):
+        maintainer.start(0.01)
+        deadline = time.time() + 2
+        while maintainer.failed_runs < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        maintainer.stop(1)
+    assert maintainer.failed_runs >= 2
+    assert maintainer.last_error == "ConnectionError: qdrant unreachable"
+
+
+def test_blocked_similarity_matches_one_block():
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((50, 4)).repeat(2, axis=0) + 0.01 * rng.standard_normal((100, 4))
+    groups = rng.integers(0, 2, 100)
+    whole = duplicate_parents(vectors, groups, 0.95, block=1024)
+    assert (duplicate_parents(vectors, groups, 0.95, block=7) == whole).all()
+    assert (whole >= 0).sum() > 0
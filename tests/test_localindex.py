@@ -0,0 +1,110 @@
+import json
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+import vectorstore
+from localindex import LocalIndexClient, LocalVectorIndex
+from resources import registry
+from settings import settings
+
+
+class KeywordEmbeddings(Embeddings):
+    WORDS = ["rain", "sun", "pump", "valve"]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(t) for t in texts]
+
+    def embed_query(self, text):
+        text = text.lower()
+        return [float(text.count(w)) + 0.01 for w in self.WORDS]
+
+
+def test_local_index_topk_delete_and_reopen(tmp_path):
+    idx = LocalVectorIndex(str(tmp_path / "c"))
+    idx.upsert(["a", "b", "c"], [[1, 0, 0], [0.9, 0.1, 0], [0, 0, 1]],
+               [{"n": 1}, {"n": 2}, {"n": 3}])
+    hits = idx.search([1, 0, 0], k=2)
+    assert [h[0] for h in hits] == ["a", "b"]
+    assert abs(hits[0][1] - 1.0) < 1e-6
+
+    idx.delete(["a"])
+    idx.upsert(["c"], [[1, 0, 0.01]], [{"n": 33}])
+    assert len(idx) == 2
+
+    reopened = LocalVectorIndex(str(tmp_path / "c"))
+    hits = reopened.search([1, 0, 0], k=5)
+    assert [h[0] for h in hits] == ["c", "b"]
+    assert reopened.payload(hits[0][2]) == {"n": 33}
+
+
+def test_local_index_duplicate_ids_in_one_batch_keep_last_write(tmp_path):
+    idx = LocalVectorIndex(str(tmp_path / "c"))
+    idx.upsert(["a", "b", "a"], [[1, 0, 0], [0, 1, 0], [0.9, 0.1, 0]],
+               [{"n": 1}, {"n": 2}, {"n": 3}])
+    assert len(idx) == 2
+    hits = idx.search([1, 0, 0], k=5)
+    assert [h[0] for h in hits] == ["a", "b"]
+    assert idx.payload(hits[0][2]) == {"n": 3}
+
+    reopened = LocalVectorIndex(str(tmp_path / "c"))
+    assert [h[0] for h in reopened.search([1, 0, 0], k=5)] == ["a", "b"]
+
+
+def test_local_index_compacts_dead_rows(tmp_path):
+    idx = LocalVectorIndex(str(tmp_path / "c"), compact_ratio=0.5)
+    idx.upsert(["a", "b", "c", "d"], [[1, 0, 0], [0, 1, 0], [0, 0, 1], [1, 1, 0]],
+               [{"n": 1}, {"n": 2}, {"n": 3}, {"n": 4}])
+    idx.upsert(["b"], [[0, 1, 0.1]], [{"n": 22}])
+    assert idx.dead_ratio() == 0.2
+    payloads = (tmp_path / "c" / "payloads.jsonl").read_text().splitlines()
+    assert len(payloads) == 5
+
+    idx.delete(["a", "c"])  # 3 of 5 rows dead: rewritten with the live ones
+    assert idx.dead_ratio() == 0.0
+    payloads = (tmp_path / "c" / "payloads.jsonl").read_text().splitlines()
+    assert [json.loads(line)["id"] for line in payloads] == ["d", "b"]
+    hits = idx.search([0, 1, 0], k=5)
+    assert [h[0] for h in hits] == ["b", "d"]
+    assert idx.payload(hits[0][2]) == {"n": 22}
+
+    idx.upsert(["e"], [[0, 0, 1]], [{"n": 5}])
+    reopened = LocalVectorIndex(str(tmp_path / "c"))
+    assert len(reopened) == 3
+    assert [reopened.payload(h[2])["n"] for h in reopened.search([0, 0, 1], k=1)] == [5]
+    assert idx.compact() == 0
+
+
+def test_local_backend_serves_ingest_retrieve_and_interactions(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "vector_backend", "local")
+
+    class Loader:
+        def __init__(self, path):
+            self.path = path
+
+        def lazy_load(self):
+            yield Document(page_content="The pump must be primed before use.",
+                           metadata={"page": 0})
+            yield Document(page_content="Close the valve after draining.",
+                           metadata={"page": 1})
+    monkeypatch.setattr("vectorstore.PyPDFLoader", Loader)
+
+    client = LocalIndexClient(str(tmp_path / "index"))
+    with registry.override("qdrant", client), \
+            registry.override("embeddings", KeywordEmbeddings()):
+        assert vectorstore.ingest_pdf_to_qdrant("manual.pdf") == 2
+        assert vectorstore.ingest_pdf_pipeline("manual.pdf").upserted == 0
+
+        docs = vectorstore.get_vectorstore().as_retriever(
+            search_kwargs={"k": 1}).invoke("how do I close the valve?")
+        assert "valve" in docs[0].page_content
+        assert docs[0].metadata["source"] == "manual.pdf"
+
+        emb = KeywordEmbeddings()
+        batched = vectorstore.search_documents_batch(
+            [emb.embed_query("pump"), emb.embed_query("valve")], k=1)
+        assert "pump" in batched[0][0].page_content
+        assert "valve" in batched[1][0].page_content
+
+        vectorstore.upsert_interaction("Rain expected in Pune.", {"route": "weather"})
+        assert client.count(settings.interactions_collection).count == 1
@@ -27,3 +27,29 @@ def test_retrieve_docs_calls_vectorstore(monkeypatch):
     docs = retrieve_docs("question", k=2)
     assert len(docs) == 1
     assert "Chunk for" in docs[0].page_content
+
+
+def test_retrieve_docs_fuses_lexical_and_dense(monkeypatch):
+    dense_docs = [Document(page_content=f"dense {i}", metadata={"_id": f"d{i}"})
+                  for i in range(3)]
+
+    class DummyVS:
+        def as_retriever(self, search_kwargs=None):
+            class R:
+                def invoke(self, q):
+                    return dense_docs
+            return R()
+
+    class DummyLexical:
+        def __len__(self): return 1
+        def search(self, q, k): return [("p9", 12.0), ("d2", 3.0)]
+
+    monkeypatch.setattr("rag.get_vectorstore", lambda: DummyVS())
+    monkeypatch.setattr("rag.get_lexical_index", lambda: DummyLexical())
+    monkeypatch.setattr("rag.fetch_documents", lambda ids: [
+        Document(page_content="Seal kit AB-1234", metadata={"_id": i}) for i in ids])
+
+    docs = retrieve_docs("AB-1234", k=3)
+    ids = [d.metadata["_id"] for d in docs]
+    assert ids[0] == "d2"  # ranked by both searches
+    assert "p9" in ids
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import Distance, PointStruct, VectorParams
+
+import rerank
+from vectorstore import chunk_id
+from rag import retrieve_docs_batch
+from resources import registry
+from settings import settings
+
+
+def test_mmr_skips_near_duplicates():
+    vectors = np.array([[1.0, 0.0, 0.0], [0.99, 0.05, 0.0], [0.7, 0.0, 0.7]])
+    query = np.array([1.0, 0.0, 0.2])
+    assert rerank.mmr_select(query, vectors, 2, lambda_mult=1.0) == [0, 1]
+    assert rerank.mmr_select(query, vectors, 2, lambda_mult=0.5) == [0, 2]
+
+
+def test_batch_retrieval_reranks_with_stored_vectors(monkeypatch):
+    class Emb:
+        def embed_documents(self, texts):
+            raise AssertionError("questions are embedded once, chunks never")
+
+    client = QdrantClient(location=":memory:")
+    client.create_collection(settings.docs_collection,
+                             vectors_config=VectorParams(size=3, distance=Distance.COSINE))
+    vectors = {1: [1.0, 0.0, 0.0], 2: [0.99, 0.05, 0.0], 3: [0.7, 0.0, 0.7], 4: [0.0, 1.0, 0.0]}
+    client.upsert(settings.docs_collection, points=[
+        PointStruct(id=chunk_id("manual.pdf", f"chunk {i}"), vector=v, payload={"page_content": f"chunk {i}", "metadata": {}})
+        for i, v in vectors.items()])
+    monkeypatch.setattr(settings, "hybrid_search", False)
+    monkeypatch.setattr(settings, "rerank_stages", "mmr")
+    monkeypatch.setattr(settings, "rerank_candidates", 4)
+    monkeypatch.setattr("rag.get_embeddings", lambda: type(
+        "QEmb", (), {"embed_documents": lambda self, t: [[1.0, 0.0, 0.2]] * len(t)})())
+
+    def no_fetch(ids, collection=None):
+        raise AssertionError("vectors come back with the candidate search")
+    monkeypatch.setattr("rerank.fetch_vectors", no_fetch)
+
+    with registry.override("qdrant", client), registry.override("embeddings", Emb()):
+        docs = retrieve_docs_batch(["which chunk?"], k=2)[0]
+    assert [d.page_content for d in docs] == ["chunk 1", "chunk 3"]
+    assert all("_vector" not in d.metadata for d in docs)
+
+
+def test_cross_encoder_scores_are_batched_and_cached():
+    calls = []
+
+    class Model:
+        def predict(self, pairs, batch_size, show_progress_bar):
+            calls.append(list(pairs))
+            return [float(len(text)) for _, text in pairs]
+
+    scorer = rerank.CrossEncoderScorer(Model(), "ce", max_entries=3)
+    pipeline = rerank.RerankPipeline([rerank.CrossEncoderStage(scorer)])
+    docs = [Document(page_content=t) for t in ("a", "ccc", "bb")]
+    result = pipeline.run(["q", "q"], [docs, docs[:2]], k=2)
+
+    assert [[d.page_content for d in ds] for ds in result.docs] == [["ccc", "bb"], ["ccc", "a"]]
+    assert len(calls) == 1 and len(calls[0]) == 3  # one call, repeated pairs scored once
+    assert set(result.timings) == {"cross_encoder"}
+
+    scorer.score([("q", "ccc")])
+    assert len(calls) == 1 and scorer.hits == 1
+    assert scorer.stats()["entries"] == 3
+
+
+def test_unknown_stage_is_rejected():
+    assert rerank.build_pipeline("") is None
+    assert rerank.build_pipeline("mmr").names == ["mmr"]
+    with pytest.raises(ValueError):
+        rerank.stage_names("mmr,colbert")
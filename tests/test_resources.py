@@ -0,0 +1,52 @@
+import threading
+from resources import ResourceRegistry
+
+
+def test_registry_builds_once_per_key():
+    reg = ResourceRegistry()
+    built = []
+
+    def factory():
+        built.append(1)
+        return object()
+
+    a = reg.get("llm", ("m", 0.2), factory)
+    b = reg.get("llm", ("m", 0.2), factory)
+    c = reg.get("llm", ("m", 0.0), factory)
+    assert a is b and a is not c
+    assert len(built) == 2
+    assert reg.stats()["llm"] == {"builds": 2, "hits": 1, "live": 2}
+
+
+def test_registry_concurrent_callers_share_one_build():
+    reg = ResourceRegistry()
+    built = []
+    gate = threading.Event()
+
+    def slow_factory():
+        gate.wait(1)
+        built.append(1)
+        return object()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(
+        reg.get("embeddings", "mini", slow_factory))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    gate.set()
+    for t in threads:
+        t.join()
+    assert len(built) == 1
+    assert all(r is results[0] for r in results)
+
+
+def test_registry_override_and_warm_up():
+    reg = ResourceRegistry()
+    reg.register_warmer("qdrant", lambda: reg.get("qdrant", "url", object))
+    reg.warm_up(background=True).join()
+    assert reg.stats()["qdrant"]["builds"] == 1
+
+    fake = object()
+    with reg.override("qdrant", fake):
+        assert reg.get("qdrant", "url", object) is fake
+    assert reg.get("qdrant", "url", object) is not fake
@@ -1,5 +1,12 @@
-from router import route_query, heuristic_city
+import types
+
+from langchain_core.embeddings import Embeddings
+
+from resources import registry
+from route_classifier import CentroidRouter
+from router import route_query, heuristic_city, route_stats, reset_route_stats
 from router import get_llm
+from settings import settings
 
 
 def test_router_heuristic_weather():
@@ -14,6 +21,7 @@ def test_router_llm_fallback_rag(monkeypatch):
         raise RuntimeError("LLM down")
 
     monkeypatch.setattr("router.get_llm", lambda *a, **k: boom)
+    monkeypatch.setattr(settings, "local_router_enabled", False)
 
     route, city = route_query(
         "Explain section 2 of the document about retrieval.")
@@ -25,3 +33,52 @@ def test_heuristic_city():
     assert heuristic_city("weather in Pune") == "Pune"
     assert heuristic_city("temperature at London?") == "London"
     assert heuristic_city("tell me weather") is None
+
+
+class KeywordEmbeddings(Embeddings):
+    """Two-axis stand-in: weather-ish words vs document-ish words."""
+    WEATHER = {"rain", "umbrella", "sunny", "snow", "hot", "cold", "jacket"}
+    DOCS = {"document", "pdf", "section", "manual", "report", "chapter"}
+
+    def embed_documents(self, texts):
+        return [self.embed_query(t) for t in texts]
+
+    def embed_query(self, text):
+        words = set(text.lower().replace("?", "").split())
+        return [len(words & self.WEATHER) + 0.01, len(words & self.DOCS) + 0.01]
+
+
+def _classifier():
+    return CentroidRouter(KeywordEmbeddings(), {
+        "weather": ["Is it going to rain", "Do I need an umbrella", "Is it sunny"],
+        "rag": ["Summarize the document", "What does the pdf say", "Explain chapter 3"],
+    })
+
+
+def test_local_router_skips_llm_when_confident(monkeypatch):
+    def boom(*args, **kwargs):
+        raise AssertionError("LLM should not be called")
+
+    monkeypatch.setattr("router.get_llm", boom)
+    reset_route_stats()
+    with registry.override("route_classifier", _classifier()):
+        assert route_query("Do I need an umbrella in Pune?") == ("weather", "Pune")
+        assert route_query("Summarize the manual section on pumps") == ("rag", None)
+    assert route_stats() == {"keyword": 0, "local": 2, "llm": 0}
+
+
+def test_local_router_falls_back_to_llm_when_unsure(monkeypatch):
+    calls = []
+
+    def llm(prompt):
+        calls.append(prompt)
+        return types.SimpleNamespace(content="weather")
+
+    monkeypatch.setattr("router.get_llm", lambda *a, **k: llm)
+    reset_route_stats()
+    with registry.override("route_classifier", _classifier()):
+        # No signal on either axis -> tied centroids -> below the margin
+        route, _ = route_query("Tell me about Lisbon")
+    assert route == "weather"
+    assert len(calls) == 1
+    assert route_stats()["llm"] == 1
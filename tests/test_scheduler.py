@@ -0,0 +1,206 @@
+import threading
+import time
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+import scheduler
+from benchmarks.standins import OfflineChatModel, RateLimited
+from scheduler import (LLMDeadlineExceeded, LLMScheduler, ScheduledChatModel,
+                       describe_error, describe_llm_error, llm_deadline, llm_lane)
+
+
+def make_scheduler(**kwargs):
+    opts = dict(max_concurrency=4, max_retries=3, backoff_base=0.01, backoff_max=0.05)
+    opts.update(kwargs)
+    return LLMScheduler(**opts)
+
+
+def scheduled(sched, **kwargs):
+    return ScheduledChatModel(inner=OfflineChatModel(**kwargs), scheduler=sched)
+
+
+def test_retries_rate_limits_honouring_retry_after():
+    sched = make_scheduler()
+    # Every second call is rate limited: attempts 2 and 4 fail
+    llm = scheduled(sched, rate_limit_every=2, retry_after=0.05)
+    assert llm.invoke("hello").content
+    t0 = time.perf_counter()
+    assert llm.invoke([HumanMessage("Weather:\nPune, IN: clear")]).content.startswith("Current conditions")
+    assert time.perf_counter() - t0 >= 0.05
+
+    stats = sched.stats()
+    assert stats["rate_limited"] == 1 and stats["retries"] == 1
+    assert stats["completed"] == 2 and stats["failed"] == 0
+
+
+def test_gives_up_after_max_retries():
+    sched = make_scheduler(max_retries=2)
+    llm = scheduled(sched, rate_limit_every=1)
+    with pytest.raises(RateLimited):
+        llm.invoke("hello")
+    assert sched.stats()["retries"] == 2
+    assert sched.stats()["failed"] == 1
+
+
+def test_non_retryable_errors_raise_immediately():
+    sched = make_scheduler()
+    calls = []
+
+    def boom():
+        calls.append(1)
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        sched.run(boom, tokens=10)
+    assert len(calls) == 1
+
+
+def test_request_bucket_paces_calls():
+    # Burst of 2, then one request per 50 ms
+    sched = make_scheduler(requests_per_minute=1200)
+    sched.requests.capacity = sched.requests.level = 2
+    t0 = time.perf_counter()
+    for _ in range(4):
+        sched.run(lambda: None, tokens=1)
+    assert time.perf_counter() - t0 >= 0.09
+
+
+def test_token_bucket_settles_against_reported_usage():
+    sched = make_scheduler(tokens_per_minute=60_000)
+    before = sched.tokens.level
+    sched.run(lambda: "x", tokens=500, usage=lambda _: 100)
+    # Only the 100 tokens actually used are charged (plus a little refill)
+    assert before - 100 <= sched.tokens.level <= before
+
+
+def test_interactive_lane_served_before_background():
+    sched = make_scheduler(max_concurrency=1)
+    release = threading.Event()
+    order = []
+
+    holder = threading.Thread(target=lambda: sched.run(release.wait, tokens=1))
+    holder.start()
+    while sched.stats()["active"] == 0:
+        time.sleep(0.005)
+
+    def call(lane):
+        with llm_lane(lane):
+            sched.run(lambda: order.append(lane), tokens=1)
+
+    background = threading.Thread(target=call, args=("background",))
+    background.start()
+    while sched.stats()["queued"]["background"] == 0:
+        time.sleep(0.005)
+    interactive = threading.Thread(target=call, args=("interactive",))
+    interactive.start()
+    while sched.stats()["queued"]["interactive"] == 0:
+        time.sleep(0.005)
+    assert sched.stats()["max_queue_depth"] == 2
+
+    release.set()
+    for t in (holder, background, interactive):
+        t.join(2)
+    assert order == ["interactive", "background"]
+
+
+def test_deadline_while_queued():
+    sched = make_scheduler(max_concurrency=1)
+    release = threading.Event()
+    holder = threading.Thread(target=lambda: sched.run(release.wait, tokens=1))
+    holder.start()
+    while sched.stats()["active"] == 0:
+        time.sleep(0.005)
+    try:
+        with llm_deadline(0.05), pytest.raises(LLMDeadlineExceeded) as err:
+            sched.run(lambda: None, tokens=1)
+    finally:
+        release.set()
+        holder.join(2)
+    assert sched.stats()["deadline_exceeded"] == 1
+    assert sched.stats()["queued"]["interactive"] == 0
+    assert "try again" in describe_llm_error(err.value)
+
+
+def test_retry_after_beyond_deadline_fails_fast():
+    sched = make_scheduler()
+    llm = scheduled(sched, rate_limit_every=1, retry_after=5)
+    t0 = time.perf_counter()
+    with llm_deadline(1.0), pytest.raises(LLMDeadlineExceeded):
+        llm.invoke("hello")
+    assert time.perf_counter() - t0 < 0.5
+
+
+def test_stream_retries_before_first_chunk():
+    sched = make_scheduler()
+    llm = scheduled(sched, rate_limit_every=2, retry_after=0.01)
+    llm.invoke("warm")  # call 1 succeeds, the stream's first attempt is call 2
+    chunks = list(llm.stream([HumanMessage("Weather:\nPune, IN: clear")]))
+    assert len(chunks) > 1
+    assert "".join(c.content for c in chunks).startswith("Current conditions: Pune")
+    assert sched.stats()["retries"] == 1
+
+
+def test_async_invoke_goes_through_scheduler():
+    import asyncio
+    sched = make_scheduler()
+    llm = scheduled(sched, rate_limit_every=2, retry_after=0.01)
+    out = asyncio.run(llm.abatch(["a", "b", "c"]))
+    assert len(out) == 3
+    assert sched.stats()["completed"] == 3
+
+
+def test_cancelled_async_call_leaves_queue_without_taking_a_slot():
+    import asyncio
+    sched = make_scheduler(max_concurrency=1)
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def hold():
+            await release.wait()
+
+        holder = asyncio.create_task(sched.arun(hold, tokens=1))
+        while sched.stats()["active"] == 0:
+            await asyncio.sleep(0.005)
+        queued = asyncio.create_task(sched.arun(asyncio.sleep, tokens=1))
+        while sched.stats()["queued"]["interactive"] == 0:
+            await asyncio.sleep(0.005)
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        release.set()
+        await holder
+        with llm_deadline(1.0):
+            return await sched.arun(lambda: asyncio.sleep(0, "after"), tokens=1)
+
+    assert asyncio.run(scenario()) == "after"
+    stats = sched.stats()
+    assert stats["active"] == 0
+    assert stats["queued"]["interactive"] == 0
+
+
+def test_get_llm_wraps_groq_in_shared_scheduler():
+    import llm as llm_module
+    from resources import registry
+    with registry.override("llm_scheduler", make_scheduler()):
+        model = llm_module.get_llm(temperature=0.7)
+        assert isinstance(model, ScheduledChatModel)
+        assert model.inner.max_retries == 0
+        assert model._sched() is scheduler.get_scheduler()
+
+
+def test_describe_llm_error_hides_other_errors():
+    assert "rate limit" in describe_llm_error(RateLimited(1))
+    assert describe_llm_error(RuntimeError("secret stack detail")) is None
+
+
+def test_describe_error_keeps_input_guidance_and_hides_internals():
+    import graph
+    with pytest.raises(ValueError) as err:
+        graph._require_city({"route": "weather", "city": None})
+    assert describe_error(err.value) == f"❌ Error: {err.value}"
+    assert "Could not infer city" in describe_error(err.value)
+    assert "rate limit" in describe_error(RateLimited(1))
+    generic = describe_error(RuntimeError("secret stack detail"))
+    assert "secret" not in generic and "went wrong" in generic
@@ -0,0 +1,83 @@
+import types
+
+from langchain_core.embeddings import Embeddings
+
+import graph
+import vectorstore
+from interactions import InteractionWriter
+from localindex import LocalIndexClient
+from resources import registry
+from semantic_cache import SemanticCache
+from settings import settings
+
+
+class BagEmbeddings(Embeddings):
+    VOCAB = ["weather", "pune", "mumbai", "pump", "prime", "valve", "how"]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(t) for t in texts]
+
+    def embed_query(self, text):
+        text = text.lower()
+        return [float(text.count(w)) for w in self.VOCAB] + [0.1]
+
+
+def _local(tmp_path):
+    return LocalIndexClient(str(tmp_path / "index"))
+
+
+def test_graph_serves_repeat_question_from_cache(monkeypatch, tmp_path):
+    calls = {"synth": 0}
+
+    def synth(q, docs, packed=None):
+        calls["synth"] += 1
+        return "Prime the pump first."
+
+    monkeypatch.setattr("graph.route_query", lambda q: ("rag", None))
+    monkeypatch.setattr("graph.retrieve_docs", lambda q: [])
+    monkeypatch.setattr("graph.synthesize_answer", synth)
+    class SummaryLLM:
+        def batch(self, prompts, return_exceptions=False):
+            return [types.SimpleNamespace(content="Pump needs priming.") for _ in prompts]
+
+    monkeypatch.setattr("interactions.get_llm", lambda: SummaryLLM())
+    monkeypatch.setattr("graph.semantic_cache", SemanticCache())
+    writer = InteractionWriter(batch_wait=0)
+    monkeypatch.setattr("graph.interaction_writer", writer)
+
+    with registry.override("qdrant", _local(tmp_path)), \
+            registry.override("embeddings", BagEmbeddings()):
+        g = graph.build_graph()
+        first = g.invoke({"query": "How do I prime the pump?", "meta": {}})
+        assert writer.wait_idle(timeout=5)
+        second = g.invoke({"query": "how do I prime the pump", "meta": {}})
+
+        assert first["meta"]["cache"] == "miss"
+        assert second["meta"]["cache"] == "hit"
+        assert second["answer"] == "Prime the pump first."
+        assert calls["synth"] == 1
+
+        # Re-ingesting documents invalidates cached document answers
+        vectorstore._bump_collection_version(settings.docs_collection)
+        third = g.invoke({"query": "How do I prime the pump?", "meta": {}})
+        assert third["meta"]["cache"] == "miss"
+        assert writer.wait_idle(timeout=5)
+        assert graph.semantic_cache.stats()["hits"] == 1
+
+
+def test_weather_entries_expire_and_are_city_specific(monkeypatch, tmp_path):
+    cache = SemanticCache()
+    with registry.override("qdrant", _local(tmp_path)), \
+            registry.override("embeddings", BagEmbeddings()):
+        state = {"query": "weather in Pune", "route": "weather",
+                 "city": "Pune", "answer": "Sunny, 31°C."}
+        vectorstore.upsert_interaction("Pune sunny", cache.entry_metadata(state),
+                                       embed_text=state["query"])
+
+        assert cache.lookup("Weather in pune")["answer"] == "Sunny, 31°C."
+        monkeypatch.setattr(settings, "semantic_cache_threshold", 0.5)
+        assert cache.lookup("weather in Mumbai pune") is None
+
+        monkeypatch.setattr(settings, "semantic_cache_weather_ttl", -1)
+        assert cache.lookup("weather in Pune") is None
+        assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
@@ -0,0 +1,42 @@
+from langchain_core.documents import Document
+from langchain_core.language_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+import graph
+from interactions import InteractionWriter
+from rag import stream_answer
+from settings import settings
+
+
+def _fake_llm(text):
+    # Streams the reply word by word
+    return GenericFakeChatModel(messages=iter([AIMessage(content=text)]))
+
+
+def test_stream_answer_yields_tokens_incrementally(monkeypatch):
+    monkeypatch.setattr("rag.get_llm", lambda: _fake_llm("Prime the pump [chunk-1]"))
+    docs = [Document(page_content="Prime the pump.", metadata={"page": 3})]
+
+    tokens = list(stream_answer("How do I prime?", docs))
+    assert len(tokens) > 1
+    assert "".join(tokens) == "Prime the pump [chunk-1]"
+
+
+def test_stream_graph_streams_answer_tokens_and_reports_timing(monkeypatch):
+    monkeypatch.setattr(settings, "semantic_cache_enabled", False)
+    monkeypatch.setattr("graph.route_query", lambda q: ("rag", None))
+    monkeypatch.setattr("graph.retrieve_docs", lambda q: [
+        Document(page_content="Open the valve.", metadata={"page": 4})])
+    monkeypatch.setattr("rag.get_llm", lambda: _fake_llm("Open the valve first [chunk-1]"))
+    monkeypatch.setattr("graph.interaction_writer", InteractionWriter(sink=lambda b: None))
+
+    events = list(graph.stream_graph(graph.build_graph(), {"query": "valve?", "meta": {}}))
+    tokens = [payload for kind, payload in events if kind == "token"]
+    kind, state = events[-1]
+
+    assert kind == "state"
+    assert len(tokens) > 1
+    assert "".join(tokens) == state["answer"] == "Open the valve first [chunk-1]"
+    meta = state["meta"]
+    assert meta["stream_tokens"] == len(tokens)
+    assert 0 <= meta["ttft_s"] <= meta["total_s"]
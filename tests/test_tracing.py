@@ -0,0 +1,174 @@
+import threading
+import time
+import urllib.request
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.language_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+import graph
+from interactions import InteractionWriter
+from resources import get_io_executor
+from settings import settings
+from tracing import NOOP_SPAN, Tracer, in_context, serve_metrics, tracer
+
+
+@pytest.fixture
+def shared_tracer(monkeypatch):
+    monkeypatch.setattr(tracer, "enabled", True)
+    tracer.reset()
+    yield tracer
+    tracer.reset()
+
+
+def test_spans_feed_histograms_totals_and_outcomes():
+    t = Tracer(enabled=True, history=5)
+    for ms in (1, 2, 3, 40):
+        with t.span("owm.http", bytes=100, cache="miss"):
+            time.sleep(ms / 1000)
+    with pytest.raises(ValueError):
+        with t.span("owm.http"):
+            raise ValueError("boom")
+
+    row = t.stats()["owm.http"]
+    assert row["count"] == 5
+    assert row["bytes"] == 400
+    assert row["cache=miss"] == 4 and row["error=ValueError"] == 1
+    assert row["p50_ms"] <= row["p95_ms"] <= row["p99_ms"]
+    assert row["p99_ms"] >= 30
+
+
+def test_prometheus_text_is_cumulative():
+    t = Tracer(enabled=True, history=5)
+    t.record("node.router", 0.003)
+    t.record("node.router", 0.2, tokens=12)
+    text = t.render_prometheus()
+
+    assert '# TYPE assistant_span_seconds histogram' in text
+    assert 'assistant_span_seconds_bucket{span="node.router",le="0.005"} 1' in text
+    assert 'assistant_span_seconds_bucket{span="node.router",le="0.25"} 2' in text
+    assert 'assistant_span_seconds_bucket{span="node.router",le="+Inf"} 2' in text
+    assert 'assistant_span_seconds_count{span="node.router"} 2' in text
+    assert 'assistant_span_attr_total{span="node.router",attr="tokens"} 12' in text
+    assert 'quantile="0.99"' in text
+
+
+def test_disabled_tracer_records_nothing():
+    t = Tracer(enabled=False, history=5)
+    assert t.span("x", a=1) is NOOP_SPAN
+    with t.span("x") as sp:
+        sp.set(tokens=3)
+    with t.request("query") as trace:
+        assert trace is None
+    assert t.stats() == {} and t.recent() == []
+
+
+def test_request_collects_spans_from_worker_threads():
+    t = Tracer(enabled=True, history=5)
+
+    def work():
+        with t.span("worker"):
+            pass
+
+    with t.request("query") as trace:
+        with t.span("outer"):
+            get_io_executor().submit(in_context(work)).result()
+
+    names = [row["span"] for row in trace.timeline()]
+    assert names == ["outer", "worker"] or names == ["worker", "outer"]
+    assert t.recent()[-1] is trace and t.stats()["request"]["count"] == 1
+
+
+def test_in_context_runs_concurrently_on_many_threads():
+    t = Tracer(enabled=True, history=5)
+    barrier = threading.Barrier(4)
+
+    def work(i):
+        barrier.wait(2)
+        with t.span("worker"):
+            return i
+
+    with t.request("query") as trace:
+        assert list(get_io_executor().map(in_context(work), range(4))) == [0, 1, 2, 3]
+    assert len(trace.spans) == 4
+
+
+def _slow_step():
+    time.sleep(0.05)
+
+
+def test_slow_request_keeps_sampled_stacks(monkeypatch):
+    monkeypatch.setattr(settings, "profile_slow_requests", True)
+    monkeypatch.setattr(settings, "profile_slow_ms", 10.0)
+    monkeypatch.setattr(settings, "profile_interval_ms", 2.0)
+    t = Tracer(enabled=True, history=5)
+    with t.request("slow") as trace:
+        _slow_step()
+    assert trace.profile
+    assert "test_tracing.py:_slow_step" in trace.folded()
+
+    # Fast requests drop their samples
+    monkeypatch.setattr(settings, "profile_slow_ms", 10_000.0)
+    with t.request("fast") as trace:
+        _slow_step()
+    assert trace.profile is None
+
+
+def test_stream_graph_traces_each_node(monkeypatch, shared_tracer):
+    monkeypatch.setattr(settings, "semantic_cache_enabled", False)
+    monkeypatch.setattr("graph.route_query", lambda q: ("rag", None))
+    monkeypatch.setattr("graph.retrieve_docs", lambda q: [
+        Document(page_content="Open the valve.", metadata={"page": 4})])
+    monkeypatch.setattr("rag.get_llm", lambda: GenericFakeChatModel(
+        messages=iter([AIMessage(content="Open the valve first")])))
+    monkeypatch.setattr("graph.interaction_writer", InteractionWriter(sink=lambda b: None))
+
+    list(graph.stream_graph(graph.build_graph(), {"query": "valve?", "meta": {}}))
+
+    trace = shared_tracer.recent()[-1]
+    names = [row["span"] for row in trace.timeline()]
+    assert [n for n in names if n.startswith("node.")] == [
+        "node.cache", "node.router", "node.rag", "node.finalize"]
+    assert "context.pack" in names
+    assert trace.attrs["route"] == "rag" and trace.attrs["tokens"] > 1
+    assert shared_tracer.stats()["node.rag"]["count"] == 1
+
+
+def test_weather_fetch_span_reports_cache_result(monkeypatch, shared_tracer):
+    import weather
+    monkeypatch.setattr(weather, "_fetch_weather_upstream",
+                        lambda location, units, lang: {"name": "Pune"})
+    weather.weather_cache.clear()
+    weather.fetch_weather("Pune")
+    weather.fetch_weather("Pune")
+    row = shared_tracer.stats()["weather.fetch"]
+    assert row["cache=miss"] == 1 and row["cache=hit"] == 1
+
+
+def test_metrics_endpoint_serves_prometheus_text(shared_tracer):
+    shared_tracer.record("node.cache", 0.01)
+    server = serve_metrics(0, host="127.0.0.1")
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url, timeout=5) as resp:
+            body = resp.read().decode()
+        assert resp.headers["Content-Type"].startswith("text/plain")
+        assert 'assistant_span_seconds_count{span="node.cache"} 1' in body
+    finally:
+        server.shutdown()
+
+
+def test_profile_follows_graph_node_threads(monkeypatch, shared_tracer):
+    monkeypatch.setattr(settings, "profile_slow_requests", True)
+    monkeypatch.setattr(settings, "profile_slow_ms", 10.0)
+    monkeypatch.setattr(settings, "profile_interval_ms", 2.0)
+
+    def slow_cache(state):
+        _slow_step()
+        return {**state, "route": "unknown"}
+
+    g = graph._compile({"cache": slow_cache, "router": lambda s: s, "weather": lambda s: s,
+                        "rag": lambda s: s, "finalize": lambda s: s})
+    list(graph.stream_graph(g, {"query": "q", "meta": {}}))
+    assert "test_tracing.py:_slow_step" in shared_tracer.recent()[-1].folded()
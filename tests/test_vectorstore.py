@@ -0,0 +1,312 @@
+import shutil
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from qdrant_client import QdrantClient
+
+import vectorstore
+from resources import registry
+from settings import settings
+
+
+class FakeEmbeddings(Embeddings):
+    def embed_documents(self, texts):
+        return [[float(len(t) % 7), 1.0, 0.25, 0.5] for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def fake_loader(n_pages, edited_page=None):
+    class Loader:
+        def __init__(self, path):
+            self.path = path
+
+        def lazy_load(self):
+            for i in range(n_pages):
+                text = " ".join(f"page{i} sentence {j}." for j in range(120))
+                if i == edited_page:
+                    text = text.replace("sentence 100.", "revised sentence.")
+                yield Document(page_content=text,
+                               metadata={"source": self.path, "page": i})
+    return Loader
+
+
+def test_ingest_pipeline_streams_batches_into_qdrant(monkeypatch):
+    monkeypatch.setattr("vectorstore.PyPDFLoader", fake_loader(5))
+    client = QdrantClient(location=":memory:")
+    seen = []
+
+    with registry.override("qdrant", client), \
+            registry.override("embeddings", FakeEmbeddings()):
+        report = vectorstore.ingest_pdf_pipeline(
+            "manual.pdf", collection="docs_test", batch_size=3,
+            on_progress=lambda p: seen.append(p.chunks_upserted))
+
+    assert report.pages == 5
+    assert report.chunks > 5
+    assert client.count("docs_test").count == report.chunks
+    assert seen == sorted(seen) and seen[-1] == report.chunks
+
+    point = client.scroll("docs_test", limit=1)[0][0]
+    assert point.payload["metadata"]["source"] == "manual.pdf"
+    assert point.payload["page_content"]
+
+
+def test_ingest_pipeline_creates_the_collection_for_a_pdf_without_text(monkeypatch):
+    monkeypatch.setattr("vectorstore.PyPDFLoader", fake_loader(0))
+    client = QdrantClient(location=":memory:")
+    with registry.override("qdrant", client), \
+            registry.override("embeddings", FakeEmbeddings()):
+        report = vectorstore.ingest_pdf_pipeline("scanned.pdf", collection="docs_empty")
+    assert report.chunks == 0
+    assert client.count("docs_empty").count == 0
+    assert client.get_collection("docs_empty").config.params.vectors.size == 4
+
+
+def test_reingestion_only_writes_changed_chunks(monkeypatch):
+    client = QdrantClient(location=":memory:")
+
+    def ingest(loader):
+        monkeypatch.setattr("vectorstore.PyPDFLoader", loader)
+        with registry.override("qdrant", client), \
+                registry.override("embeddings", FakeEmbeddings()):
+            return vectorstore.ingest_pdf_pipeline(
+                "/tmp/upload123.pdf", collection="docs_inc", source="manual.pdf")
+
+    first = ingest(fake_loader(4))
+    assert first.upserted == first.chunks and first.skipped == 0
+
+    again = ingest(fake_loader(4))
+    assert again.upserted == 0 and again.deleted == 0
+    assert client.count("docs_inc").count == first.chunks
+
+    # Edit one page and drop the last one
+    edited = ingest(fake_loader(3, edited_page=1))
+    # The edit may fall inside the overlap of two neighbouring chunks
+    assert 1 <= edited.upserted <= 2
+    assert edited.deleted == first.chunks - edited.skipped
+    assert client.count("docs_inc").count == edited.chunks
+
+    # Without the manifest, the chunk set is rebuilt from Qdrant itself
+    shutil.rmtree(settings.ingest_manifest_dir)
+    rebuilt = ingest(fake_loader(3, edited_page=1))
+    assert rebuilt.upserted == 0 and rebuilt.deleted == 0
+
+
+def test_ingest_pipeline_propagates_stage_errors(monkeypatch):
+    monkeypatch.setattr("vectorstore.PyPDFLoader", fake_loader(3))
+
+    class Broken(FakeEmbeddings):
+        def embed_documents(self, texts):
+            raise RuntimeError("model crashed")
+
+    with registry.override("qdrant", QdrantClient(location=":memory:")), \
+            registry.override("embeddings", Broken()):
+        try:
+            vectorstore.ingest_pdf_to_qdrant("manual.pdf", collection="docs_err")
+        except RuntimeError as e:
+            assert "model crashed" in str(e)
+        else:
+            raise AssertionError("expected failure")
+
+
+class CountingEmbeddings(FakeEmbeddings):
+    def __init__(self):
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(len(texts))
+        return super().embed_documents(texts)
+
+
+def test_bulk_ingest_shares_embedding_batches_and_isolates_failures(monkeypatch):
+    base = fake_loader(3)
+
+    def loader(path):
+        if path == "broken.pdf":
+            raise ValueError("not a PDF")
+        return base(path)
+
+    monkeypatch.setattr("vectorstore.PyPDFLoader", loader)
+    client = QdrantClient(location=":memory:")
+    embeddings = CountingEmbeddings()
+    paths = ["a.pdf", "broken.pdf", "b.pdf", "c.pdf"]
+
+    with registry.override("qdrant", client), registry.override("embeddings", embeddings):
+        report = vectorstore.ingest_pdfs(paths, collection="docs_bulk", workers=1,
+                                         embed_batch_size=10)
+        again = vectorstore.ingest_pdfs(paths, collection="docs_bulk", workers=1)
+
+    assert [f.source for f in report.failed] == ["broken.pdf"]
+    assert "not a PDF" in report.failed[0].error
+    per_file = next(f.chunks for f in report.files if f.source == "a.pdf")
+    assert report.chunks == client.count("docs_bulk").count == 3 * per_file
+    # Chunks of several files share embedding calls
+    assert sum(embeddings.calls) == 3 * per_file and max(embeddings.calls) == 10
+    assert again.upserted == 0 and sum(f.skipped for f in again.files) == 3 * per_file
+
+
+def test_bulk_ingest_retries_a_failed_batch_file_by_file(monkeypatch):
+    base = fake_loader(3)
+
+    class Loader(base):
+        def lazy_load(self):
+            for doc in super().lazy_load():
+                if self.path == "bad.pdf":
+                    doc.page_content = "POISON " + doc.page_content
+                yield doc
+
+    class Picky(FakeEmbeddings):
+        def embed_documents(self, texts):
+            if any("POISON" in t for t in texts):
+                raise RuntimeError("model crashed")
+            return super().embed_documents(texts)
+
+    monkeypatch.setattr("vectorstore.PyPDFLoader", Loader)
+    client = QdrantClient(location=":memory:")
+    with registry.override("qdrant", client), registry.override("embeddings", Picky()):
+        report = vectorstore.ingest_pdfs(["a.pdf", "bad.pdf", "b.pdf"], collection="docs_iso",
+                                         workers=1, embed_batch_size=7)
+
+    assert [f.source for f in report.failed] == ["bad.pdf"]
+    per_file = next(f.chunks for f in report.files if f.source == "a.pdf")
+    assert next(f.chunks for f in report.files if f.source == "b.pdf") == per_file
+    assert client.count("docs_iso").count == 2 * per_file
+
+
+def test_bulk_ingest_matches_single_file_pipeline_in_worker_processes(tmp_path):
+    from benchmarks.standins import synthetic_manual, write_text_pdf
+    paths = []
+    for i in range(3):
+        paths.append(str(tmp_path / f"manual_{i}.pdf"))
+        write_text_pdf(paths[-1], synthetic_manual(2, seed=i)[0])
+    (tmp_path / "broken.pdf").write_bytes(b"%PDF-1.4\nnot really a pdf\n")
+    paths.append(str(tmp_path / "broken.pdf"))
+
+    bulk, single = QdrantClient(location=":memory:"), QdrantClient(location=":memory:")
+    with registry.override("embeddings", FakeEmbeddings()):
+        with registry.override("qdrant", bulk):
+            report = vectorstore.ingest_pdfs(paths, collection="docs_a", workers=2)
+        with registry.override("qdrant", single):
+            for path in paths[:3]:
+                vectorstore.ingest_pdf_pipeline(path, collection="docs_b")
+
+    assert len(report.failed) == 1 and report.failed[0].source.endswith("broken.pdf")
+    ids = {str(p.id) for p in bulk.scroll("docs_a", limit=1000)[0]}
+    assert ids == {str(p.id) for p in single.scroll("docs_b", limit=1000)[0]}
+    assert report.chunks == len(ids)
+
+
+def test_quantized_profiles_keep_originals_on_disk_and_rescore(monkeypatch):
+    monkeypatch.setattr(settings, "hnsw_m", 32)
+    int8 = vectorstore.collection_config(8, "int8")
+    assert int8["vectors_config"].on_disk is True
+    assert int8["hnsw_config"].m == 32
+    assert int8["quantization_config"].scalar.always_ram is True
+    assert vectorstore.collection_config(8, "binary")["quantization_config"].binary
+    assert "quantization_config" not in vectorstore.collection_config(8, "float")
+
+    monkeypatch.setattr(settings, "vector_backend", "qdrant")
+    monkeypatch.setattr(settings, "qdrant_url", ":memory:")
+    assert vectorstore.search_params("int8") is None  # in-process search is exact
+    monkeypatch.setattr(settings, "qdrant_url", "http://qdrant:6333")
+    params = vectorstore.search_params("binary")
+    assert params.quantization.rescore and params.quantization.oversampling == 3.0
+    assert vectorstore.search_params("float") is None
+
+
+def test_collection_vector_size_comes_from_the_embedding_model(monkeypatch):
+    monkeypatch.setattr(settings, "vector_profile", "int8")
+    client = QdrantClient(location=":memory:")
+    with registry.override("embeddings", FakeEmbeddings()):
+        vectorstore.ensure_collection(client, "docs_sized")
+    vectors = client.get_collection("docs_sized").config.params.vectors
+    assert vectors.size == 4 and vectors.on_disk
+
+
+def test_batch_search_sends_search_params(monkeypatch):
+    monkeypatch.setattr(settings, "vector_profile", "int8")
+    monkeypatch.setattr(settings, "vector_backend", "qdrant")
+    monkeypatch.setattr(settings, "qdrant_url", "http://qdrant:6333")
+    sent = []
+
+    class Client:
+        def query_batch_points(self, collection_name, requests):
+            sent.extend(requests)
+            return [type("Res", (), {"points": []})() for _ in requests]
+
+    with registry.override("qdrant", Client()):
+        assert vectorstore.search_documents_batch([[1.0, 0.0]], k=4) == [[]]
+    assert sent[0].params.quantization.oversampling == 2.0
+
+
+def test_search_params_follow_the_stored_profile_and_mismatches_warn(monkeypatch):
+    import types
+    import warnings
+    from qdrant_client.http import models
+
+    monkeypatch.setattr(settings, "vector_backend", "qdrant")
+    monkeypatch.setattr(settings, "qdrant_url", "http://qdrant:6333")
+    monkeypatch.setattr(settings, "vector_profile", "float")
+    int8 = vectorstore.collection_config(4, "int8")["quantization_config"]
+
+    class Client:
+        def get_collections(self):
+            return types.SimpleNamespace(collections=[types.SimpleNamespace(name="docs_q")])
+
+        def get_collection(self, name):
+            return types.SimpleNamespace(config=types.SimpleNamespace(quantization_config=int8))
+
+    client = Client()
+    with registry.override("qdrant", client):
+        params = vectorstore.search_params(collection="docs_q")
+        assert isinstance(int8, models.ScalarQuantization)
+        assert params.quantization.rescore and params.quantization.oversampling == 2.0
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            vectorstore.ensure_collection(client, "docs_q")
+            vectorstore.ensure_collection(client, "docs_q", profile="int8")
+    registry.clear("vector_profile")
+    assert len(caught) == 1 and "'int8' vector profile, not 'float'" in str(caught[0].message)
+
+
+
+
+def test_collection_profile_is_read_once_until_the_collection_is_created(monkeypatch):
+    import types
+
+    monkeypatch.setattr(settings, "vector_backend", "qdrant")
+    monkeypatch.setattr(settings, "qdrant_url", "http://qdrant:6333")
+    monkeypatch.setattr(settings, "vector_profile", "binary")
+    int8 = vectorstore.collection_config(4, "int8")["quantization_config"]
+    reads = []
+
+    class Client:
+        def __init__(self):
+            self.names = []
+
+        def get_collections(self):
+            return types.SimpleNamespace(
+                collections=[types.SimpleNamespace(name=n) for n in self.names])
+
+        def create_collection(self, collection_name, **config):
+            self.names.append(collection_name)
+
+        def get_collection(self, name):
+            reads.append(name)
+            if name not in self.names:
+                raise KeyError(name)
+            return types.SimpleNamespace(config=types.SimpleNamespace(quantization_config=int8))
+
+    client = Client()
+    with registry.override("qdrant", client):
+        # Not created yet: VECTOR_PROFILE, remembered rather than re-read per search
+        for _ in range(3):
+            assert vectorstore.search_params(collection="docs_p").quantization.oversampling == 3.0
+        assert reads == ["docs_p"]
+
+        vectorstore.ensure_collection(client, "docs_p", vector_size=4, profile="int8")
+        for _ in range(3):
+            assert vectorstore.search_params(collection="docs_p").quantization.oversampling == 2.0
+        assert reads == ["docs_p", "docs_p"]
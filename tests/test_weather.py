@@ -1,5 +1,14 @@
+import threading
+import time
 import types
-from weather import fetch_weather, summarize_weather
+import weather
+from weather import fetch_weather, summarize_weather, WeatherCache
+
+PUNE_ID = 1259229
+
+
+def _fake_session(fake_get):
+    return lambda: types.SimpleNamespace(get=fake_get)
 
 
 def test_fetch_weather_builds_params(monkeypatch):
@@ -14,14 +23,80 @@ def test_fetch_weather_builds_params(monkeypatch):
             def json(self): return {"main": {"temp": 30},
                                     "name": params.get('q', '?')}
         return R()
-    monkeypatch.setattr("weather.requests.get", fake_get)
+    monkeypatch.setattr("weather.get_http_session", _fake_session(fake_get))
+    weather.weather_cache.clear()
 
     data = fetch_weather("Pune")
-    assert calls['params']['q'].lower() == "pune"
+    # Gazetteer cities are queried by OpenWeatherMap/GeoNames ID
+    assert calls['params']['id'] == PUNE_ID
+    assert 'q' not in calls['params']
     assert 'appid' in calls['params']
     assert data['main']['temp'] == 30
 
 
+def test_fetch_weather_is_cached_per_normalized_city(monkeypatch):
+    calls = []
+
+    def fake_get(url, params=None, timeout=None):
+        calls.append(params.get("id") or params.get("q"))
+
+        class R:
+            def raise_for_status(self): pass
+            def json(self): return {"main": {"temp": 21}}
+        return R()
+    monkeypatch.setattr("weather.get_http_session", _fake_session(fake_get))
+    weather.weather_cache.clear()
+
+    fetch_weather("Pune")
+    fetch_weather("weather in  PUNE now")
+    fetch_weather("poona")
+    fetch_weather("Pune", units="imperial")
+    fetch_weather("Atlantis")
+    assert calls == [PUNE_ID, PUNE_ID, "atlantis"]
+    assert weather.weather_cache.metrics()["hits"] == 2
+
+
+def test_weather_cache_coalesces_concurrent_misses():
+    cache = WeatherCache(ttl=60, stale_ttl=60)
+    started = threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        started.set()
+        time.sleep(0.05)
+        return {"ok": True}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(
+        cache.get(("pune", "metric", "en"), loader))) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert len(results) == 6
+    m = cache.metrics()
+    assert m["coalesced"] + m["hits"] == 5
+
+
+def test_weather_cache_serves_stale_while_refreshing():
+    now = [0.0]
+    cache = WeatherCache(ttl=10, stale_ttl=100, clock=lambda: now[0])
+    versions = iter([{"v": 1}, {"v": 2}])
+    key = ("pune", "metric", "en")
+
+    assert cache.get(key, lambda: next(versions)) == {"v": 1}
+    now[0] = 50.0
+    assert cache.get(key, lambda: next(versions)) == {"v": 1}
+    for _ in range(100):
+        if cache.metrics()["upstream_calls"] == 2:
+            break
+        time.sleep(0.01)
+    assert cache.get(key, lambda: next(versions)) == {"v": 2}
+    assert cache.metrics()["stale_hits"] == 1
+
+
 def test_summarize_weather_uses_llm(monkeypatch):
     class Dummy:
         def __call__(self, _):
@@ -31,3 +106,63 @@ def test_summarize_weather_uses_llm(monkeypatch):
 
     summary = summarize_weather("weather in Pune", {"main": {"temp": 30}})
     assert "30" in summary
+
+
+PUNE_OWM = {
+    "coord": {"lon": 73.8553, "lat": 18.5196},
+    "weather": [{"id": 500, "main": "Rain", "description": "light rain", "icon": "10d"}],
+    "base": "stations",
+    "main": {"temp": 27.1, "feels_like": 29.4, "temp_min": 25.0, "temp_max": 28.3,
+             "pressure": 1008, "humidity": 78},
+    "visibility": 6000,
+    "wind": {"speed": 5.2, "deg": 260},
+    "rain": {"1h": 1.2},
+    "clouds": {"all": 90},
+    "dt": 1718000000,
+    "sys": {"type": 2, "id": 2040000, "country": "IN", "sunrise": 1717977000, "sunset": 1718024000},
+    "timezone": 19800, "id": 1259229, "name": "Pune", "cod": 200,
+}
+
+
+def test_compact_weather_keeps_only_summary_fields():
+    text = weather.compact_weather(PUNE_OWM)
+    assert text.startswith("Pune, IN: light rain; 27.1°C (feels 29.4, 25–28.3); humidity 78%")
+    assert "rain 1.2 mm/h" in text and "visibility 6 km" in text
+    for noise in ("coord", "stations", "sunrise", "timezone", "cod", "2040000"):
+        assert noise not in text
+    assert len(text) < len(str(PUNE_OWM)) / 2
+
+
+def test_weather_prompt_uses_compact_record(monkeypatch):
+    seen = []
+
+    def llm(prompt):
+        seen.append(prompt.to_string())
+        return types.SimpleNamespace(content="Rainy.")
+
+    monkeypatch.setattr("weather.get_llm", lambda: llm)
+    assert summarize_weather("weather in Pune", PUNE_OWM) == "Rainy."
+    assert "light rain" in seen[0] and "'coord'" not in seen[0]
+
+
+def test_simple_fact_questions_skip_the_llm(monkeypatch):
+    def boom():
+        raise AssertionError("LLM should not be called")
+
+    monkeypatch.setattr("weather.get_llm", boom)
+    assert summarize_weather("temperature in Pune", PUNE_OWM) == (
+        "It's 27.1°C in Pune, feels like 29.4°C.")
+    assert summarize_weather("how humid is Pune?", PUNE_OWM) == "Humidity in Pune is 78%."
+
+    both = {"Pune": PUNE_OWM, "Mumbai": {**PUNE_OWM, "name": "Mumbai", "main": {"humidity": 85}}}
+    assert weather.template_summary("humidity in Pune and Mumbai", both) == (
+        "Humidity in Pune is 78%. Humidity in Mumbai is 85%.")
+
+
+def test_advice_questions_still_use_the_llm():
+    assert weather.template_summary("is it hot enough in Pune that I should skip a run?",
+                                    PUNE_OWM) is None
+    assert weather.template_summary("weather in Pune", PUNE_OWM) is None
+    assert weather.template_summary("temperature in Pune", PUNE_OWM, mode="llm") is None
+    assert weather.template_summary("weather in Pune", PUNE_OWM, mode="template").startswith(
+        "Pune: light rain.")
@@ -0,0 +1,375 @@
+"""Local latency tracing for the graph nodes and their I/O calls.
+
+Code under measurement opens spans::
+
+    with span("owm.http") as sp:
+        resp = session.get(...)
+        sp.set(bytes=len(resp.content))
+
+Each finished span feeds a per-name histogram (p50/p95/p99, Prometheus
+buckets) and sums its numeric attributes (tokens, bytes, docs...);
+``cache``/``error`` attributes are counted per value. Spans opened inside
+``tracer.request(...)`` are also kept with that request, and the last
+``settings.trace_history`` requests can be inspected in the app.
+
+With ``settings.profile_slow_requests`` a sampling profiler watches the
+threads working on a request (the one that opened it and any that opened
+one of its spans, e.g. LangGraph's node workers) and keeps collapsed stacks
+(flamegraph "folded" format) for requests slower than
+``settings.profile_slow_ms``.
+
+With ``settings.tracing_enabled`` off, :func:`span` returns a shared no-op
+object and nothing is recorded.
+"""
+import asyncio
+import bisect
+import contextvars
+import functools
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Set
+
+import numpy as np
+
+from settings import settings
+
+# Prometheus histogram bounds, seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUANTILES = (0.5, 0.95, 0.99)
+# String attributes counted per value; others are kept with the trace only
+_OUTCOME_ATTRS = ("cache", "error")
+
+
+class Histogram:
+    def __init__(self, window: int = 2048):
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.samples: Deque[float] = deque(maxlen=window)  # recent, for quantiles
+
+    def observe(self, seconds: float) -> None:
+        self.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.samples.append(seconds)
+
+    def quantiles(self) -> Dict[float, float]:
+        if not self.samples:
+            return {q: 0.0 for q in QUANTILES}
+        values = np.percentile(np.asarray(self.samples), [q * 100 for q in QUANTILES])
+        return dict(zip(QUANTILES, (float(v) for v in values)))
+
+
+class _SpanStats:
+    def __init__(self):
+        self.latency = Histogram()
+        self.totals: Counter = Counter()
+        self.outcomes: Counter = Counter()  # (attr, value) -> n
+
+
+class Span:
+    __slots__ = ("tracer", "name", "attrs", "trace", "start", "duration")
+
+    def __init__(self, tracer: "Tracer", name: str, attrs: Dict[str, Any],
+                 trace: Optional["Trace"]):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.trace = trace
+        self.start = 0.0
+        self.duration = 0.0
+
+    def set(self, **attrs: Any) -> "Span":
+        self.attrs.update(attrs)
+        return self
+
+    def __enter__(self) -> "Span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.duration = time.perf_counter() - self.start
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.tracer._finish(self)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, **attrs: Any) -> "_NoopSpan":
+        return self
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+@dataclass
+class Trace:
+    name: str
+    attrs: Dict[str, Any]
+    start: float
+    threads: Set[int]
+    spans: List[Span] = field(default_factory=list)
+    total_s: float = 0.0
+    profile: Optional[Dict[str, int]] = None  # folded stack -> samples
+
+    def timeline(self) -> List[Dict[str, Any]]:
+        """Spans in start order, offsets in milliseconds from the request start."""
+        return [{"span": s.name,
+                 "start_ms": round((s.start - self.start) * 1000, 2),
+                 "duration_ms": round(s.duration * 1000, 2),
+                 **s.attrs}
+                for s in sorted(self.spans, key=lambda s: s.start)]
+
+    def folded(self) -> str:
+        """The profile as ``frame;frame;frame count`` lines (flamegraph.pl, speedscope)."""
+        return "\n".join(f"{stack} {n}" for stack, n in
+                         sorted((self.profile or {}).items(), key=lambda kv: -kv[1]))
+
+
+_current: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("trace", default=None)
+
+
+class _Sampler(threading.Thread):
+    """Samples the stacks of a trace's threads every ``interval`` seconds until stopped."""
+
+    def __init__(self, trace: Trace, interval: float):
+        super().__init__(name="trace-sampler", daemon=True)
+        self.trace = trace
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id in list(self.trace.threads):
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}")
+                    frame = frame.f_back
+                if stack:
+                    self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self) -> Dict[str, int]:
+        self._stop_event.set()
+        self.join()
+        return dict(self.stacks)
+
+
+class Tracer:
+    def __init__(self, enabled: Optional[bool] = None, history: Optional[int] = None):
+        # ``None`` falls back to the settings on first use, so the shared
+        # tracer below doesn't resolve settings at import time.
+        self._enabled = enabled
+        self._history = history
+        self._lock = threading.Lock()
+        self._stats: Dict[str, _SpanStats] = {}
+        self._log: Optional[Deque[Trace]] = None
+
+    @property
+    def enabled(self) -> bool:
+        if self._enabled is None:
+            self._enabled = settings.tracing_enabled
+        return self._enabled
+
+    @enabled.setter
+    def enabled(self, value: bool) -> None:
+        self._enabled = value
+
+    @property
+    def _traces(self) -> Deque[Trace]:
+        if self._log is None:
+            self._log = deque(maxlen=self._history or settings.trace_history)
+        return self._log
+
+    def span(self, name: str, **attrs: Any):
+        if not self.enabled:
+            return NOOP_SPAN
+        trace = _current.get()
+        if trace is not None:
+            trace.threads.add(threading.get_ident())
+        return Span(self, name, attrs, trace)
+
+    def record(self, name: str, seconds: float, **attrs: Any) -> None:
+        """Add an already measured span (ending now)."""
+        if not self.enabled:
+            return
+        s = Span(self, name, attrs, _current.get())
+        s.start, s.duration = time.perf_counter() - seconds, seconds
+        self._finish(s)
+
+    def _finish(self, s: Span) -> None:
+        with self._lock:
+            stats = self._stats.get(s.name)
+            if stats is None:
+                stats = self._stats[s.name] = _SpanStats()
+            stats.latency.observe(s.duration)
+            for key, value in s.attrs.items():
+                if key in _OUTCOME_ATTRS:
+                    stats.outcomes[(key, str(value))] += 1
+                elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                    stats.totals[key] += value
+            if s.trace is not None:
+                s.trace.spans.append(s)
+
+    @contextmanager
+    def request(self, name: str, **attrs: Any) -> Iterator[Optional[Trace]]:
+        """Collect the spans of one request (and profile it if configured)."""
+        if not self.enabled:
+            yield None
+            return
+        trace = Trace(name, attrs, time.perf_counter(), {threading.get_ident()})
+        sampler = None
+        if settings.profile_slow_requests:
+            sampler = _Sampler(trace, settings.profile_interval_ms / 1000)
+            sampler.start()
+        token = _current.set(trace)
+        try:
+            yield trace
+        finally:
+            _current.reset(token)
+            trace.total_s = time.perf_counter() - trace.start
+            if sampler is not None:
+                stacks = sampler.stop()
+                if trace.total_s * 1000 >= settings.profile_slow_ms:
+                    trace.profile = stacks
+            self.record("request", trace.total_s)
+            with self._lock:
+                self._traces.append(trace)
+
+    # ---- reporting ----
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per span name: count, mean/p50/p95/p99 in ms, attribute totals and outcomes."""
+        with self._lock:
+            out = {}
+            for name, stats in sorted(self._stats.items()):
+                h = stats.latency
+                q = h.quantiles()
+                out[name] = {
+                    "count": h.count,
+                    "mean_ms": round(h.sum / h.count * 1000, 2) if h.count else 0.0,
+                    **{f"p{round(k * 100)}_ms": round(v * 1000, 2) for k, v in q.items()},
+                    **{k: v for k, v in stats.totals.items()},
+                    **{f"{k}={v}": n for (k, v), n in stats.outcomes.items()},
+                }
+            return out
+
+    def recent(self, n: int = 10) -> List[Trace]:
+        with self._lock:
+            return list(self._traces)[-n:]
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = [
+            "# HELP assistant_span_seconds Latency of graph nodes and I/O calls.",
+            "# TYPE assistant_span_seconds histogram",
+        ]
+        with self._lock:
+            items = sorted(self._stats.items())
+            for name, stats in items:
+                h, cumulative = stats.latency, 0
+                for bound, n in zip((*BUCKETS, "+Inf"), h.buckets):
+                    cumulative += n
+                    lines.append(f'assistant_span_seconds_bucket{{span="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'assistant_span_seconds_sum{{span="{name}"}} {h.sum:.6f}')
+                lines.append(f'assistant_span_seconds_count{{span="{name}"}} {h.count}')
+
+            lines += ["# HELP assistant_span_latency_seconds Recent latency quantiles.",
+                      "# TYPE assistant_span_latency_seconds summary"]
+            for name, stats in items:
+                for q, v in stats.latency.quantiles().items():
+                    lines.append(f'assistant_span_latency_seconds{{span="{name}",quantile="{q}"}} {v:.6f}')
+
+            lines += ["# HELP assistant_span_attr_total Summed numeric span attributes (tokens, bytes, ...).",
+                      "# TYPE assistant_span_attr_total counter"]
+            for name, stats in items:
+                for attr, total in sorted(stats.totals.items()):
+                    lines.append(f'assistant_span_attr_total{{span="{name}",attr="{attr}"}} {total}')
+
+            lines += ["# HELP assistant_span_outcomes_total Cache results and errors per span.",
+                      "# TYPE assistant_span_outcomes_total counter"]
+            for name, stats in items:
+                for (attr, value), n in sorted(stats.outcomes.items()):
+                    lines.append(f'assistant_span_outcomes_total{{span="{name}",attr="{attr}",value="{value}"}} {n}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+            self._traces.clear()
+
+
+tracer = Tracer()
+
+
+def span(name: str, **attrs: Any):
+    """``with span("qdrant.search", k=4) as sp: ...`` on the shared tracer."""
+    return tracer.span(name, **attrs)
+
+
+def in_context(fn: Callable) -> Callable:
+    """``fn`` bound to a copy of the current context, so spans it opens on a
+    worker thread still belong to the caller's request."""
+    ctx = contextvars.copy_context()
+
+    @functools.wraps(fn)
+    def run(*args: Any, **kwargs: Any) -> Any:
+        # A context can only be entered by one thread at a time
+        return ctx.copy().run(fn, *args, **kwargs)
+    return run
+
+
+def traced(name: str, fn: Callable) -> Callable:
+    """Wrap a (sync or async) graph node so each run is a ``node.<name>`` span."""
+    if asyncio.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def arun(state):
+            with tracer.span(f"node.{name}"):
+                return await fn(state)
+        return arun
+
+    @functools.wraps(fn)
+    def run(state):
+        with tracer.span(f"node.{name}"):
+            return fn(state)
+    return run
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        body = tracer.render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+def serve_metrics(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve ``/metrics`` for a Prometheus scraper from a daemon thread."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
@@ -1,96 +1,1110 @@
-from typing import List, Optional, Dict, Any
-from qdrant_client import QdrantClient
-from qdrant_client.http.models import Distance, VectorParams
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import PyPDFLoader
+from typing import TYPE_CHECKING, List, Optional, Dict, Any, Callable, Sequence, Set, Tuple
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+import uuid
+import warnings
 from langchain_core.documents import Document
 from settings import settings
-from embeddings import get_embeddings
+from embeddings import get_embeddings, embedding_dimension
+from lexical import BM25Index
+from resources import registry
+from tracing import span, tracer
 
-# Try both import paths for compatibility
-try:
-    from langchain_qdrant import QdrantVectorStore as Qdrant
-except ImportError:
-    from langchain_community.vectorstores import Qdrant  # type: ignore
+# qdrant_client, the LangChain integrations and the local index are imported
+# where they are first used: together they are most of the import time.
+if TYPE_CHECKING:
+    from qdrant_client import AsyncQdrantClient, QdrantClient
+    from qdrant_client.http.models import PointStruct
 
 
-def get_qdrant_client() -> QdrantClient:
-    """Initialize Qdrant client with URL + API key."""
-    return QdrantClient(
-        url=settings.qdrant_url,
-        api_key=settings.qdrant_api_key or None
+def PyPDFLoader(pdf_path: str):
+    """LangChain's ``PyPDFLoader``, imported on first use."""
+    from langchain_community.document_loaders import PyPDFLoader as Loader
+    return Loader(pdf_path)
+
+
+def get_qdrant_client() -> "QdrantClient":
+    """Return the shared Qdrant client for the configured URL + API key.
+
+    With ``VECTOR_BACKEND=local`` this is a ``LocalIndexClient`` exposing the
+    same calls over memory-mapped files, so no server is needed.
+    """
+    if settings.vector_backend == "local":
+        from localindex import LocalIndexClient
+        root = settings.local_index_dir
+        return registry.get("qdrant", ("local", root),
+                            lambda: LocalIndexClient(root))
+    from qdrant_client import QdrantClient
+    url = settings.qdrant_url
+    api_key = settings.qdrant_api_key or None
+    if url == ":memory:":
+        # In-process stand-in, handy for tests and offline runs
+        return registry.get("qdrant", (url, None),
+                            lambda: QdrantClient(location=":memory:"))
+    return registry.get(
+        "qdrant", (url, api_key),
+        lambda: QdrantClient(url=url, api_key=api_key)
     )
 
 
-def ensure_collection(client: QdrantClient, collection_name: str, vector_size: int = 384):
-    """Ensure a Qdrant collection exists with the proper vector size."""
+VECTOR_PROFILES = ("float", "int8", "binary")
+# Candidates per result fetched with quantized vectors before rescoring
+_DEFAULT_OVERSAMPLING = {"int8": 2.0, "binary": 3.0}
+
+
+def collection_config(vector_size: int, profile: Optional[str] = None) -> Dict[str, Any]:
+    """``create_collection`` arguments for a storage profile (``VECTOR_PROFILE``).
+
+    ``int8`` and ``binary`` keep quantized vectors in RAM and, by default,
+    the full-precision originals on disk (used only for rescoring). HNSW
+    ``m``/``ef_construct`` come from ``HNSW_M``/``HNSW_EF_CONSTRUCT``.
+    """
+    from qdrant_client.http import models
+    profile = profile or settings.vector_profile
+    if profile not in VECTOR_PROFILES:
+        raise ValueError(f"Unknown vector profile {profile!r}; expected one of {VECTOR_PROFILES}")
+    quantized = profile != "float"
+    on_disk = quantized if settings.vectors_on_disk is None else settings.vectors_on_disk
+    config: Dict[str, Any] = {
+        "vectors_config": models.VectorParams(
+            size=vector_size, distance=models.Distance.COSINE, on_disk=on_disk),
+        "hnsw_config": models.HnswConfigDiff(
+            m=settings.hnsw_m, ef_construct=settings.hnsw_ef_construct),
+    }
+    if profile == "int8":
+        config["quantization_config"] = models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8, quantile=0.99, always_ram=True))
+    elif profile == "binary":
+        config["quantization_config"] = models.BinaryQuantization(
+            binary=models.BinaryQuantizationConfig(always_ram=True))
+    return config
+
+
+def _quantization_profile(info: Any) -> str:
+    from qdrant_client.http import models
+    quantization = info.config.quantization_config
+    if isinstance(quantization, models.ScalarQuantization):
+        return "int8"
+    if isinstance(quantization, models.BinaryQuantization):
+        return "binary"
+    return "float"
+
+
+def stored_profile(client: "QdrantClient", collection_name: str) -> str:
+    """The profile ``collection_name`` was created with, from its quantization config."""
+    return _quantization_profile(client.get_collection(collection_name))
+
+
+def _profile_key(client: Any, kind: str, collection_name: str) -> Tuple[Any, str]:
+    # The configured sync and async clients reach the same server and share
+    # entries; an injected client gets its own
+    return (client if registry.overridden(kind) else settings.qdrant_url, collection_name)
+
+
+def _collection_profile(collection_name: str) -> str:
+    # Read once per collection, not per search. VECTOR_PROFILE when the
+    # collection can't be read (not created yet, or a backend without
+    # collection info) is cached too; ensure_collection drops the entries
+    # when it creates a collection.
+    client = get_qdrant_client()
+
+    def read() -> str:
+        try:
+            return stored_profile(client, collection_name)
+        except Exception:
+            return settings.vector_profile
+    return registry.get("vector_profile", _profile_key(client, "qdrant", collection_name), read)
+
+
+async def _acollection_profile(aclient: "AsyncQdrantClient", collection_name: str) -> str:
+    """:func:`_collection_profile` through the async client."""
+    key = _profile_key(aclient, "async_qdrant", collection_name)
+    profile = registry.peek("vector_profile", key)
+    if profile is None:
+        try:
+            profile = _quantization_profile(await aclient.get_collection(collection_name))
+        except Exception:
+            profile = settings.vector_profile
+        profile = registry.get("vector_profile", key, lambda: profile)
+    return profile
+
+
+def search_params(profile: Optional[str] = None, collection: Optional[str] = None):
+    """Dense search parameters for ``collection`` (default: docs): quantized
+    profiles oversample and rescore with the original vectors. The profile
+    is the one the collection was created with, not ``VECTOR_PROFILE``.
+    None when there is nothing to set or the backend is in-process (exact
+    search anyway)."""
+    from qdrant_client.http import models
+    if settings.vector_backend == "local" or settings.qdrant_url == ":memory:":
+        return None
+    profile = profile or _collection_profile(collection or settings.docs_collection)
+    quantization = None
+    if profile != "float":
+        quantization = models.QuantizationSearchParams(
+            rescore=True,
+            oversampling=settings.quantization_oversampling or _DEFAULT_OVERSAMPLING[profile])
+    if quantization is None and settings.hnsw_ef is None:
+        return None
+    return models.SearchParams(hnsw_ef=settings.hnsw_ef, quantization=quantization)
+
+
+def ensure_collection(client: "QdrantClient", collection_name: str,
+                      vector_size: Optional[int] = None, profile: Optional[str] = None):
+    """Ensure a Qdrant collection exists, created with ``profile`` (default
+    ``VECTOR_PROFILE``). ``vector_size`` defaults to the embedding model's.
+
+    An existing collection is kept as is; if it was created with another
+    profile this warns, since its storage (and search) stay unchanged.
+    """
     existing_collections = [
         c.name for c in client.get_collections().collections]
     if collection_name not in existing_collections:
+        if vector_size is None:
+            vector_size = embedding_dimension(get_embeddings())
         client.create_collection(
-            collection_name=collection_name,
-            vectors_config=VectorParams(
-                size=vector_size, distance=Distance.COSINE)
+            collection_name=collection_name, **collection_config(vector_size, profile))
+        registry.clear("vector_profile")
+        return
+    if settings.vector_backend == "local" or settings.qdrant_url == ":memory:":
+        return  # no quantization in-process
+    wanted = profile or settings.vector_profile
+    try:
+        stored = stored_profile(client, collection_name)
+    except Exception:
+        return
+    if stored != wanted:
+        warnings.warn(
+            f"Collection {collection_name!r} was created with the {stored!r} vector profile, "
+            f"not {wanted!r}; it keeps its storage and is searched as {stored!r}. "
+            f"Recreate the collection to switch profiles.", stacklevel=2)
+
+
+@dataclass
+class IngestProgress:
+    pages_done: int = 0
+    total_pages: Optional[int] = None
+    chunks_seen: int = 0
+    chunks_skipped: int = 0
+    chunks_embedded: int = 0
+    chunks_upserted: int = 0
+
+    @property
+    def fraction(self) -> float:
+        if not self.total_pages:
+            return 0.0
+        return min(1.0, self.pages_done / self.total_pages)
+
+
+@dataclass
+class IngestReport:
+    chunks: int
+    pages: int
+    upserted: int
+    skipped: int
+    deleted: int
+    seconds: float
+    chunks_per_sec: float
+    peak_rss_mb: Optional[float]
+
+
+_DONE = object()
+
+
+def _peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _count_pages(pdf_path: str) -> Optional[int]:
+    try:
+        from pypdf import PdfReader
+        return len(PdfReader(pdf_path).pages)
+    except Exception:
+        return None
+
+
+def _put(q: "queue.Queue", item: Any, stop: threading.Event) -> bool:
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(q: "queue.Queue", stop: threading.Event) -> Any:
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return _DONE
+
+
+# Fixed namespace so chunk IDs are stable across runs and machines
+_CHUNK_NAMESPACE = uuid.UUID("6b0d3c1e-52f4-4c8e-9a57-3d6f0c1b2a90")
+
+
+def chunk_id(source: str, content: str) -> str:
+    """Deterministic point ID derived from a chunk's source and content."""
+    digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    return str(uuid.uuid5(_CHUNK_NAMESPACE, f"{source}\x00{digest}"))
+
+
+def _manifest_path(collection: str, source: str) -> str:
+    name = hashlib.sha1(f"{collection}\x00{source}".encode("utf-8")).hexdigest()
+    return os.path.join(settings.ingest_manifest_dir, f"{name}.json")
+
+
+def _load_manifest(client: "QdrantClient", collection: str, source: str) -> Set[str]:
+    """IDs of the chunks already stored for ``source``.
+
+    Read from the on-disk manifest; if it's missing, rebuilt by scrolling the
+    collection. A manifest for a collection that no longer exists is ignored.
+    """
+    if not client.collection_exists(collection):
+        return set()
+    path = _manifest_path(collection, source)
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return set(json.load(f)["ids"])
+
+    from qdrant_client.http.models import FieldCondition, Filter, MatchValue
+    ids: Set[str] = set()
+    source_filter = Filter(must=[FieldCondition(
+        key="metadata.source", match=MatchValue(value=source))])
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection, scroll_filter=source_filter,
+            limit=1024, offset=offset, with_payload=False, with_vectors=False)
+        ids.update(str(p.id) for p in points)
+        if offset is None:
+            return ids
+
+
+def _version_path(collection: str) -> str:
+    return os.path.join(settings.ingest_manifest_dir, f"{collection}.version")
+
+
+def collection_version(collection: Optional[str] = None) -> str:
+    """Opaque stamp that changes whenever ingestion changes a collection."""
+    path = _version_path(collection or settings.docs_collection)
+    try:
+        with open(path, encoding="utf-8") as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return ""
+
+
+def _bump_collection_version(collection: str) -> None:
+    path = _version_path(collection)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(uuid.uuid4().hex)
+
+
+def _save_manifest(collection: str, source: str, ids: Set[str]) -> None:
+    path = _manifest_path(collection, source)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"collection": collection, "source": source,
+                   "ids": sorted(ids)}, f)
+    os.replace(tmp, path)
+
+
+def _lexical_path(collection: str) -> str:
+    return os.path.join(settings.lexical_index_dir, f"{collection}.bm25")
+
+
+def get_lexical_index(collection: Optional[str] = None) -> BM25Index:
+    """Shared BM25 index for a collection, loaded from disk on first use."""
+    path = _lexical_path(collection or settings.docs_collection)
+    return registry.get("bm25", path, lambda: BM25Index.load(path))
+
+
+def rebuild_lexical_index(collection: Optional[str] = None) -> int:
+    """Rebuild the BM25 index from the points already stored in a collection
+    (e.g. for collections ingested before lexical search existed)."""
+    collection = collection or settings.docs_collection
+    client = get_qdrant_client()
+    index = BM25Index()
+    offset = None
+    while True:
+        points, offset = client.scroll(collection_name=collection, limit=1024,
+                                       offset=offset, with_payload=True)
+        index.add([str(p.id) for p in points],
+                  [(p.payload or {}).get("page_content", "") for p in points])
+        if offset is None:
+            break
+    path = _lexical_path(collection)
+    index.save(path)
+    registry.clear("bm25")
+    return len(index)
+
+
+def fetch_documents(ids: List[str], collection: Optional[str] = None) -> List[Document]:
+    """Load stored chunks by point ID, in the order given."""
+    collection = collection or settings.docs_collection
+    if not ids:
+        return []
+    with span("qdrant.fetch", ids=len(ids)):
+        records = get_qdrant_client().retrieve(collection_name=collection, ids=ids,
+                                               with_payload=True)
+    by_id = {str(r.id): r for r in records}
+    return [point_to_document(pid, by_id[pid].payload, collection)
+            for pid in ids if pid in by_id]
+
+
+def fetch_vectors(ids: List[str], collection: Optional[str] = None) -> Dict[str, List[float]]:
+    """Stored vectors by point ID, in one request (no payloads)."""
+    collection = collection or settings.docs_collection
+    if not ids:
+        return {}
+    with span("qdrant.fetch_vectors", ids=len(ids)):
+        records = get_qdrant_client().retrieve(collection_name=collection, ids=ids,
+                                               with_payload=False, with_vectors=True)
+    out = {}
+    for r in records:
+        vector = _point_vector(r.vector)
+        if vector is not None:
+            out[str(r.id)] = vector
+    return out
+
+
+def _point_vector(vector: Any) -> Optional[List[float]]:
+    if isinstance(vector, dict):  # named vectors: the store uses the default one
+        vector = vector.get("") or next(iter(vector.values()), None)
+    return vector
+
+
+def point_to_document(point_id: str, payload: Optional[Dict[str, Any]],
+                      collection: str, vector: Any = None) -> Document:
+    """Build a LangChain Document from a stored point, like the Qdrant store does.
+
+    A returned ``vector`` is kept under ``metadata["_vector"]`` for the
+    reranker, which takes it out again.
+    """
+    payload = payload or {}
+    metadata = dict(payload.get("metadata") or {})
+    metadata.update({"_id": str(point_id), "_collection_name": collection})
+    vector = _point_vector(vector)
+    if vector is not None:
+        metadata["_vector"] = vector
+    return Document(page_content=payload.get("page_content", ""), metadata=metadata)
+
+
+def search_documents_batch(vectors: List[List[float]], k: int,
+                           collection: Optional[str] = None,
+                           with_vectors: bool = False) -> List[List[Document]]:
+    """Dense top-k for several query vectors in one batched Qdrant request;
+    ``with_vectors`` returns the stored vectors too (see :func:`point_to_document`)."""
+    collection = collection or settings.docs_collection
+    if not vectors:
+        return []
+    from qdrant_client.http.models import QueryRequest
+    with span("qdrant.search_batch", queries=len(vectors)):
+        responses = get_qdrant_client().query_batch_points(
+            collection_name=collection,
+            requests=[QueryRequest(query=v, limit=k, with_payload=True, with_vector=with_vectors,
+                                   params=search_params(collection=collection))
+                      for v in vectors],
         )
+    return [[point_to_document(str(p.id), p.payload, collection, p.vector) for p in res.points]
+            for res in responses]
 
 
-def ingest_pdf_to_qdrant(pdf_path: str, collection: Optional[str] = None) -> int:
-    """Load a PDF, split into chunks, embed, and insert into Qdrant."""
+def get_async_qdrant_client() -> Optional["AsyncQdrantClient"]:
+    """Async Qdrant client for the running event loop.
+
+    Returns None for backends without a separate async client (the local
+    index and the in-process ``:memory:`` store) and when the sync ``qdrant``
+    client is overridden but the async one isn't; callers then run the sync
+    call on a worker thread.
+    """
+    if registry.overridden("qdrant") and not registry.overridden("async_qdrant"):
+        # The injected client must serve async calls too, not the configured URL
+        return None
+    url = settings.qdrant_url
+    if settings.vector_backend == "local" or url == ":memory:":
+        return None
+    from qdrant_client import AsyncQdrantClient
+    api_key = settings.qdrant_api_key or None
+    return registry.get_for_loop(
+        "async_qdrant", (url, api_key),
+        lambda: AsyncQdrantClient(url=url, api_key=api_key)
+    )
+
+
+async def asearch_documents(question: str, k: int, collection: Optional[str] = None,
+                            with_vectors: bool = False) -> List[Document]:
+    """Async dense top-k search; ``with_vectors`` as in :func:`search_documents_batch`."""
     collection = collection or settings.docs_collection
-    loader = PyPDFLoader(pdf_path)
-    pages: List[Document] = loader.load()
+    aclient = get_async_qdrant_client()
+    if aclient is None:
+        if with_vectors:
+            vector = await get_embeddings().aembed_query(question)
+            return (await asyncio.to_thread(
+                search_documents_batch, [vector], k, collection, True))[0]
+        return await asyncio.to_thread(
+            get_vectorstore(collection).similarity_search, question, k)
+    vector = await get_embeddings().aembed_query(question)
+    with span("qdrant.search", k=k):
+        params = search_params(await _acollection_profile(aclient, collection))
+        res = await aclient.query_points(collection_name=collection, query=vector,
+                                         limit=k, with_payload=True, with_vectors=with_vectors,
+                                         search_params=params)
+    return [point_to_document(str(p.id), p.payload, collection, p.vector) for p in res.points]
+
+
+async def afetch_documents(ids: List[str], collection: Optional[str] = None) -> List[Document]:
+    """Async :func:`fetch_documents`."""
+    collection = collection or settings.docs_collection
+    aclient = get_async_qdrant_client()
+    if aclient is None or not ids:
+        return await asyncio.to_thread(fetch_documents, ids, collection)
+    with span("qdrant.fetch", ids=len(ids)):
+        records = await aclient.retrieve(collection_name=collection, ids=ids, with_payload=True)
+    by_id = {str(r.id): r for r in records}
+    return [point_to_document(pid, by_id[pid].payload, collection)
+            for pid in ids if pid in by_id]
+
+
+def _chunk_to_point(chunk: Document, vector: List[float]) -> "PointStruct":
+    # Same payload layout as the LangChain Qdrant store, so retrieval through
+    # get_vectorstore() reads these points unchanged.
+    from qdrant_client.http.models import PointStruct
+    return PointStruct(
+        id=chunk_id(chunk.metadata.get("source", ""), chunk.page_content),
+        vector=vector,
+        payload={"page_content": chunk.page_content, "metadata": chunk.metadata},
+    )
 
+
+def ingest_pdf_pipeline(
+    pdf_path: str,
+    collection: Optional[str] = None,
+    on_progress: Optional[Callable[[IngestProgress], None]] = None,
+    batch_size: Optional[int] = None,
+    source: Optional[str] = None,
+) -> IngestReport:
+    """Stream a PDF into Qdrant: parse -> split -> embed -> upsert.
+
+    Pages are loaded lazily and chunks flow through bounded queues in
+    fixed-size batches, so memory stays flat regardless of document size and
+    parsing, embedding and network writes overlap. ``on_progress`` is always
+    called from the calling thread.
+
+    Ingestion is incremental: point IDs are derived from ``source`` (defaults
+    to ``pdf_path``) and chunk content, so only new or changed chunks are
+    embedded and written, and chunks that disappeared from the document are
+    deleted.
+    """
+    collection = collection or settings.docs_collection
+    source = source or pdf_path
+    batch_size = batch_size or settings.ingest_batch_size
+    depth = settings.ingest_queue_depth
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
     splitter = RecursiveCharacterTextSplitter(
         chunk_size=settings.chunk_size,
         chunk_overlap=settings.chunk_overlap
     )
-    chunks = splitter.split_documents(pages)
-
     embeddings = get_embeddings()
     client = get_qdrant_client()
-    ensure_collection(
-        client,
-        collection,
-        vector_size=embeddings.client.get_sentence_embedding_dimension()  # type: ignore
+    # Up front, so retrieval works even if the PDF has no extractable text
+    ensure_collection(client, collection)
+    lexical = get_lexical_index(collection)
+    known_ids = _load_manifest(client, collection, source)
+    seen_ids: Set[str] = set()
+
+    progress = IngestProgress(total_pages=_count_pages(pdf_path))
+    stop = threading.Event()
+    errors: List[BaseException] = []
+    chunk_q: "queue.Queue" = queue.Queue(maxsize=depth)
+    vector_q: "queue.Queue" = queue.Queue(maxsize=depth)
+
+    def parse_stage() -> None:
+        batch: List[Document] = []
+        for page in PyPDFLoader(pdf_path).lazy_load():
+            for chunk in splitter.split_documents([page]):
+                chunk.metadata["source"] = source
+                cid = chunk_id(source, chunk.page_content)
+                progress.chunks_seen += 1
+                if cid in seen_ids or cid in known_ids:
+                    # Unchanged (or repeated within this document)
+                    seen_ids.add(cid)
+                    progress.chunks_skipped += 1
+                    continue
+                seen_ids.add(cid)
+                batch.append(chunk)
+                if len(batch) >= batch_size:
+                    if not _put(chunk_q, batch, stop):
+                        return
+                    batch = []
+            progress.pages_done += 1
+        if batch:
+            _put(chunk_q, batch, stop)
+
+    def embed_stage() -> None:
+        while True:
+            batch = _get(chunk_q, stop)
+            if batch is _DONE:
+                return
+            vectors = embeddings.embed_documents([c.page_content for c in batch])
+            progress.chunks_embedded += len(batch)
+            if not _put(vector_q, (batch, vectors), stop):
+                return
+
+    def run(stage: Callable[[], None], out_q: "queue.Queue") -> None:
+        try:
+            stage()
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            _put(out_q, _DONE, stop)
+
+    workers = [
+        threading.Thread(target=run, args=(parse_stage, chunk_q),
+                         name="ingest-parse", daemon=True),
+        threading.Thread(target=run, args=(embed_stage, vector_q),
+                         name="ingest-embed", daemon=True),
+    ]
+    started = time.perf_counter()
+    for w in workers:
+        w.start()
+
+    try:
+        while True:
+            item = _get(vector_q, stop)
+            if item is _DONE:
+                break
+            batch, vectors = item
+            points = [_chunk_to_point(c, v) for c, v in zip(batch, vectors)]
+            client.upsert(collection_name=collection, points=points)
+            lexical.add([str(p.id) for p in points], [c.page_content for c in batch])
+            progress.chunks_upserted += len(batch)
+            if on_progress:
+                on_progress(progress)
+    except BaseException:
+        stop.set()
+        raise
+    finally:
+        for w in workers:
+            w.join()
+    if errors:
+        raise errors[0]
+
+    stale = known_ids - seen_ids
+    if stale:
+        from qdrant_client.http.models import PointIdsList
+        client.delete(collection_name=collection,
+                      points_selector=PointIdsList(points=sorted(stale)))
+        lexical.delete(stale)
+    if progress.chunks_upserted or known_ids:
+        _save_manifest(collection, source, seen_ids)
+    if progress.chunks_upserted or stale:
+        lexical.save(_lexical_path(collection))
+        _bump_collection_version(collection)
+
+    elapsed = time.perf_counter() - started
+    if on_progress:
+        on_progress(progress)
+    return IngestReport(
+        chunks=len(seen_ids),
+        pages=progress.pages_done,
+        upserted=progress.chunks_upserted,
+        skipped=progress.chunks_skipped,
+        deleted=len(stale),
+        seconds=elapsed,
+        chunks_per_sec=progress.chunks_seen / elapsed if elapsed > 0 else 0.0,
+        peak_rss_mb=_peak_rss_mb(),
     )
 
-    Qdrant.from_documents(
-        documents=chunks,
-        embedding=embeddings,
-        url=settings.qdrant_url,
-        api_key=settings.qdrant_api_key or None,
-        collection_name=collection
+
+def ingest_pdf_to_qdrant(pdf_path: str, collection: Optional[str] = None,
+                         on_progress: Optional[Callable[[IngestProgress], None]] = None,
+                         source: Optional[str] = None) -> int:
+    """Load a PDF, split into chunks, embed, and insert into Qdrant."""
+    return ingest_pdf_pipeline(pdf_path, collection, on_progress=on_progress,
+                               source=source).chunks
+
+
+# ---- Bulk ingestion: many PDFs, parsed in a process pool ----
+
+@dataclass
+class ParsedPDF:
+    """One file's chunks in columnar form, as sent back by a parser process.
+
+    Plain lists pickle much smaller and faster than a list of Documents, and
+    each page's metadata is stored once instead of once per chunk.
+    """
+    source: str
+    texts: List[str] = field(default_factory=list)
+    ids: List[str] = field(default_factory=list)
+    chunk_pages: List[int] = field(default_factory=list)  # index into page_meta
+    page_meta: List[Dict[str, Any]] = field(default_factory=list)
+    seconds: float = 0.0
+
+    def metadata(self, i: int) -> Dict[str, Any]:
+        return {**self.page_meta[self.chunk_pages[i]], "source": self.source}
+
+
+def split_pdf(pdf_path: str, source: str, chunk_size: int, chunk_overlap: int) -> ParsedPDF:
+    """Parse and split one PDF (runs in a worker process).
+
+    Produces the same chunks and point IDs as :func:`ingest_pdf_pipeline`.
+    """
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    started = time.perf_counter()
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    parsed = ParsedPDF(source)
+    for page in PyPDFLoader(pdf_path).lazy_load():
+        page_index = len(parsed.page_meta)
+        parsed.page_meta.append(page.metadata)
+        for text in splitter.split_text(page.page_content):
+            parsed.texts.append(text)
+            parsed.ids.append(chunk_id(source, text))
+            parsed.chunk_pages.append(page_index)
+    parsed.seconds = time.perf_counter() - started
+    return parsed
+
+
+@dataclass
+class FileIngestResult:
+    source: str
+    pages: int = 0
+    chunks: int = 0
+    upserted: int = 0
+    skipped: int = 0
+    deleted: int = 0
+    error: Optional[str] = None
+
+
+@dataclass
+class BulkIngestProgress:
+    files_total: int
+    files_done: int = 0
+    files_failed: int = 0
+    chunks_upserted: int = 0
+    last: Optional[FileIngestResult] = None  # the file that just finished
+
+    @property
+    def fraction(self) -> float:
+        return self.files_done / self.files_total if self.files_total else 1.0
+
+
+@dataclass
+class BulkIngestReport:
+    files: List[FileIngestResult]
+    workers: int
+    seconds: float
+    parse_seconds: float   # summed over workers
+    embed_seconds: float
+    upsert_seconds: float
+    peak_rss_mb: Optional[float]
+
+    @property
+    def failed(self) -> List[FileIngestResult]:
+        return [f for f in self.files if f.error]
+
+    @property
+    def chunks(self) -> int:
+        return sum(f.chunks for f in self.files)
+
+    @property
+    def upserted(self) -> int:
+        return sum(f.upserted for f in self.files)
+
+    @property
+    def chunks_per_sec(self) -> float:
+        return self.chunks / self.seconds if self.seconds > 0 else 0.0
+
+
+@dataclass(eq=False)
+class _FileState:
+    result: FileIngestResult
+    known: Set[str]
+    seen: Set[str] = field(default_factory=set)
+    pending: int = 0
+
+
+class _BulkWriter:
+    """Parent side of :func:`ingest_pdfs`: pools chunks from all files into
+    shared embedding batches and finishes each file once its last chunk is
+    stored (stale chunks deleted, manifest saved)."""
+
+    def __init__(self, collection: str, batch_size: int, progress: BulkIngestProgress,
+                 on_progress: Optional[Callable[[BulkIngestProgress], None]]):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.progress = progress
+        self.on_progress = on_progress
+        self.embeddings = get_embeddings()
+        self.client = get_qdrant_client()
+        self.lexical = get_lexical_index(collection)
+        self.results: List[FileIngestResult] = []
+        self.seconds = {"parse": 0.0, "embed": 0.0, "upsert": 0.0}
+        # Chunks waiting for the next embedding call, with the file they belong to
+        self._buffer: List[Tuple[str, str, Dict[str, Any], _FileState]] = []
+        self._ensured = False
+        self._changed = False
+
+    def add(self, parsed: ParsedPDF) -> None:
+        self.seconds["parse"] += parsed.seconds
+        tracer.record("ingest.parse", parsed.seconds, pages=len(parsed.page_meta),
+                      chunks=len(parsed.ids))
+        result = FileIngestResult(parsed.source, pages=len(parsed.page_meta))
+        try:
+            known = _load_manifest(self.client, self.collection, parsed.source)
+        except Exception as e:
+            self.fail(result, e)
+            return
+        state = _FileState(result, known)
+        for i, cid in enumerate(parsed.ids):
+            if cid in state.seen or cid in known:
+                # Unchanged (or repeated within this document)
+                state.seen.add(cid)
+                result.skipped += 1
+                continue
+            state.seen.add(cid)
+            state.pending += 1
+            self._buffer.append((cid, parsed.texts[i], parsed.metadata(i), state))
+        if state.pending == 0:
+            self._finish_file(state)
+        while len(self._buffer) >= self.batch_size:
+            self._flush(self.batch_size)
+
+    def fail(self, result: FileIngestResult, error: BaseException) -> None:
+        result.error = f"{type(error).__name__}: {error}"
+        self.progress.files_failed += 1
+        self._done(result)
+
+    def close(self) -> None:
+        while self._buffer:
+            self._flush(self.batch_size)
+        if self._changed:
+            self.lexical.save(_lexical_path(self.collection))
+            _bump_collection_version(self.collection)
+
+    def _flush(self, n: int) -> None:
+        batch, self._buffer = self._buffer[:n], self._buffer[n:]
+        owners = list(dict.fromkeys(state for _, _, _, state in batch))
+        try:
+            self._store(batch)
+        except Exception as e:
+            if len(owners) == 1:
+                self._fail_file(owners[0], e)
+                return
+            # Retry file by file so one bad file doesn't fail its batch mates
+            for state in owners:
+                part = [item for item in batch if item[3] is state]
+                try:
+                    self._store(part)
+                except Exception as e:
+                    self._fail_file(state, e)
+                else:
+                    self._stored(part, [state])
+            return
+        self._stored(batch, owners)
+
+    def _store(self, batch: List[Tuple[str, str, Dict[str, Any], _FileState]]) -> None:
+        from qdrant_client.http.models import PointStruct
+        started = time.perf_counter()
+        with span("ingest.embed", chunks=len(batch)):
+            vectors = self.embeddings.embed_documents([text for _, text, _, _ in batch])
+        self.seconds["embed"] += time.perf_counter() - started
+        if not self._ensured:
+            ensure_collection(self.client, self.collection, vector_size=len(vectors[0]))
+            self._ensured = True
+        started = time.perf_counter()
+        with span("ingest.upsert", points=len(batch)):
+            self.client.upsert(collection_name=self.collection, points=[
+                PointStruct(id=cid, vector=vector,
+                            payload={"page_content": text, "metadata": metadata})
+                for (cid, text, metadata, _), vector in zip(batch, vectors)
+            ])
+        self.seconds["upsert"] += time.perf_counter() - started
+
+    def _stored(self, batch: List[Tuple[str, str, Dict[str, Any], _FileState]],
+                owners: List[_FileState]) -> None:
+        self.lexical.add([cid for cid, _, _, _ in batch], [text for _, text, _, _ in batch])
+        self._changed = True
+        self.progress.chunks_upserted += len(batch)
+        for _, _, _, state in batch:
+            state.pending -= 1
+            state.result.upserted += 1
+        for state in owners:
+            if state.pending == 0:
+                self._finish_file(state)
+
+    def _fail_file(self, state: _FileState, error: BaseException) -> None:
+        # Its chunks still waiting for a batch are dropped; other files carry on
+        self._buffer = [item for item in self._buffer if item[3] is not state]
+        self.fail(state.result, error)
+
+    def _finish_file(self, state: _FileState) -> None:
+        from qdrant_client.http.models import PointIdsList
+        result = state.result
+        stale = state.known - state.seen
+        try:
+            if stale:
+                self.client.delete(collection_name=self.collection,
+                                   points_selector=PointIdsList(points=sorted(stale)))
+                self.lexical.delete(stale)
+                self._changed = True
+            if state.seen or state.known:
+                _save_manifest(self.collection, result.source, state.seen)
+        except Exception as e:
+            self.fail(result, e)
+            return
+        result.chunks, result.deleted = len(state.seen), len(stale)
+        self._done(result)
+
+    def _done(self, result: FileIngestResult) -> None:
+        self.results.append(result)
+        self.progress.files_done += 1
+        self.progress.last = result
+        if self.on_progress:
+            self.on_progress(self.progress)
+
+
+def _parser_context():
+    # Forking this (threaded) process directly can deadlock. A fork server is
+    # single-threaded and imports the main script and the parser's modules
+    # once, so parsers start fast; spawn is the fallback (Windows). Entry
+    # scripts must not import qdrant_client at module level: its grpc
+    # dependency makes every fork from the server take about a second.
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context("forkserver")
+        ctx.set_forkserver_preload(["__main__", __name__, "langchain_text_splitters",
+                                    "langchain_community.document_loaders.pdf"])
+        return ctx
+    return multiprocessing.get_context("spawn")
+
+
+def ingest_pdfs(
+    paths: Sequence[str],
+    collection: Optional[str] = None,
+    workers: Optional[int] = None,
+    sources: Optional[Sequence[str]] = None,
+    on_progress: Optional[Callable[[BulkIngestProgress], None]] = None,
+    embed_batch_size: Optional[int] = None,
+) -> BulkIngestReport:
+    """Ingest many PDFs: parse and split in ``workers`` processes, embed and
+    upsert in this one.
+
+    Chunks from all files share embedding calls of ``embed_batch_size``
+    (``INGEST_EMBED_BATCH_SIZE``) and one upsert each, through the shared
+    Qdrant client. Ingestion is incremental per file, as in
+    :func:`ingest_pdf_pipeline`; ``sources`` (default: the paths) key the
+    files. A file that fails to parse or store is reported in the result
+    and doesn't stop the others. ``workers=1`` parses in this process.
+    """
+    collection = collection or settings.docs_collection
+    workers = workers or settings.ingest_workers or os.cpu_count() or 1
+    sources = list(sources) if sources is not None else list(paths)
+    progress = BulkIngestProgress(files_total=len(paths))
+    writer = _BulkWriter(collection, embed_batch_size or settings.ingest_embed_batch_size,
+                         progress, on_progress)
+    split_args = (settings.chunk_size, settings.chunk_overlap)
+    started = time.perf_counter()
+
+    if workers <= 1:
+        for path, source in zip(paths, sources):
+            try:
+                parsed = split_pdf(path, source, *split_args)
+            except Exception as e:
+                writer.fail(FileIngestResult(source), e)
+                continue
+            writer.add(parsed)
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=_parser_context())
+        todo = iter(zip(paths, sources))
+        running: Dict[Future, str] = {}
+
+        def submit_next() -> None:
+            for path, source in todo:
+                try:
+                    running[pool.submit(split_pdf, path, source, *split_args)] = source
+                except Exception as e:  # e.g. BrokenProcessPool
+                    writer.fail(FileIngestResult(source), e)
+                    continue
+                return
+
+        with pool:
+            # A couple of files per worker in flight keeps parsers busy
+            # while this process embeds, without holding every result
+            for _ in range(2 * workers):
+                submit_next()
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    source = running.pop(future)
+                    submit_next()
+                    try:
+                        parsed = future.result()
+                    except Exception as e:
+                        writer.fail(FileIngestResult(source), e)
+                        continue
+                    writer.add(parsed)
+    writer.close()
+
+    return BulkIngestReport(
+        files=writer.results,
+        workers=workers,
+        seconds=time.perf_counter() - started,
+        parse_seconds=writer.seconds["parse"],
+        embed_seconds=writer.seconds["embed"],
+        upsert_seconds=writer.seconds["upsert"],
+        peak_rss_mb=_peak_rss_mb(),
     )
-    return len(chunks)
+
+
+def find_pdfs(paths: Sequence[str]) -> List[str]:
+    """PDF files among ``paths``, searching directories recursively."""
+    found: List[str] = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                found.extend(os.path.join(root, f) for f in sorted(files)
+                             if f.lower().endswith(".pdf"))
+        else:
+            found.append(path)
+    return found
 
 
 def get_vectorstore(collection: Optional[str] = None):
     """Return a Qdrant-backed vectorstore for a given collection."""
     collection = collection or settings.docs_collection
     embeddings = get_embeddings()
+    client = get_qdrant_client()
+    # A LocalIndexClient implies localindex is loaded; don't import it otherwise
+    localindex = sys.modules.get("localindex")
+    if localindex is not None and isinstance(client, localindex.LocalIndexClient):
+        return localindex.LocalVectorStore(client.index(collection), embeddings, collection)
+    # Try both import paths for compatibility
+    try:
+        from langchain_qdrant import QdrantVectorStore as Qdrant
+    except ImportError:
+        from langchain_community.vectorstores import Qdrant  # type: ignore
     return Qdrant(
-        client=get_qdrant_client(),
+        client=client,
         collection_name=collection,
         embedding=embeddings   # ✅ fixed
     )
 
 
-def upsert_interaction(summary_text: str, metadata: Optional[Dict[str, Any]] = None) -> str:
-    """Insert or update a single interaction document in Qdrant."""
-    embeddings = get_embeddings()
+def _stamped(metadata: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    # ``created_at`` drives expiry and eviction (see lifecycle.py)
+    return {"created_at": time.time(), **(metadata or {})}
+
+
+def upsert_interaction(summary_text: str, metadata: Optional[Dict[str, Any]] = None,
+                       embed_text: Optional[str] = None) -> str:
+    """Insert or update a single interaction document in Qdrant.
+
+    The point is indexed by ``embed_text`` when given (e.g. the user query,
+    so the semantic cache can match repeat questions), otherwise by the
+    summary itself.
+    """
     client = get_qdrant_client()
-    ensure_collection(
-        client,
-        settings.interactions_collection,
-        vector_size=embeddings.client.get_sentence_embedding_dimension()  # type: ignore
-    )
+    # Interactions stay full precision: the semantic cache compares raw scores
+    ensure_collection(client, settings.interactions_collection, profile="float")
 
-    vs = Qdrant(
-        client=client,
-        collection_name=settings.interactions_collection,
-        embedding=embeddings   # ✅ fixed
-    )
+    if embed_text is not None:
+        return upsert_interactions([(summary_text, metadata, embed_text)])[0]
+
+    vs = get_vectorstore(settings.interactions_collection)
 
-    doc = Document(page_content=summary_text, metadata=metadata or {})
+    doc = Document(page_content=summary_text, metadata=_stamped(metadata))
     ids = vs.add_documents([doc])
     return ids[0] if ids else ""
+
+
+def upsert_interactions(items: List[Tuple[str, Optional[Dict[str, Any]], Optional[str]]]) -> List[str]:
+    """Bulk-insert ``(summary_text, metadata, embed_text)`` interactions.
+
+    All texts are embedded in one call and written in one upsert; each point
+    is indexed by ``embed_text`` or, if that is None, by its summary.
+    """
+    if not items:
+        return []
+    embeddings = get_embeddings()
+    client = get_qdrant_client()
+    vectors = embeddings.embed_documents(
+        [embed if embed is not None else summary for summary, _, embed in items])
+    ensure_collection(client, settings.interactions_collection,
+                      vector_size=len(vectors[0]), profile="float")
+    from qdrant_client.http.models import PointStruct
+    ids = [str(uuid.uuid4()) for _ in items]
+    client.upsert(
+        collection_name=settings.interactions_collection,
+        points=[
+            PointStruct(id=pid, vector=vec,
+                        payload={"page_content": summary, "metadata": _stamped(metadata)})
+            for pid, vec, (summary, metadata, _) in zip(ids, vectors, items)
+        ],
+    )
+    return ids
+
+
+registry.register_warmer("qdrant", get_qdrant_client)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+    parser = argparse.ArgumentParser(description="Bulk-ingest PDFs into Qdrant")
+    commands = parser.add_subparsers(dest="command", required=True)
+    ingest = commands.add_parser("ingest", help="ingest PDF files and folders of PDFs")
+    ingest.add_argument("paths", nargs="+")
+    ingest.add_argument("--collection", help="default: DOCS_COLLECTION")
+    ingest.add_argument("--workers", type=int,
+                        help="parser processes (default: INGEST_WORKERS, else one per CPU)")
+    ingest.add_argument("--embed-batch-size", type=int, help="default: INGEST_EMBED_BATCH_SIZE")
+    args = parser.parse_args(argv)
+
+    paths = find_pdfs(args.paths)
+    if not paths:
+        print("no PDF files found")
+        return 1
+
+    def on_progress(p: BulkIngestProgress) -> None:
+        f = p.last
+        status = f"FAILED {f.error}" if f.error else (
+            f"{f.chunks} chunks ({f.upserted} new, {f.skipped} unchanged, {f.deleted} removed)")
+        print(f"[{p.files_done}/{p.files_total}] {f.source}: {status}", flush=True)
+
+    report = ingest_pdfs(paths, collection=args.collection, workers=args.workers,
+                         on_progress=on_progress, embed_batch_size=args.embed_batch_size)
+    peak = f", peak RSS {report.peak_rss_mb:.0f} MB" if report.peak_rss_mb else ""
+    print(f"{len(report.files) - len(report.failed)}/{len(report.files)} files, "
+          f"{report.chunks} chunks ({report.upserted} new) in {report.seconds:.1f}s "
+          f"with {report.workers} workers: {report.chunks_per_sec:.0f} chunks/s{peak}")
+    print(f"parse {report.parse_seconds:.1f}s (all workers) · embed {report.embed_seconds:.1f}s"
+          f" · upsert {report.upsert_seconds:.1f}s")
+    return 1 if report.failed else 0
+
+
+if __name__ == "__main__":
+    # Go through the importable module, so worker processes can load split_pdf
+    import vectorstore
+    sys.exit(vectorstore.main())
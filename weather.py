@@ -1,11 +1,23 @@
-from typing import Dict, Any
+from typing import Dict, Any, Awaitable, Callable, Iterator, List, Optional, Set, Tuple
+from collections import deque
+from dataclasses import dataclass
+import asyncio
+from concurrent.futures import Future
+import threading
+import time
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
 import re
 
 from settings import settings
 from llm import get_llm, render_weather_prompt
+from resources import registry, get_io_executor
+from gazetteer import resolve_place
+from tracing import in_context, span
 
-OWM_URL = "https://api.openweathermap.org/data/2.5/weather"
+
+CacheKey = Tuple[str, str, str]
 
 
 def clean_city_name(query: str) -> str:
@@ -22,33 +34,485 @@ def clean_city_name(query: str) -> str:
     return re.sub(r"\s+", " ", query).strip()
 
 
-def fetch_weather(city: str, units: str = "metric", lang: str = "en") -> Dict[str, Any]:
+def _location(city: str) -> Tuple[str, Dict[str, Any]]:
     """
-    Calls OpenWeatherMap API and returns the raw weather JSON.
+    Cache key and OpenWeatherMap location params for a city string.
+    Gazetteer cities are queried by ID; anything else by cleaned name.
     """
+    place = resolve_place(city)
+    if place is not None:
+        return f"id:{place.id}", {"id": place.id}
     clean_city = clean_city_name(city)
+    return clean_city, {"q": clean_city}
+
+
+def city_key(city: str) -> str:
+    """
+    Stable identity of a city string ('Bombay' and 'mumbai' give the same key).
+    """
+    return _location(city)[0]
+
+
+def get_http_session() -> requests.Session:
+    """
+    Returns the shared keep-alive session used for OpenWeatherMap calls.
+    """
+    def _build() -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4,
+                              pool_maxsize=settings.weather_pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    return registry.get("http", "openweathermap", _build)
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """
+    Returns the keep-alive async client for the running event loop.
+    """
+    return registry.get_for_loop("async_http", "openweathermap", lambda: httpx.AsyncClient(
+        timeout=settings.weather_timeout,
+        limits=httpx.Limits(max_connections=settings.weather_pool_size,
+                            max_keepalive_connections=settings.weather_pool_size),
+    ))
+
+
+class WeatherCache:
+    """
+    Per-key TTL cache with in-flight request coalescing.
+
+    - Fresh entries (younger than ``ttl``) are served directly.
+    - Stale entries (younger than ``stale_ttl``) are served immediately while
+      a single background refresh runs.
+    - Concurrent misses for the same key wait on one upstream request.
+    Upstream errors are never cached.
+    """
+
+    def __init__(self, ttl: Optional[float] = None, stale_ttl: Optional[float] = None,
+                 max_entries: int = 1024, clock: Callable[[], float] = time.monotonic):
+        # ``None`` reads ``WEATHER_CACHE_TTL`` / ``WEATHER_STALE_TTL`` on use
+        self._ttl = ttl
+        self._stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: Dict[CacheKey, Tuple[float, Dict[str, Any]]] = {}
+        self._inflight: Dict[CacheKey, Future] = {}
+        self._latencies: deque = deque(maxlen=512)
+        self._tasks: Set[asyncio.Task] = set()
+        self._counters = {"hits": 0, "stale_hits": 0, "misses": 0,
+                          "coalesced": 0, "upstream_calls": 0,
+                          "upstream_errors": 0, "background_refreshes": 0}
+
+    @property
+    def ttl(self) -> float:
+        return settings.weather_cache_ttl if self._ttl is None else self._ttl
+
+    @property
+    def stale_ttl(self) -> float:
+        stale = settings.weather_stale_ttl if self._stale_ttl is None else self._stale_ttl
+        return max(stale, self.ttl)
+
+    def _claim(self, key: CacheKey) -> Tuple[str, Any, Optional[Future]]:
+        """Decide how a lookup is served. Returns one of:
+        ``("fresh", data, None)``, ``("stale", data, refresh_future_or_None)``,
+        ``("lead", None, fut)`` (caller loads) or ``("wait", None, fut)``.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = self._clock() - entry[0]
+                if age < self.ttl:
+                    self._counters["hits"] += 1
+                    return "fresh", entry[1], None
+                if age < self.stale_ttl:
+                    self._counters["stale_hits"] += 1
+                    refresh = None
+                    if key not in self._inflight:
+                        self._counters["background_refreshes"] += 1
+                        refresh = self._inflight[key] = Future()
+                    return "stale", entry[1], refresh
+
+            fut = self._inflight.get(key)
+            if fut is None:
+                fut = self._inflight[key] = Future()
+                self._counters["misses"] += 1
+                return "lead", None, fut
+            self._counters["coalesced"] += 1
+            return "wait", None, fut
+
+    def get(self, key: CacheKey, loader: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        state, data, fut = self._claim(key)
+        if state == "fresh":
+            return data
+        if state == "stale":
+            if fut is not None:
+                threading.Thread(target=self._load, args=(key, loader, fut),
+                                 name="weather-refresh", daemon=True).start()
+            return data
+        if state == "lead":
+            self._load(key, loader, fut)
+        return fut.result()
+
+    async def aget(self, key: CacheKey,
+                   loader: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Async :meth:`get`; coalesces with sync and async callers alike."""
+        state, data, fut = self._claim(key)
+        if state == "fresh":
+            return data
+        if state == "stale":
+            if fut is not None:
+                task = asyncio.create_task(self._aload(key, loader, fut))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            return data
+        if state == "lead":
+            await self._aload(key, loader, fut)
+        return await asyncio.wrap_future(fut)
+
+    def _load(self, key: CacheKey, loader: Callable[[], Dict[str, Any]], fut: Future) -> None:
+        start = time.perf_counter()
+        try:
+            data = loader()
+        except BaseException as e:
+            self._finish(key, fut, start, error=e)
+            return
+        self._finish(key, fut, start, data=data)
+
+    async def _aload(self, key: CacheKey, loader: Callable[[], Awaitable[Dict[str, Any]]],
+                     fut: Future) -> None:
+        start = time.perf_counter()
+        try:
+            data = await loader()
+        except BaseException as e:
+            self._finish(key, fut, start, error=e)
+            return
+        self._finish(key, fut, start, data=data)
+
+    def _finish(self, key: CacheKey, fut: Future, start: float,
+                data: Optional[Dict[str, Any]] = None,
+                error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            self._counters["upstream_calls"] += 1
+            self._latencies.append(time.perf_counter() - start)
+            self._inflight.pop(key, None)
+            if error is not None:
+                self._counters["upstream_errors"] += 1
+            else:
+                self._entries.pop(key, None)
+                self._entries[key] = (self._clock(), data)
+                while len(self._entries) > self.max_entries:
+                    self._entries.pop(next(iter(self._entries)))
+        if error is not None:
+            fut.set_exception(error)
+        else:
+            fut.set_result(data)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            for k in self._counters:
+                self._counters[k] = 0
+            self._latencies.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = dict(self._counters)
+            lat = sorted(self._latencies)
+            out["entries"] = len(self._entries)
+        if lat:
+            out["upstream_latency_ms_p50"] = lat[len(lat) // 2] * 1000
+            out["upstream_latency_ms_max"] = lat[-1] * 1000
+        return out
+
+
+weather_cache = WeatherCache()
+
+
+def _fetch_weather_upstream(location: Dict[str, Any], units: str, lang: str) -> Dict[str, Any]:
     params = {
-        "q": clean_city,
+        **location,
         "appid": settings.openweather_api_key,
         "units": units,
         "lang": lang,
     }
 
-    resp = requests.get(OWM_URL, params=params, timeout=15)
-    resp.raise_for_status()
-    return resp.json()
+    with span("owm.http") as sp:
+        resp = get_http_session().get(settings.openweather_url, params=params,
+                                      timeout=settings.weather_timeout)
+        resp.raise_for_status()
+        sp.set(bytes=len(getattr(resp, "content", b"") or b""))
+        return resp.json()
+
+
+def fetch_weather(city: str, units: str = "metric", lang: str = "en") -> Dict[str, Any]:
+    """
+    Returns the raw OpenWeatherMap JSON for a city, served from the shared
+    TTL cache when possible. The returned dict is shared; don't mutate it.
+    """
+    key, location = _location(city)
+    with span("weather.fetch", cache="hit") as sp:
+        def load() -> Dict[str, Any]:
+            sp.set(cache="miss")
+            return _fetch_weather_upstream(location, units, lang)
+        return weather_cache.get((key, units, lang), load)
+
+
+def fetch_weather_many(cities: List[str], units: str = "metric",
+                       lang: str = "en") -> Dict[str, Dict[str, Any]]:
+    """
+    Fetches several cities in parallel; returns ``{city: weather_json}``.
+    """
+    if len(cities) == 1:
+        return {cities[0]: fetch_weather(cities[0], units, lang)}
+    results = get_io_executor().map(
+        in_context(lambda c: fetch_weather(c, units, lang)), cities)
+    return dict(zip(cities, results))
+
+
+async def _afetch_weather_upstream(location: Dict[str, Any], units: str, lang: str) -> Dict[str, Any]:
+    params = {
+        **location,
+        "appid": settings.openweather_api_key,
+        "units": units,
+        "lang": lang,
+    }
+
+    with span("owm.http") as sp:
+        resp = await get_async_http_client().get(settings.openweather_url, params=params)
+        resp.raise_for_status()
+        sp.set(bytes=len(getattr(resp, "content", b"") or b""))
+        return resp.json()
+
+
+async def afetch_weather(city: str, units: str = "metric", lang: str = "en") -> Dict[str, Any]:
+    """
+    Async variant of :func:`fetch_weather`, sharing the same cache.
+    """
+    key, location = _location(city)
+    with span("weather.fetch", cache="hit") as sp:
+        def load() -> Awaitable[Dict[str, Any]]:
+            sp.set(cache="miss")
+            return _afetch_weather_upstream(location, units, lang)
+        return await weather_cache.aget((key, units, lang), load)
+
+
+async def afetch_weather_many(cities: List[str], units: str = "metric",
+                              lang: str = "en") -> Dict[str, Dict[str, Any]]:
+    """
+    Fetches several cities concurrently; returns ``{city: weather_json}``.
+    """
+    results = await asyncio.gather(*(afetch_weather(c, units, lang) for c in cities))
+    return dict(zip(cities, results))
+
+
+@dataclass(frozen=True, slots=True)
+class WeatherReport:
+    """
+    The fields of an OpenWeatherMap response that a summary needs.
+    """
+    city: str
+    country: str = ""
+    description: str = ""
+    temp: Optional[float] = None
+    feels_like: Optional[float] = None
+    temp_min: Optional[float] = None
+    temp_max: Optional[float] = None
+    humidity: Optional[float] = None
+    pressure: Optional[float] = None
+    wind_speed: Optional[float] = None
+    wind_gust: Optional[float] = None
+    clouds: Optional[float] = None
+    rain_1h: Optional[float] = None
+    snow_1h: Optional[float] = None
+    visibility_km: Optional[float] = None
+    units: str = "metric"
+
+    @classmethod
+    def from_owm(cls, data: Dict[str, Any], city: str = "",
+                 units: str = "metric") -> "WeatherReport":
+        main = data.get("main") or {}
+        wind = data.get("wind") or {}
+        visibility = data.get("visibility")
+        return cls(
+            city=data.get("name") or city,
+            country=(data.get("sys") or {}).get("country", ""),
+            description=", ".join(w.get("description", "") for w in data.get("weather") or []),
+            temp=main.get("temp"),
+            feels_like=main.get("feels_like"),
+            temp_min=main.get("temp_min"),
+            temp_max=main.get("temp_max"),
+            humidity=main.get("humidity"),
+            pressure=main.get("pressure"),
+            wind_speed=wind.get("speed"),
+            wind_gust=wind.get("gust"),
+            clouds=(data.get("clouds") or {}).get("all"),
+            rain_1h=(data.get("rain") or {}).get("1h"),
+            snow_1h=(data.get("snow") or {}).get("1h"),
+            visibility_km=visibility / 1000 if visibility is not None else None,
+            units=units,
+        )
+
+    @property
+    def temp_unit(self) -> str:
+        return {"metric": "°C", "imperial": "°F"}.get(self.units, "K")
+
+    @property
+    def speed_unit(self) -> str:
+        return "mph" if self.units == "imperial" else "m/s"
+
+    @property
+    def place(self) -> str:
+        return f"{self.city}, {self.country}" if self.country else self.city
+
+    def render(self) -> str:
+        """
+        One dense line, e.g. 'Pune, IN: light rain; 27.1°C (feels 29, 25–28); humidity 78%; ...'
+        """
+        t = self.temp_unit
+        parts = [self.description] if self.description else []
+        if self.temp is not None:
+            temp = f"{self.temp:g}{t}"
+            extra = []
+            if self.feels_like is not None:
+                extra.append(f"feels {self.feels_like:g}")
+            if self.temp_min is not None and self.temp_max is not None:
+                extra.append(f"{self.temp_min:g}–{self.temp_max:g}")
+            parts.append(f"{temp} ({', '.join(extra)})" if extra else temp)
+        if self.humidity is not None:
+            parts.append(f"humidity {self.humidity:g}%")
+        if self.wind_speed is not None:
+            gust = f", gusts {self.wind_gust:g}" if self.wind_gust is not None else ""
+            parts.append(f"wind {self.wind_speed:g} {self.speed_unit}{gust}")
+        if self.clouds is not None:
+            parts.append(f"clouds {self.clouds:g}%")
+        if self.rain_1h:
+            parts.append(f"rain {self.rain_1h:g} mm/h")
+        if self.snow_1h:
+            parts.append(f"snow {self.snow_1h:g} mm/h")
+        if self.pressure is not None:
+            parts.append(f"pressure {self.pressure:g} hPa")
+        if self.visibility_km is not None:
+            parts.append(f"visibility {self.visibility_km:g} km")
+        return f"{self.place}: " + "; ".join(parts)
+
+
+def weather_reports(weather_json: Dict[str, Any]) -> List[WeatherReport]:
+    """
+    Reports for a single OpenWeatherMap response or a ``{city: response}`` map.
+    """
+    if "main" in weather_json or "name" in weather_json:
+        return [WeatherReport.from_owm(weather_json)]
+    return [WeatherReport.from_owm(data, city=city) for city, data in weather_json.items()
+            if isinstance(data, dict)]
+
+
+def compact_weather(weather_json: Dict[str, Any]) -> str:
+    """
+    Prompt text for the weather data: one line per city.
+    """
+    return "\n".join(r.render() for r in weather_reports(weather_json))
+
+
+# Simple fact questions that a template answers without the LLM
+_FACTS = {
+    "temperature": re.compile(r"\b(temp|temperature|degrees|hot|cold|warm)\b", re.I),
+    "humidity": re.compile(r"\b(humid|humidity)\b", re.I),
+    "wind": re.compile(r"\b(wind|windy)\b", re.I),
+    "pressure": re.compile(r"\bpressure\b", re.I),
+}
+# ...unless the user wants advice, a forecast or an overall picture
+_NEEDS_LLM = re.compile(
+    r"\b(should|need|umbrella|wear|jacket|safe|plan|advice|recommend|forecast|"
+    r"tomorrow|tonight|week|weekend|later|alert|compare|better|why)\b", re.I)
+
+
+def _fact_sentence(report: WeatherReport, fact: str) -> Optional[str]:
+    if fact == "temperature" and report.temp is not None:
+        feels = (f", feels like {report.feels_like:g}{report.temp_unit}"
+                 if report.feels_like is not None else "")
+        return f"It's {report.temp:g}{report.temp_unit} in {report.city}{feels}."
+    if fact == "humidity" and report.humidity is not None:
+        return f"Humidity in {report.city} is {report.humidity:g}%."
+    if fact == "wind" and report.wind_speed is not None:
+        return f"Wind in {report.city} is {report.wind_speed:g} {report.speed_unit}."
+    if fact == "pressure" and report.pressure is not None:
+        return f"Air pressure in {report.city} is {report.pressure:g} hPa."
+    return None
+
+
+def _overview_sentence(report: WeatherReport) -> str:
+    facts = [s for s in (_fact_sentence(report, f) for f in ("temperature", "humidity", "wind")) if s]
+    condition = f"{report.city}: {report.description}." if report.description else ""
+    return " ".join(p for p in [condition, *facts] if p)
+
+
+def template_summary(user_query: str, weather_json: Dict[str, Any],
+                     mode: Optional[str] = None) -> Optional[str]:
+    """
+    Deterministic answer without an LLM call, or None if the LLM should answer.
+
+    ``mode`` (default ``settings.weather_summary_mode``): ``llm`` never uses
+    templates, ``auto`` answers simple fact questions ("humidity in Pune"),
+    ``template`` answers everything.
+    """
+    mode = mode or settings.weather_summary_mode
+    if mode == "llm":
+        return None
+    reports = weather_reports(weather_json)
+    if not reports:
+        return None
+    facts = [f for f, pattern in _FACTS.items() if pattern.search(user_query)]
+    if mode == "auto" and (not facts or _NEEDS_LLM.search(user_query)):
+        return None
+    sentences = []
+    for report in reports:
+        if facts:
+            found = [s for s in (_fact_sentence(report, f) for f in facts) if s]
+            if len(found) < len(facts) and mode == "auto":
+                return None
+            sentences.extend(found)
+        else:
+            sentences.append(_overview_sentence(report))
+    return " ".join(sentences) or None
+
+
+def stream_weather_summary(user_query: str, weather_json: Dict[str, Any]) -> Iterator[str]:
+    """
+    Yields the weather summary piece by piece as the LLM produces it.
+    """
+    templated = template_summary(user_query, weather_json)
+    if templated is not None:
+        yield templated
+        return
+    llm = get_llm()
+    prompt = render_weather_prompt(compact_weather(weather_json), user_query)
+    for chunk in (prompt | llm).stream({}):
+        # Handle both LangChain and raw string return types
+        text = chunk.content if hasattr(chunk, "content") else str(chunk)
+        if text:
+            yield text
 
 
 def summarize_weather(user_query: str, weather_json: Dict[str, Any]) -> str:
     """
     Summarizes weather data into a natural language response using LLM.
     """
-    llm = get_llm()
-    prompt = render_weather_prompt(weather_json, user_query)
-    chain = prompt | llm
-    response = chain.invoke({})
+    return "".join(stream_weather_summary(user_query, weather_json))
+
 
-    # Handle both LangChain and raw string return types
+async def asummarize_weather(user_query: str, weather_json: Dict[str, Any]) -> str:
+    """
+    Async variant of :func:`summarize_weather`.
+    """
+    templated = template_summary(user_query, weather_json)
+    if templated is not None:
+        return templated
+    llm = get_llm()
+    prompt = render_weather_prompt(compact_weather(weather_json), user_query)
+    response = await (prompt | llm).ainvoke({})
     if hasattr(response, "content"):
         return response.content
     return str(response)